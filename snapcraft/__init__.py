@@ -141,7 +141,7 @@ of the choice of plugin.
     A list of packages to install on the build host before building
     the part. The files from these packages typically will not go into the
     final snap unless they contain libraries that are direct dependencies of
-    binaries within the snap (in which case they'll be discovered via `ldd`),
+    binaries within the snap (in which case they'll be discovered when priming),
     or they are explicitly described in stage-packages.
 
   - stage-packages: YAML list
@@ -29,6 +29,7 @@ class HiddenOption(click.Option):
 _BUILD_OPTION_NAMES = [
     "--enable-geoip",
     "--no-parallel-builds",
+    "--jobs",
     "--target-arch",
     "--debug",
     "--shell",
@@ -41,6 +42,11 @@ _BUILD_OPTIONS = [
         help="Detect best candidate location for stage-packages using geoip",
     ),
     dict(is_flag=True, help="Force a sequential build."),
+    dict(
+        metavar="<n>",
+        type=click.IntRange(min=1),
+        help="Number of independent parts to pull and build at the same time.",
+    ),
     dict(metavar="<arch>", help="Target architecture to cross compile to"),
     dict(is_flag=True, help="Shells into the environment if the build fails."),
     dict(is_flag=True, help="Shells into the environment in lieu of the step to run."),
@@ -83,6 +89,7 @@ def get_project(
         debug=kwargs.pop("debug"),
         use_geoip=kwargs.pop("enable_geoip"),
         parallel_builds=not kwargs.pop("no_parallel_builds"),
+        jobs=kwargs.pop("jobs") or 1,
         target_deb_arch=kwargs.pop("target_arch"),
         snapcraft_yaml_file_path=snapcraft_yaml_file_path,
         is_managed_host=is_managed_host,
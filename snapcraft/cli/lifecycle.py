@@ -46,6 +46,7 @@ def _execute(  # noqa: C901
     parts: str,
     pack_project: bool = False,
     output: str = None,
+    compression: str = None,
     shell: bool = False,
     shell_after: bool = False,
     **kwargs
@@ -80,7 +81,7 @@ def _execute(  # noqa: C901
                     if previous_step:
                         instance.execute_step(previous_step)
                 elif pack_project:
-                    instance.pack_project(output=output)
+                    instance.pack_project(output=output, compression=compression)
                 else:
                     instance.execute_step(step)
             except Exception:
@@ -97,20 +98,40 @@ def _execute(  # noqa: C901
         project_config = project_loader.load_config(project)
         lifecycle.execute(step, project_config, parts)
         if pack_project:
-            _pack(project.prime_dir, output=output)
+            _pack(
+                project.prime_dir,
+                output=output,
+                compression=compression,
+                processors=project.parallel_build_count,
+            )
     else:
         # containerbuild takes a snapcraft command name, not a step
         lifecycle.containerbuild(command=step.name, project=project, args=parts)
         if pack_project:
-            _pack(project.prime_dir, output=output)
+            _pack(
+                project.prime_dir,
+                output=output,
+                compression=compression,
+                processors=project.parallel_build_count,
+            )
     return project
 
 
-def _pack(directory: str, *, output: str) -> None:
-    snap_name = lifecycle.pack(directory, output)
+def _pack(
+    directory: str, *, output: str, compression: str = None, processors: int = None
+) -> None:
+    snap_name = lifecycle.pack(
+        directory, output, compression=compression, processors=processors
+    )
     echo.info("Snapped {}".format(snap_name))
 
 
+_COMPRESSION_HELP = (
+    "compression to pack the snap with, {} (the default) for the store or "
+    "a faster one for local use.".format(lifecycle.STORE_COMPRESSION)
+)
+
+
 @click.group()
 @add_build_options()
 @click.pass_context
@@ -191,28 +212,46 @@ def prime(parts, **kwargs):
 @add_build_options()
 @click.argument("directory", required=False)
 @click.option("--output", "-o", help="path to the resulting snap.")
-def snap(directory, output, **kwargs):
+@click.option(
+    "--compression",
+    type=click.Choice(lifecycle.COMPRESSIONS),
+    help=_COMPRESSION_HELP,
+)
+def snap(directory, output, compression, **kwargs):
     """Create a snap.
 
     \b
     Examples:
         snapcraft snap
         snapcraft snap --output renamed-snap.snap
+        snapcraft snap --compression lzo
 
     If you want to snap a directory, you should use the pack command
     instead.
     """
     if directory:
         deprecations.handle_deprecation_notice("dn6")
-        _pack(directory, output=output)
+        _pack(directory, output=output, compression=compression)
     else:
-        _execute(steps.PRIME, parts=[], pack_project=True, output=output, **kwargs)
+        _execute(
+            steps.PRIME,
+            parts=[],
+            pack_project=True,
+            output=output,
+            compression=compression,
+            **kwargs
+        )
 
 
 @lifecyclecli.command()
 @click.argument("directory")
 @click.option("--output", "-o", help="path to the resulting snap.")
-def pack(directory, output, **kwargs):
+@click.option(
+    "--compression",
+    type=click.Choice(lifecycle.COMPRESSIONS),
+    help=_COMPRESSION_HELP,
+)
+def pack(directory, output, compression, **kwargs):
     """Create a snap from a directory holding a valid snap.
 
     The layout of <directory> should contain a valid meta/snap.yaml in
@@ -222,9 +261,10 @@ def pack(directory, output, **kwargs):
     Examples:
         snapcraft pack my-snap-directory
         snapcraft pack my-snap-directory --output renamed-snap.snap
+        snapcraft pack my-snap-directory --compression lzo
 
     """
-    _pack(directory, output=output)
+    _pack(directory, output=output, compression=compression)
 
 
 @lifecyclecli.command()
@@ -15,16 +15,18 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from contextlib import contextmanager, suppress
+import concurrent.futures
 import errno
 import hashlib
 import logging
 import re
 import os
 import shutil
+import stat
 import subprocess
 import sys
 from typing import Pattern, Callable, Generator, List
-from typing import Set  # noqa F401
+from typing import Dict, Set, Tuple  # noqa F401
 
 from snapcraft.internal import common
 from snapcraft.internal.errors import (
@@ -42,6 +44,23 @@ if sys.version_info < (3, 6):
 
 logger = logging.getLogger(__name__)
 
+# From linux/fs.h, only exposed by the fcntl module in newer Pythons.
+_FICLONE = 0x40049409
+# The errors telling a way of copying is not supported between two files.
+_UNSUPPORTED_COPY_ERRNOS = {
+    errno.EBADF,
+    errno.EINVAL,
+    errno.ENOSYS,
+    errno.ENOTTY,
+    errno.EOPNOTSUPP,
+    errno.EXDEV,
+}
+# The size of the reads when copying file contents through userspace.
+_COPY_BUFFER_SIZE = 2 ** 20
+# How file contents are copied, once found, for each pair of (source,
+# destination) devices: "clone", "copy_file_range" or "copy".
+_copy_methods = dict()  # type: Dict[Tuple[int, int], str]
+
 
 def replace_in_file(
     directory: str, file_pattern: Pattern, search_pattern: Pattern, replacement: str
@@ -84,16 +103,32 @@ def search_and_replace_contents(
                 return
 
             replaced = search_pattern.sub(replacement, original)
-            if replaced != original:
+            if replaced == original:
+                return
+
+            if os.fstat(f.fileno()).st_nlink == 1:
                 f.seek(0)
                 f.truncate()
                 f.write(replaced)
+                return
+
+        # The file is hard-linked elsewhere (e.g. from the stage-packages
+        # cache), so write a new file instead of modifying the shared one.
+        _replace_hard_linked_file(file_path, replaced)
     except PermissionError as e:
         logger.warning(
             "Unable to open {path} for writing: {error}".format(path=file_path, error=e)
         )
 
 
+def _replace_hard_linked_file(file_path: str, contents: str) -> None:
+    temp_path = "{}.snapcraft-replace".format(file_path)
+    with open(temp_path, "w") as f:
+        f.write(contents)
+    shutil.copystat(file_path, temp_path)
+    os.replace(temp_path, file_path)
+
+
 def link_or_copy(source: str, destination: str, follow_symlinks: bool = False) -> None:
     """Hard-link source and destination files. Copy if it fails to link.
 
@@ -163,7 +198,7 @@ def copy(source: str, destination: str, *, follow_symlinks: bool = False) -> Non
         os.unlink(destination)
 
     try:
-        shutil.copy2(source, destination, follow_symlinks=follow_symlinks)
+        copy2(source, destination, follow_symlinks=follow_symlinks)
     except FileNotFoundError:
         raise SnapcraftCopyFileNotFoundError(source)
     uid = os.stat(source, follow_symlinks=follow_symlinks).st_uid
@@ -178,11 +213,146 @@ def copy(source: str, destination: str, *, follow_symlinks: bool = False) -> Non
         )
 
 
+def copy2(source: str, destination: str, *, follow_symlinks: bool = True) -> None:
+    """Copy source to destination just like shutil.copy2, but faster.
+
+    On filesystems supporting it (e.g. btrfs or xfs) the copy shares its
+    contents with the source until either is modified, which makes it almost
+    instantaneous. Otherwise, the contents are copied within the kernel if
+    possible. What works is found once for every pair of devices.
+
+    :param str source: The source to be copied to destination.
+    :param str destination: Where to put the copy.
+    :param bool follow_symlinks: Whether or not symlinks should be followed.
+    """
+    if os.path.isdir(destination):
+        destination = os.path.join(destination, os.path.basename(source))
+
+    if (not follow_symlinks and os.path.islink(source)) or not _copy_contents(
+        source, destination
+    ):
+        shutil.copy2(source, destination, follow_symlinks=follow_symlinks)
+        return
+
+    shutil.copystat(source, destination, follow_symlinks=follow_symlinks)
+
+
+def _copy_contents(source: str, destination: str) -> bool:
+    # Returns False when shutil.copy2 should be left to do the copy.
+    if sys.platform != "linux":
+        return False
+
+    # Only regular files are copied here, anything else (e.g. a FIFO, which
+    # would block when opened) is left to shutil.
+    source_stat = os.stat(source)
+    if not stat.S_ISREG(source_stat.st_mode):
+        return False
+    with suppress(FileNotFoundError):
+        if os.path.samestat(source_stat, os.stat(destination)):
+            return False
+
+    devices = (
+        source_stat.st_dev,
+        os.stat(os.path.dirname(os.path.abspath(destination))).st_dev,
+    )
+    method = _copy_methods.get(devices, "clone")
+    if method == "copy":
+        return False
+
+    source_fd = os.open(source, os.O_RDONLY)
+    try:
+        destination_fd = os.open(
+            destination, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666
+        )
+        try:
+            method = _copy_fd_contents(
+                source_fd, destination_fd, source_stat.st_size, method
+            )
+        finally:
+            os.close(destination_fd)
+    finally:
+        os.close(source_fd)
+
+    if devices not in _copy_methods:
+        logger.debug(
+            "Copying files from device {} to device {} with {!r}".format(
+                devices[0], devices[1], method
+            )
+        )
+        _copy_methods[devices] = method
+    return True
+
+
+def _copy_fd_contents(
+    source_fd: int, destination_fd: int, size: int, method: str
+) -> str:
+    # Returns the method the contents could be copied with, trying the
+    # fastest first.
+    if method == "clone":
+        if _clone(source_fd, destination_fd):
+            return method
+        method = "copy_file_range"
+    if method == "copy_file_range":
+        if _copy_file_range(source_fd, destination_fd, size):
+            return method
+        method = "copy"
+
+    _copy_with_read_write(source_fd, destination_fd)
+    return method
+
+
+def _clone(source_fd: int, destination_fd: int) -> bool:
+    import fcntl
+
+    try:
+        fcntl.ioctl(destination_fd, _FICLONE, source_fd)
+    except OSError as e:
+        if e.errno not in _UNSUPPORTED_COPY_ERRNOS:
+            raise
+        return False
+    return True
+
+
+def _copy_file_range(source_fd: int, destination_fd: int, size: int) -> bool:
+    # Returns False if copy_file_range is not supported between the two
+    # files, leaving what is not copied yet at the current offsets.
+    if not hasattr(os, "copy_file_range"):
+        return False
+
+    while size > 0:
+        try:
+            copied = os.copy_file_range(source_fd, destination_fd, size)
+        except OSError as e:
+            if e.errno not in _UNSUPPORTED_COPY_ERRNOS:
+                raise
+            return False
+        if copied == 0:
+            # The file is shorter than it was, or copy_file_range does not
+            # copy from it (e.g. in /sys), either way what is left is read.
+            _copy_with_read_write(source_fd, destination_fd)
+            break
+        size -= copied
+    return True
+
+
+def _copy_with_read_write(source_fd: int, destination_fd: int) -> None:
+    # Copies from the current offset of source_fd to its end.
+    while True:
+        data = os.read(source_fd, _COPY_BUFFER_SIZE)
+        if not data:
+            break
+        view = memoryview(data)
+        while view:
+            view = view[os.write(destination_fd, view) :]
+
+
 def link_or_copy_tree(
     source_tree: str,
     destination_tree: str,
     ignore: Callable[[str, List[str]], List[str]] = None,
     copy_function: Callable[..., None] = link_or_copy,
+    *,
+    max_workers: int = None
 ) -> None:
     """Copy a source tree into a destination, hard-linking if possible.
 
@@ -193,7 +363,10 @@ def link_or_copy_tree(
     :param callable ignore: If given, called with two params, source dir and
                             dir contents, for every dir copied. Should return
                             list of contents to NOT copy.
-    :param callable copy_function: Callable that actually copies.
+    :param callable copy_function: Callable that actually copies, it is
+                                   called from several threads at once.
+    :param int max_workers: The number of files to copy at once, left to
+                            concurrent.futures if not given.
     """
 
     if not os.path.isdir(source_tree):
@@ -207,47 +380,84 @@ def link_or_copy_tree(
             "{!r}".format(destination_tree, source_tree)
         )
 
-    create_similar_directory(source_tree, destination_tree)
+    # The path of the destination relative to the source, so that it is not
+    # copied into itself if it happens to be within the source.
+    destination_relpath = os.path.relpath(destination_tree, source_tree)
+    directories, files = _walk_tree(source_tree, destination_relpath, ignore)
+
+    # Directories are created parents first so that files can then be linked
+    # or copied in any order. Just like shutil.copytree, their permissions
+    # and times are only copied once their files are, as a read-only
+    # directory could not be copied into otherwise.
+    for relative_path in directories:
+        _create_directory(
+            os.path.join(source_tree, relative_path),
+            os.path.join(destination_tree, relative_path),
+        )
 
-    destination_basename = os.path.basename(destination_tree)
+    def _copy(relative_path: str) -> None:
+        copy_function(
+            os.path.join(source_tree, relative_path),
+            os.path.join(destination_tree, relative_path),
+        )
 
-    for root, directories, files in os.walk(source_tree, topdown=True):
-        ignored = set()  # type: Set[str]
-        if ignore is not None:
-            ignored = set(ignore(root, directories + files))
-
-        # Don't recurse into destination tree if it's a subdirectory of the
-        # source tree.
-        if os.path.relpath(destination_tree, root) == destination_basename:
-            ignored.add(destination_basename)
-
-        if ignored:
-            # Prune our search appropriately given an ignore list, i.e. don't
-            # walk into directories that are ignored.
-            directories[:] = [d for d in directories if d not in ignored]
-
-        for directory in directories:
-            source = os.path.join(root, directory)
-            # os.walk doesn't by default follow symlinks (which is good), but
-            # it includes symlinks that are pointing to directories in the
-            # directories list. We want to treat it as a file, here.
-            if os.path.islink(source):
-                files.append(directory)
-                continue
+    if len(files) < 2:
+        for relative_path in files:
+            _copy(relative_path)
+    else:
+        # Linking or copying is mostly spent waiting on the filesystem, so
+        # threads are enough to do it concurrently.
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            # Consuming the results raises the first error, if any.
+            list(executor.map(_copy, files))
+
+    for relative_path in reversed(directories):
+        shutil.copystat(
+            os.path.join(source_tree, relative_path),
+            os.path.join(destination_tree, relative_path),
+            follow_symlinks=False,
+        )
 
-            destination = os.path.join(
-                destination_tree, os.path.relpath(source, source_tree)
-            )
 
-            create_similar_directory(source, destination)
+def _walk_tree(
+    source_tree: str,
+    destination_relpath: str,
+    ignore: Callable[[str, List[str]], List[str]] = None,
+) -> Tuple[List[str], List[str]]:
+    # Returns the paths of the directories, parents first and starting with
+    # source_tree itself, and of the other files in source_tree, relative to
+    # it.
+    directories = [""]
+    files = []  # type: List[str]
+    pending = [""]
+    while pending:
+        relative_root = pending.pop()
+        root = (
+            os.path.join(source_tree, relative_root) if relative_root else source_tree
+        )
+        try:
+            entries = list(os.scandir(root))
+        except OSError as e:
+            # Just like os.walk, skip what cannot be listed.
+            logger.debug("Unable to list {}: {}".format(root, e))
+            continue
 
-        for file_name in set(files) - ignored:
-            source = os.path.join(root, file_name)
-            destination = os.path.join(
-                destination_tree, os.path.relpath(source, source_tree)
-            )
+        ignored = set()  # type: Set[str]
+        if ignore is not None:
+            ignored = set(ignore(root, [entry.name for entry in entries]))
+
+        for entry in entries:
+            relative_path = os.path.join(relative_root, entry.name)
+            if entry.name in ignored or relative_path == destination_relpath:
+                continue
+            # Symlinks to directories are linked or copied like files.
+            if entry.is_dir(follow_symlinks=False):
+                directories.append(relative_path)
+                pending.append(relative_path)
+            else:
+                files.append(relative_path)
 
-            copy_function(source, destination)
+    return directories, files
 
 
 def create_similar_directory(
@@ -262,6 +472,14 @@ def create_similar_directory(
     :param bool follow_symlinks: Whether or not symlinks should be followed.
     """
 
+    _create_directory(source, destination, follow_symlinks=follow_symlinks)
+    shutil.copystat(source, destination, follow_symlinks=follow_symlinks)
+
+
+def _create_directory(
+    source: str, destination: str, follow_symlinks: bool = False
+) -> None:
+    # Like create_similar_directory, without copying permission bits and times.
     stat = os.stat(source, follow_symlinks=follow_symlinks)
     uid = stat.st_uid
     gid = stat.st_gid
@@ -271,8 +489,6 @@ def create_similar_directory(
     except PermissionError as exception:
         logger.debug("Unable to chown {}: {}".format(destination, exception))
 
-    shutil.copystat(source, destination, follow_symlinks=follow_symlinks)
-
 
 def executable_exists(path: str) -> bool:
     """Return True if 'path' exists and is readable and executable."""
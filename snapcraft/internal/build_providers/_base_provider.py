@@ -160,10 +160,14 @@ class Provider(abc.ABC):
     def execute_step(self, step: steps.Step) -> None:
         self._run(command=["snapcraft", step.name])
 
-    def pack_project(self, *, output: Optional[str] = None) -> None:
+    def pack_project(
+        self, *, output: Optional[str] = None, compression: Optional[str] = None
+    ) -> None:
         command = ["snapcraft", "snap"]
         if output:
             command.extend(["--output", output])
+        if compression:
+            command.extend(["--compression", compression])
         self._run(command=command)
 
     def clean_project(self) -> bool:
@@ -18,6 +18,7 @@ import os
 import shlex
 import sys
 
+from snapcraft.internal.cache import PackageManagerCache
 from .. import errors
 from .._base_provider import Provider
 from ._instance_info import InstanceInfo
@@ -146,6 +147,16 @@ class Multipass(Provider):
                 mountpoint=project_mountpoint, dev_or_path=self.project._project_dir
             )
 
+        # Share the package manager caches of the host, if asked to.
+        if os.environ.get("SNAPCRAFT_MOUNT_PACKAGE_CACHE"):
+            cache_dir = PackageManagerCache().package_manager_cache_root
+            os.makedirs(cache_dir, exist_ok=True)
+            cache_mountpoint = os.path.join(
+                home_dir, ".cache", "snapcraft", "package-managers"
+            )
+            if not self._instance_info.is_mounted(cache_mountpoint):
+                self._mount(mountpoint=cache_mountpoint, dev_or_path=cache_dir)
+
     def provision_project(self, tarball: str) -> None:
         """Provision the multipass instance with the project to work with."""
         # TODO add instance check.
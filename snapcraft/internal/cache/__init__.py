@@ -16,5 +16,9 @@
 
 from ._apt import AptStagePackageCache  # noqa
 from ._cache import SnapcraftCache  # noqa
+from ._cache import SnapcraftProjectCache  # noqa
 from ._file import FileCache  # noqa
+from ._package_manager import PackageManagerCache  # noqa
 from ._snap import SnapCache  # noqa
+from ._toolchain import ToolchainCache  # noqa
+from ._wheel import WheelCache  # noqa
@@ -41,3 +41,8 @@ class AptStagePackageCache(SnapcraftStagePackageCache):
             self.base_dir, "var", "cache", "apt", "archives"
         )
         os.makedirs(self.packages_dir, exist_ok=True)
+
+        # Unpacked packages are keyed by the digest of the .deb itself, so
+        # they can be shared regardless of the sources they came from.
+        self.unpacked_dir = os.path.join(cache_base_dir, "unpacked")
+        os.makedirs(self.unpacked_dir, exist_ok=True)
@@ -35,16 +35,23 @@ class FileCache(SnapcraftCache):
         super().__init__()
         self.file_cache = os.path.join(self.cache_root, namespace)
 
-    def cache(self, *, filename: str, algorithm: str, hash: str) -> str:
+    def cache(
+        self, *, filename: str, algorithm: str, hash: str, verify: bool = True
+    ) -> str:
         """Cache a file revision with hash in XDG cache, unless it already exists.
         :param str filename: path to the file to cache.
         :param str algorithm: algorithm used to calculate the hash as
                               understood by hashlib.
         :param str hash: hash for filename calculated with algorithm.
+        :param bool verify: whether or not to check hash against filename,
+                            only to be unset if the caller already did.
         :returns: path to cached file.
         """
         # First we verify
-        calculated_hash = calculate_hash(filename, algorithm=algorithm)
+        if verify:
+            calculated_hash = calculate_hash(filename, algorithm=algorithm)
+        else:
+            calculated_hash = hash
         if calculated_hash != hash:
             logger.warning(
                 "Skipping caching of {!r} as the expected "
@@ -0,0 +1,150 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+import shutil
+import stat
+from typing import Dict, List  # noqa: F401
+
+from ._cache import SnapcraftCache
+
+logger = logging.getLogger(__name__)
+
+# The environment variables pointing each package manager to its cache.
+_CACHE_VARIABLES = [
+    ("pip", "PIP_CACHE_DIR"),
+    ("npm", "npm_config_cache"),
+    ("yarn", "YARN_CACHE_FOLDER"),
+]
+
+_DEFAULT_MAX_SIZE_MB = 5000
+_LAST_USED_FILE = ".last-used"
+
+
+class PackageManagerCache(SnapcraftCache):
+    """Download caches for language package managers, shared by every project.
+
+    Each package manager gets its own directory, which snapcraft clean leaves
+    alone. Once they grow over SNAPCRAFT_PACKAGE_CACHE_SIZE (in megabytes,
+    0 disables them), the least recently used ones are emptied. Whole caches
+    are evicted, as removing some of the files within one may leave it in a
+    state its package manager cannot recover from.
+    """
+
+    # Only look at the size of the caches once per run.
+    _pruned = False
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.package_manager_cache_root = os.path.join(
+            self.cache_root, "package-managers"
+        )
+
+    def get_env(self) -> List[str]:
+        """Return the environment pointing package managers to their caches.
+
+        Variables already set (e.g. by the user) are left alone.
+        """
+        max_size = _get_max_size()
+        if max_size == 0:
+            return []
+
+        if not PackageManagerCache._pruned:
+            PackageManagerCache._pruned = True
+            self.prune(max_size=max_size)
+
+        env = []  # type: List[str]
+        for package_manager, variable in _CACHE_VARIABLES:
+            if variable in os.environ:
+                continue
+            cache_dir = os.path.join(self.package_manager_cache_root, package_manager)
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # The modification time of this file tells when the cache was
+                # last used.
+                with open(os.path.join(cache_dir, _LAST_USED_FILE), "w"):
+                    pass
+            except OSError as error:
+                logger.debug("Unable to use cache {}: {}".format(cache_dir, error))
+                continue
+            env.append('{}="{}"'.format(variable, cache_dir))
+        return env
+
+    def prune(self, *, max_size: int) -> None:
+        """Empty the least recently used caches until they fit in max_size.
+
+        :param int max_size: the maximum size of all caches, in bytes.
+        """
+        try:
+            package_managers = os.listdir(self.package_manager_cache_root)
+        except FileNotFoundError:
+            return
+
+        sizes = dict()  # type: Dict[str, int]
+        last_used = dict()  # type: Dict[str, float]
+        for package_manager in package_managers:
+            cache_dir = os.path.join(self.package_manager_cache_root, package_manager)
+            sizes[package_manager] = _get_size(cache_dir)
+            try:
+                last_used[package_manager] = os.stat(
+                    os.path.join(cache_dir, _LAST_USED_FILE)
+                ).st_mtime
+            except OSError:
+                last_used[package_manager] = 0
+
+        total_size = sum(sizes.values())
+        for package_manager in sorted(sizes, key=lambda p: last_used[p]):
+            if total_size <= max_size:
+                break
+            logger.debug(
+                "Evicting the {} cache, the package manager caches are using "
+                "{} bytes".format(package_manager, total_size)
+            )
+            _remove_tree(os.path.join(self.package_manager_cache_root, package_manager))
+            total_size -= sizes[package_manager]
+
+
+def _get_max_size() -> int:
+    max_size = os.environ.get("SNAPCRAFT_PACKAGE_CACHE_SIZE")
+    try:
+        return int(max_size) * 1024 * 1024
+    except (TypeError, ValueError):
+        return _DEFAULT_MAX_SIZE_MB * 1024 * 1024
+
+
+def _get_size(path: str) -> int:
+    size = 0
+    for root, directories, files in os.walk(path):
+        for file_name in files:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def _remove_tree(path: str) -> None:
+    # Some package managers (e.g. go) make their caches read-only.
+    def make_writable_and_retry(function, failed_path, exc_info):
+        parent = os.path.dirname(failed_path)
+        os.chmod(parent, os.stat(parent).st_mode | stat.S_IWUSR)
+        function(failed_path)
+
+    try:
+        shutil.rmtree(path, onerror=make_writable_and_retry)
+    except OSError as error:
+        logger.warning("Unable to evict cache {}: {}".format(path, error))
@@ -0,0 +1,109 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+import shutil
+import tempfile
+
+from snapcraft import file_utils
+from ._cache import SnapcraftCache
+
+logger = logging.getLogger(__name__)
+
+
+class ToolchainCache(SnapcraftCache):
+    """Cache for toolchains, shared by every project.
+
+    A toolchain is kept under its version, architecture and, if known,
+    checksum. It must therefore only be cached when those identify its
+    contents (e.g. not for a "latest" or "stable" download).
+    """
+
+    def __init__(self, *, tool: str) -> None:
+        """Create a ToolchainCache for tool.
+
+        :param str tool: the name of the tool (e.g. "node").
+        """
+        super().__init__()
+        self.toolchain_cache = os.path.join(self.cache_root, "toolchains", tool)
+
+    def _get_entry_path(self, *, version: str, arch: str, checksum: str) -> str:
+        key = "{}-{}".format(version, arch)
+        if checksum:
+            key = "{}-{}".format(key, checksum.replace("/", "-"))
+        return os.path.join(self.toolchain_cache, key)
+
+    def get(self, *, path: str, version: str, arch: str, checksum: str = None) -> bool:
+        """Provision path with a cached toolchain.
+
+        The cached files are never hard-linked, so that changing them in path
+        cannot change the cache.
+
+        :param str path: the file or directory to provision.
+        :param str version: the version of the toolchain.
+        :param str arch: the architecture of the toolchain.
+        :param str checksum: the checksum of the toolchain, if known.
+        :returns: True if the toolchain was cached, False otherwise.
+        """
+        cached_path = os.path.join(
+            self._get_entry_path(version=version, arch=arch, checksum=checksum),
+            os.path.basename(path),
+        )
+        if not os.path.lexists(cached_path):
+            return False
+
+        logger.debug("Cache hit for toolchain {!r}".format(cached_path))
+        _copy(cached_path, path)
+        return True
+
+    def cache(
+        self, *, path: str, version: str, arch: str, checksum: str = None
+    ) -> None:
+        """Cache the toolchain in path, unless it already is.
+
+        :param str path: the file or directory holding the toolchain.
+        :param str version: the version of the toolchain.
+        :param str arch: the architecture of the toolchain.
+        :param str checksum: the checksum of the toolchain, if known.
+        """
+        entry_path = self._get_entry_path(version=version, arch=arch, checksum=checksum)
+        if os.path.isdir(entry_path):
+            return
+
+        try:
+            os.makedirs(self.toolchain_cache, exist_ok=True)
+            # Copy into a temporary entry first so that a partial copy never
+            # ends up looking like a cached toolchain.
+            temp_path = tempfile.mkdtemp(dir=self.toolchain_cache)
+            try:
+                _copy(path, os.path.join(temp_path, os.path.basename(path)))
+                os.rename(temp_path, entry_path)
+            except OSError:
+                shutil.rmtree(temp_path, ignore_errors=True)
+                # Another part may have just cached the same toolchain.
+                if not os.path.isdir(entry_path):
+                    raise
+        except OSError:
+            logger.warning("Unable to cache toolchain {}.".format(entry_path))
+
+
+def _copy(source: str, destination: str) -> None:
+    if os.path.isdir(source) and not os.path.islink(source):
+        file_utils.link_or_copy_tree(source, destination, copy_function=file_utils.copy)
+    else:
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        file_utils.copy(source, destination)
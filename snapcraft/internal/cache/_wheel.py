@@ -0,0 +1,115 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import os
+import shutil
+import tempfile
+from typing import List
+
+from snapcraft import file_utils
+from ._cache import SnapcraftCache
+
+logger = logging.getLogger(__name__)
+
+
+class WheelCache(SnapcraftCache):
+    """Cache for the python wheels built from source distributions.
+
+    A wheel is kept under the python ABI and architecture it was built for,
+    and under the name, version and digest of the source distribution it was
+    built from.
+
+    Only pure python wheels are cached, the ones with extensions depend on
+    more than that (e.g. the libraries staged by the project and the flags
+    they were built with).
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.wheel_cache = os.path.join(self.cache_root, "wheels")
+
+    def _get_entry_path(self, *, sdist: str, abi: str) -> str:
+        digest = file_utils.calculate_hash(sdist, algorithm="sha256")
+        return os.path.join(
+            self.wheel_cache,
+            abi.replace("/", "-"),
+            "{}-{}".format(os.path.basename(sdist), digest),
+        )
+
+    def get(self, *, sdist: str, abi: str, wheel_dir: str) -> List[str]:
+        """Copy the wheels built from sdist into wheel_dir.
+
+        :param str sdist: the path to the source distribution.
+        :param str abi: the python ABI and architecture the wheels are for.
+        :param str wheel_dir: the directory to copy the wheels into.
+        :returns: the paths to the copied wheels, empty if none were cached.
+        """
+        entry_path = self._get_entry_path(sdist=sdist, abi=abi)
+        try:
+            wheels = os.listdir(entry_path)
+        except FileNotFoundError:
+            return []
+
+        logger.debug("Cache hit for the wheels of {!r}".format(sdist))
+        wheel_paths = []
+        for wheel in wheels:
+            wheel_path = os.path.join(wheel_dir, wheel)
+            file_utils.copy(os.path.join(entry_path, wheel), wheel_path)
+            wheel_paths.append(wheel_path)
+        return wheel_paths
+
+    def cache(self, *, sdist: str, abi: str, wheels: List[str]) -> None:
+        """Cache the wheels built from sdist, unless they already are.
+
+        :param str sdist: the path to the source distribution.
+        :param str abi: the python ABI and architecture the wheels are for.
+        :param list wheels: the paths to the wheels built from sdist, only
+                            cached if they are all pure python.
+        """
+        if not all(_is_pure(wheel) for wheel in wheels):
+            logger.debug("Not caching the wheels of {!r}".format(sdist))
+            return
+
+        entry_path = self._get_entry_path(sdist=sdist, abi=abi)
+        if os.path.isdir(entry_path):
+            return
+
+        try:
+            os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+            # Copy into a temporary entry first so that a partial copy never
+            # ends up looking like cached wheels.
+            temp_path = tempfile.mkdtemp(dir=os.path.dirname(entry_path))
+            try:
+                for wheel in wheels:
+                    file_utils.copy(
+                        wheel, os.path.join(temp_path, os.path.basename(wheel))
+                    )
+                os.rename(temp_path, entry_path)
+            except OSError:
+                shutil.rmtree(temp_path, ignore_errors=True)
+                # Another part may have just cached the same wheels.
+                if not os.path.isdir(entry_path):
+                    raise
+        except OSError:
+            logger.warning("Unable to cache wheels in {}.".format(entry_path))
+
+
+def _is_pure(wheel: str) -> bool:
+    # The file name of a wheel ends with its python, ABI and platform tags,
+    # e.g. foo-1.0-py2.py3-none-any.whl.
+    tags = os.path.basename(wheel)[: -len(".whl")].split("-")[-3:]
+    return len(tags) == 3 and tags[0].startswith("py") and tags[1:] == ["none", "any"]
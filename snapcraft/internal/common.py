@@ -26,7 +26,7 @@ import sys
 import tempfile
 import urllib
 from contextlib import suppress
-from typing import Callable, List
+from typing import Callable, Dict, List, Mapping, Optional, Tuple  # noqa: F401
 
 from snapcraft.internal import errors
 
@@ -54,6 +54,10 @@ MAX_CHARACTERS_WRAP = 120
 
 env = []  # type: List[str]
 
+# The environments env evaluated to, keyed by env and what it was evaluated
+# from. They are forgotten with reset_env.
+_evaluated_envs = dict()  # type: Dict[Tuple, Dict[str, str]]
+
 logger = logging.getLogger(__name__)
 
 
@@ -61,21 +65,70 @@ def assemble_env():
     return "\n".join(["export " + e for e in env])
 
 
-def _run(cmd: List[str], runner: Callable, **kwargs):
-    assert isinstance(cmd, list), "run command must be a list"
-    cmd_string = " ".join([shlex.quote(c) for c in cmd])
-    # FIXME: This is gross to keep writing this, even when env is the same
+def _evaluate_env(
+    base_env: Optional[Mapping[str, str]], cwd: Optional[str]
+) -> Optional[Dict[str, str]]:
+    if base_env is None:
+        base_env = os.environ
+    if not env:
+        return dict(base_env)
+
+    key = (tuple(env), tuple(sorted(base_env.items())), cwd)
+    with suppress(KeyError):
+        return _evaluated_envs[key]
+
+    # env may refer to other variables, so a shell has to export it.
+    script = "{}\nexec /usr/bin/env -0\n".format(assemble_env())
+    try:
+        output = subprocess.check_output(
+            ["/bin/sh"], input=script.encode(), env=base_env, cwd=cwd
+        )
+    except (OSError, subprocess.CalledProcessError) as error:
+        logger.debug("Unable to evaluate the environment: {}".format(error))
+        return None
+
+    evaluated_env = dict()  # type: Dict[str, str]
+    for variable in output.split(b"\0"):
+        name, separator, value = variable.partition(b"=")
+        if separator:
+            evaluated_env[os.fsdecode(name)] = os.fsdecode(value)
+    # Set by some shells to the last command run, i.e. env.
+    evaluated_env.pop("_", None)
+
+    _evaluated_envs[key] = evaluated_env
+    return evaluated_env
+
+
+def _run_in_shell(cmd_string: str, runner: Callable, **kwargs):
     with tempfile.TemporaryFile(mode="w+") as run_file:
         print(assemble_env(), file=run_file)
         print("exec {}".format(cmd_string), file=run_file)
         run_file.flush()
         run_file.seek(0)
-        try:
-            return runner(["/bin/sh"], stdin=run_file, **kwargs)
-        except subprocess.CalledProcessError as call_error:
-            raise errors.SnapcraftCommandError(
-                command=cmd_string, call_error=call_error
-            ) from call_error
+        return runner(["/bin/sh"], stdin=run_file, **kwargs)
+
+
+def _run(cmd: List[str], runner: Callable, **kwargs):
+    assert isinstance(cmd, list), "run command must be a list"
+    cmd_string = " ".join([shlex.quote(c) for c in cmd])
+    try:
+        # Rather than having a shell export env for each command, the
+        # environment it results in is passed straight to the command.
+        run_env = _evaluate_env(kwargs.get("env"), kwargs.get("cwd"))
+        if run_env is not None:
+            run_kwargs = dict(kwargs, env=run_env)
+            run_kwargs.setdefault("stdin", subprocess.DEVNULL)
+            try:
+                return runner(cmd, **run_kwargs)
+            except OSError as error:
+                # The shell may still run it, e.g. a script without a
+                # shebang, or report why it cannot.
+                logger.debug("Unable to run {!r}: {}".format(cmd_string, error))
+        return _run_in_shell(cmd_string, runner, **kwargs)
+    except subprocess.CalledProcessError as call_error:
+        raise errors.SnapcraftCommandError(
+            command=cmd_string, call_error=call_error
+        ) from call_error
 
 
 def run(cmd: List[str], **kwargs) -> None:
@@ -206,6 +259,7 @@ def isurl(url):
 def reset_env():
     global env
     env = []
+    _evaluated_envs.clear()
 
 
 def get_terminal_width(max_width=MAX_CHARACTERS_WRAP):
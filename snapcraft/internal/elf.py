@@ -14,16 +14,20 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import contextlib
+import errno
 import glob
+import itertools
+import json
 import logging
 import os
 import re
-import shutil
+import stat
 import subprocess
 import tempfile
-from typing import Dict, FrozenSet, List, Set, Sequence, Tuple, Union  # noqa
+from typing import Dict, FrozenSet, List, Optional, Set, Sequence, Tuple, Union  # noqa
 
 import elftools.elf.elffile
+from elftools.common.exceptions import ELFError
 from pkg_resources import parse_version
 
 from snapcraft import file_utils
@@ -46,7 +50,7 @@ class NeededLibrary:
 
 ElfArchitectureTuple = Tuple[str, str, str]
 ElfDataTuple = Tuple[
-    ElfArchitectureTuple, str, str, Dict[str, NeededLibrary], bool
+    ElfArchitectureTuple, str, str, Dict[str, NeededLibrary], bool, List[str], List[str]
 ]  # noqa: E501
 SonameCacheDict = Dict[Tuple[ElfArchitectureTuple, str], str]
 
@@ -103,6 +107,152 @@ class SonameCache:
         self._soname_paths = new_soname_paths
 
 
+class ElfFileCache:
+    """A persistent cache for the data extracted from ELF files.
+
+    Entries are keyed by path and remain valid for as long as the device,
+    inode, size and modification time of the file they were created from
+    do not change.
+    """
+
+    _VERSION = 2
+
+    def __init__(self, *, path: str = None) -> None:
+        """Initialize a cache for ELF file data.
+
+        :param str path: the file to load the cache from and save it to, if
+                         not set the cache is only kept in memory.
+        """
+        self._path = path
+        self._entries = dict()  # type: Dict[str, list]
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as cache_file:
+                cache_data = json.load(cache_file)
+        except (OSError, ValueError) as error:
+            logger.debug(
+                "Ignoring unreadable ELF cache {!r}: {}".format(self._path, error)
+            )
+            return
+
+        if cache_data.get("version") == self._VERSION:
+            self._entries = cache_data.get("entries", dict())
+
+    def _get_entry(self, path: str) -> Optional[list]:
+        entry = self._entries.get(path)
+        if entry is None:
+            return None
+
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return None
+
+        if entry[:4] != _get_stat_key(file_stat):
+            del self._entries[path]
+            self._dirty = True
+            return None
+
+        return entry
+
+    def is_elf(self, path: str) -> bool:
+        """Return True if path is an ELF file, reading it only if it changed."""
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return False
+        # ELF binaries are regular files
+        if not stat.S_ISREG(file_stat.st_mode):
+            return False
+
+        entry = self._get_entry(path)
+        if entry is not None:
+            self.hits += 1
+            return entry[4] is not None
+
+        self.misses += 1
+        is_elf = ElfFile.is_elf(path)
+        # Files that are not ELF are cached too so they are not opened
+        # again, their data is None.
+        self._entries[path] = _get_stat_key(file_stat) + [{} if is_elf else None]
+        self._dirty = True
+        return is_elf
+
+    def get(self, path: str) -> Optional[ElfDataTuple]:
+        """Return the cached data for the ELF file at path, if still valid."""
+        entry = self._get_entry(path)
+        if entry is None or not entry[4]:
+            return None
+
+        elf_data = entry[4]["data"]
+        arch, interp, soname, needed, execstack_set, rpaths, runpaths = elf_data
+        libs = dict()  # type: Dict[str, NeededLibrary]
+        for name, versions in needed.items():
+            libs[name] = NeededLibrary(name=name)
+            for version in versions:
+                libs[name].add_version(version)
+
+        return tuple(arch), interp, soname, libs, execstack_set, rpaths, runpaths
+
+    def add(self, path: str, elf_data: ElfDataTuple) -> None:
+        """Cache the data extracted from the ELF file at path."""
+        try:
+            file_stat = os.stat(path)
+        except OSError:
+            return
+
+        arch, interp, soname, needed, execstack_set, rpaths, runpaths = elf_data
+        serialized_needed = {name: sorted(lib.versions) for name, lib in needed.items()}
+        self._entries[path] = _get_stat_key(file_stat) + [
+            {
+                "data": [
+                    list(arch),
+                    interp,
+                    soname,
+                    serialized_needed,
+                    execstack_set,
+                    rpaths,
+                    runpaths,
+                ]
+            }
+        ]
+        self._dirty = True
+
+    def save(self) -> None:
+        """Write the cache out to disk if it changed since it was loaded."""
+        logger.debug("ELF cache: {} hits, {} misses".format(self.hits, self.misses))
+        if not self._path or not self._dirty:
+            return
+
+        # Drop what was removed since the last run.
+        self._entries = {
+            path: entry for path, entry in self._entries.items() if os.path.exists(path)
+        }
+
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        temp_path = "{}.partial".format(self._path)
+        with open(temp_path, "w") as cache_file:
+            json.dump(dict(version=self._VERSION, entries=self._entries), cache_file)
+        os.replace(temp_path, self._path)
+        self._dirty = False
+
+
+def _get_stat_key(file_stat: os.stat_result) -> list:
+    return [
+        file_stat.st_dev,
+        file_stat.st_ino,
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+    ]
+
+
 class Library:
     """Represents the SONAME and path to the library."""
 
@@ -114,21 +264,25 @@ class Library:
         root_path: str,
         core_base_path: str,
         arch: ElfArchitectureTuple,
-        soname_cache: SonameCache
+        soname_cache: SonameCache,
+        soname_index: "SonameIndex" = None
     ) -> None:
         self.soname = soname
+        if soname_index is None:
+            soname_index = SonameIndex()
 
         # We need to always look for the soname inside root first,
         # and after exhausting all options look in core_base_path.
         if path.startswith(root_path):
             self.path = path
         else:
-            self.path = _crawl_for_path(
+            self.path = _find_path(
                 soname=soname,
                 root_path=root_path,
                 core_base_path=core_base_path,
                 arch=arch,
                 soname_cache=soname_cache,
+                soname_index=soname_index,
             )
 
         if not self.path and path.startswith(core_base_path):
@@ -151,33 +305,107 @@ class Library:
             self.in_base_snap = False
 
 
-def _crawl_for_path(
+class SonameIndex:
+    """An index of the files in a tree by name, used to look sonames up.
+
+    Trees are only walked the first time a soname is looked up in them,
+    files added to a tree afterwards need to be registered with add_files.
+    The architecture of candidates is only determined when they are
+    looked up.
+    """
+
+    def __init__(self, *, elf_file_cache: ElfFileCache = None) -> None:
+        """Initialize an index for sonames.
+
+        :param ElfFileCache elf_file_cache: a cache of previously extracted
+                                            elf file data.
+        """
+        self._elf_file_cache = elf_file_cache
+        self._trees = dict()  # type: Dict[str, Dict[str, List[str]]]
+        self._arches = dict()  # type: Dict[str, Optional[ElfArchitectureTuple]]
+
+    def _get_tree(self, root: str) -> Dict[str, List[str]]:
+        with contextlib.suppress(KeyError):
+            return self._trees[root]
+
+        logger.debug("Indexing {!r} to find sonames".format(root))
+        tree = dict()  # type: Dict[str, List[str]]
+        for directory, _, files in os.walk(root):
+            for file_name in files:
+                tree.setdefault(file_name, []).append(
+                    os.path.join(directory, file_name)
+                )
+
+        self._trees[root] = tree
+        return tree
+
+    def add_files(self, root: str, file_list: Sequence[str]) -> None:
+        """Register files that were added to, or replaced in, root.
+
+        :param str root: the root of the tree the files were added to.
+        :param file_list: the paths to the files relative to root.
+        """
+        tree = self._trees.get(root)
+        for relative_path in file_list:
+            path = os.path.join(root, relative_path)
+            self._arches.pop(path, None)
+            # Trees that have not been indexed yet will pick it up when they
+            # are.
+            if tree is None:
+                continue
+            paths = tree.setdefault(os.path.basename(path), [])
+            if path not in paths:
+                paths.append(path)
+
+    def find(
+        self, *, soname: str, arch: ElfArchitectureTuple, root: str
+    ) -> Optional[str]:
+        """Return the path to a library for arch named soname within root."""
+        if not os.path.exists(root):
+            return None
+
+        for path in self._get_tree(root).get(soname, []):
+            # Files may have been removed since the tree was indexed.
+            if os.path.isfile(path) and self._get_arch(path) == arch:
+                return path
+
+        return None
+
+    def _get_arch(self, path: str) -> Optional[ElfArchitectureTuple]:
+        with contextlib.suppress(KeyError):
+            return self._arches[path]
+
+        if self._elf_file_cache is not None:
+            is_elf = self._elf_file_cache.is_elf(path)
+        else:
+            is_elf = ElfFile.is_elf(path)
+
+        arch = None  # type: Optional[ElfArchitectureTuple]
+        if is_elf:
+            arch = ElfFile(path=path, elf_file_cache=self._elf_file_cache).arch
+        self._arches[path] = arch
+        return arch
+
+
+def _find_path(
     *,
     soname: str,
     root_path: str,
     core_base_path: str,
     arch: ElfArchitectureTuple,
-    soname_cache: SonameCache
+    soname_cache: SonameCache,
+    soname_index: SonameIndex
 ) -> str:
     # Speed things up and return what was already found once.
     if (arch, soname) in soname_cache:
         return soname_cache[arch, soname]
 
-    logger.debug("Crawling to find soname {!r}".format(soname))
+    logger.debug("Looking up soname {!r}".format(soname))
     for path in (root_path, core_base_path):
-        if not os.path.exists(path):
-            continue
-        for root, directories, files in os.walk(path):
-            for file_name in files:
-                if file_name == soname:
-                    file_path = os.path.join(root, file_name)
-                    if ElfFile.is_elf(file_path):
-                        # We found a match by name, anyway. Let's verify that
-                        # the architecture is the one we want.
-                        elf_file = ElfFile(path=file_path)
-                        if elf_file.arch == arch:
-                            soname_cache[arch, soname] = file_path
-                            return file_path
+        file_path = soname_index.find(soname=soname, arch=arch, root=path)
+        if file_path:
+            soname_cache[arch, soname] = file_path
+            return file_path
 
     # If not found we cache it too
     soname_cache[arch, soname] = None
@@ -205,19 +433,29 @@ class ElfFile:
         with open(path, "rb") as bin_file:
             return bin_file.read(4) == b"\x7fELF"
 
-    def __init__(self, *, path: str) -> None:
+    def __init__(self, *, path: str, elf_file_cache: ElfFileCache = None) -> None:
         """Initialize an ElfFile instance.
 
         :param str path: path to an elf_file within a snapcraft project.
+        :param ElfFileCache elf_file_cache: a cache of previously extracted
+                                            elf file data.
         """
         self.path = path
         self.dependencies = set()  # type: Set[Library]
-        elf_data = self._extract(path)
+        elf_data = None  # type: Optional[ElfDataTuple]
+        if elf_file_cache is not None:
+            elf_data = elf_file_cache.get(path)
+        if elf_data is None:
+            elf_data = self._extract(path)
+            if elf_file_cache is not None:
+                elf_file_cache.add(path, elf_data)
         self.arch = elf_data[0]
         self.interp = elf_data[1]
         self.soname = elf_data[2]
         self.needed = elf_data[3]
         self.execstack_set = elf_data[4]
+        self.rpaths = elf_data[5]
+        self.runpaths = elf_data[6]
 
     def _extract(self, path: str) -> ElfDataTuple:  # noqa: C901
         arch = None  # type: ElfArchitectureTuple
@@ -225,6 +463,8 @@ class ElfFile:
         soname = str()
         libs = dict()
         execstack_set = False
+        rpaths = list()  # type: List[str]
+        runpaths = list()  # type: List[str]
 
         with open(path, "rb") as fp:
             elf = elftools.elf.elffile.ELFFile(fp)
@@ -261,6 +501,10 @@ class ElfFile:
                     libs[needed] = NeededLibrary(name=needed)
                 for tag in dynamic_section.iter_tags("DT_SONAME"):
                     soname = _ensure_str(tag.soname)
+                for tag in dynamic_section.iter_tags("DT_RPATH"):
+                    rpaths.extend(_ensure_str(tag.rpath).split(":"))
+                for tag in dynamic_section.iter_tags("DT_RUNPATH"):
+                    runpaths.extend(_ensure_str(tag.runpath).split(":"))
 
             verneed_section = elf.get_section_by_name(_GNU_VERSION_R)
             if (
@@ -287,7 +531,7 @@ class ElfFile:
                     if mode & elftools.elf.constants.P_FLAGS.PF_X:
                         execstack_set = True
 
-        return arch, interp, soname, libs, execstack_set
+        return arch, interp, soname, libs, execstack_set, rpaths, runpaths
 
     def is_linker_compatible(self, *, linker_version: str) -> bool:
         """Determines if linker will work given the required glibc version."""
@@ -319,7 +563,13 @@ class ElfFile:
         return version_required
 
     def load_dependencies(
-        self, root_path: str, core_base_path: str, soname_cache: SonameCache = None
+        self,
+        root_path: str,
+        core_base_path: str,
+        soname_cache: SonameCache = None,
+        *,
+        dependency_resolver: "DependencyResolver" = None,
+        soname_index: SonameIndex = None
     ) -> Set[str]:
         """Load the set of libraries that are needed to satisfy elf's runtime.
 
@@ -331,54 +581,261 @@ class ElfFile:
                                    dependencies.
         :param SonameCache soname_cache: a cache of previously search
                                          dependencies.
+        :param DependencyResolver dependency_resolver: the resolver to use
+            to find the libraries, sharing one across elf files avoids
+            resolving the same libraries again.
+        :param SonameIndex soname_index: an index of the files in root_path
+                                         and core_base_path.
         :returns: a set of string with paths to the library dependencies of
                   elf.
         """
         if soname_cache is None:
             soname_cache = SonameCache()
+        if dependency_resolver is None:
+            dependency_resolver = DependencyResolver(
+                root_path=root_path, core_base_path=core_base_path
+            )
+        if soname_index is None:
+            soname_index = SonameIndex()
 
         logger.debug("Getting dependencies for {!r}".format(self.path))
-        ldd_out = []  # type: List[str]
-        try:
-            # ldd output sample:
-            # /lib64/ld-linux-x86-64.so.2 (0x00007fb3c5298000)
-            # libm.so.6 => /lib/x86_64-linux-gnu/libm.so.6 (0x00007fb3bef03000)
-            ldd_out = common.run_output(["ldd", self.path]).split("\n")
-        except subprocess.CalledProcessError:
-            logger.warning(
-                "Unable to determine library dependencies for {!r}".format(self.path)
-            )
-            return set()
-        ldd_out_split = [l.split() for l in ldd_out]
         libs = set()
-        for ldd_line in ldd_out_split:
-            if len(ldd_line) > 2:
-                libs.add(
-                    Library(
-                        soname=ldd_line[0],
-                        path=ldd_line[2],
-                        root_path=root_path,
-                        core_base_path=core_base_path,
-                        arch=self.arch,
-                        soname_cache=soname_cache,
-                    )
+        for soname, path in dependency_resolver.resolve(self).items():
+            libs.add(
+                Library(
+                    soname=soname,
+                    path=path,
+                    root_path=root_path,
+                    core_base_path=core_base_path,
+                    arch=self.arch,
+                    soname_cache=soname_cache,
+                    soname_index=soname_index,
                 )
+            )
 
         self.dependencies = libs
 
         # Return a set useful only for fetching libraries from the host
         library_paths = set()  # type: Set[str]
         for l in libs:
-            if os.path.exists(l.path) and not l.in_base_snap and not l.system_lib:
+            if not l.path or l.in_base_snap or l.system_lib:
+                continue
+            if os.path.exists(l.path):
                 library_paths.add(l.path)
         return library_paths
 
 
+_SonameLookupKey = Tuple[ElfArchitectureTuple, str, Tuple[str, ...], Tuple[str, ...]]
+_ClosureKey = Tuple[str, Tuple[str, ...]]
+
+
+# The dynamic linker shows up in DT_NEEDED for libc, but it is the
+# interpreter and not a library to be found.
+_DYNAMIC_LINKER_SONAME = re.compile(r"^ld(64|-linux[\w-]*)\.so\.\d+$")
+
+
+class DependencyResolver:
+    """Find the libraries ELF files need the way the dynamic linker would.
+
+    Libraries are looked up using the RPATH and RUNPATH of the ELF files
+    together with the library paths of root_path and core_base_path, as
+    they would be set at runtime, falling back to the host's library
+    paths. Every lookup is remembered so that each library is only parsed
+    and resolved once.
+    """
+
+    def __init__(
+        self,
+        *,
+        root_path: str,
+        core_base_path: str,
+        elf_file_cache: ElfFileCache = None
+    ) -> None:
+        """Initialize a DependencyResolver.
+
+        :param str root_path: the root path of the snap tree.
+        :param str core_base_path: the path to the core base.
+        :param ElfFileCache elf_file_cache: a cache of previously extracted
+                                            elf file data.
+        """
+        self._elf_file_cache = elf_file_cache
+        self._library_paths = _get_library_paths(root_path) + _get_library_paths(
+            core_base_path
+        )
+        self._host_library_paths = _get_host_library_paths()
+        self._elf_files = dict()  # type: Dict[str, Optional[ElfFile]]
+        self._soname_paths = dict()  # type: Dict[_SonameLookupKey, str]
+        self._closures = dict()  # type: Dict[_ClosureKey, Dict[str, str]]
+
+    def resolve(self, elf_file: "ElfFile") -> Dict[str, str]:
+        """Return the path to every library elf_file needs, directly or not.
+
+        :param ElfFile elf_file: the elf file to resolve the libraries for.
+        :returns: a dictionary of sonames to paths, the path is empty for
+                  libraries that could not be found.
+        """
+        return dict(self._get_closure(elf_file, ()))
+
+    def _get_closure(
+        self, elf_file: "ElfFile", inherited_rpaths: Tuple[str, ...]
+    ) -> Dict[str, str]:
+        key = (elf_file.path, inherited_rpaths)
+        with contextlib.suppress(KeyError):
+            return self._closures[key]
+
+        # Set before recursing to stop on dependency cycles.
+        closure = dict()  # type: Dict[str, str]
+        self._closures[key] = closure
+
+        origin = os.path.dirname(elf_file.path)
+        # The RPATH of an ELF file also applies to the libraries it loads,
+        # RUNPATH does not. An ELF file with a RUNPATH ignores every RPATH,
+        # its own and the inherited ones, but still passes the latter on.
+        if elf_file.runpaths:
+            rpaths = tuple()  # type: Tuple[str, ...]
+            dependency_rpaths = inherited_rpaths
+        else:
+            rpaths = _expand_origin(elf_file.rpaths, origin) + inherited_rpaths
+            dependency_rpaths = rpaths
+        runpaths = _expand_origin(elf_file.runpaths, origin)
+
+        dependencies = []
+        for soname in elf_file.needed:
+            if _DYNAMIC_LINKER_SONAME.match(soname) or soname in closure:
+                continue
+            path = self._find(soname, elf_file.arch, rpaths, runpaths)
+            closure[soname] = path
+            if path:
+                dependencies.append(self._elf_files[path])
+            else:
+                logger.debug(
+                    "Unable to find {!r} needed by {!r}".format(soname, elf_file.path)
+                )
+
+        for dependency in dependencies:
+            dependency_closure = self._get_closure(dependency, dependency_rpaths)
+            for soname, path in dependency_closure.items():
+                closure.setdefault(soname, path)
+
+        return closure
+
+    def _find(
+        self,
+        soname: str,
+        arch: ElfArchitectureTuple,
+        rpaths: Tuple[str, ...],
+        runpaths: Tuple[str, ...],
+    ) -> str:
+        key = (arch, soname, rpaths, runpaths)
+        with contextlib.suppress(KeyError):
+            return self._soname_paths[key]
+
+        if "/" in soname:
+            # Used as is, not searched for.
+            candidates = [soname]  # type: Sequence[str]
+        else:
+            candidates = [
+                os.path.join(library_path, soname)
+                for library_path in itertools.chain(
+                    rpaths, self._library_paths, runpaths, self._host_library_paths
+                )
+            ]
+
+        found_path = ""
+        for candidate in candidates:
+            elf_file = self._load(candidate)
+            # Libraries for other architectures are skipped, as the dynamic
+            # linker does.
+            if elf_file is not None and elf_file.arch == arch:
+                found_path = candidate
+                break
+
+        self._soname_paths[key] = found_path
+        return found_path
+
+    def _load(self, path: str) -> Optional["ElfFile"]:
+        with contextlib.suppress(KeyError):
+            return self._elf_files[path]
+
+        if self._elf_file_cache is not None:
+            is_elf = self._elf_file_cache.is_elf(path)
+        else:
+            is_elf = ElfFile.is_elf(path)
+
+        elf_file = None  # type: Optional[ElfFile]
+        if is_elf:
+            try:
+                elf_file = ElfFile(path=path, elf_file_cache=self._elf_file_cache)
+            except ELFError as error:
+                # Skipped, as the dynamic linker would, rather than failing
+                # on a broken library that might not even be the one needed.
+                logger.debug("Skipping unparsable {!r}: {}".format(path, error))
+        self._elf_files[path] = elf_file
+        return elf_file
+
+
+def _expand_origin(paths: List[str], origin: str) -> Tuple[str, ...]:
+    return tuple(
+        p.replace("${ORIGIN}", origin).replace("$ORIGIN", origin) for p in paths if p
+    )
+
+
+def _get_library_paths(root: str) -> List[str]:
+    # These are the paths set in LD_LIBRARY_PATH for the snap at runtime,
+    # the architecture specific ones are found by checking the ELF header
+    # of what is found.
+    paths = [os.path.join(root, "lib"), os.path.join(root, "usr", "lib")]
+    for pattern in ("lib", "usr/lib"):
+        paths.extend(sorted(glob.glob(os.path.join(root, pattern, "*-linux-gnu*"))))
+    paths.extend(determine_ld_library_path(root))
+    return paths
+
+
+_host_library_paths = None  # type: List[str]
+
+
+def _get_host_library_paths() -> List[str]:
+    global _host_library_paths
+    if _host_library_paths is not None:
+        return _host_library_paths
+
+    paths = _read_ld_so_conf("/etc/ld.so.conf")
+    # The trusted directories, always searched last.
+    paths.extend(["/lib", "/usr/lib", "/lib64", "/usr/lib64"])
+    _host_library_paths = paths
+
+    return _host_library_paths
+
+
+def _read_ld_so_conf(ld_conf_file: str) -> List[str]:
+    if not os.path.isfile(ld_conf_file):
+        return []
+
+    paths = []  # type: List[str]
+    entries = iter(_extract_ld_library_paths(ld_conf_file))
+    for entry in entries:
+        if entry == "include":
+            pattern = next(entries, "")
+            if not os.path.isabs(pattern):
+                pattern = os.path.join(os.path.dirname(ld_conf_file), pattern)
+            for included_file in sorted(glob.glob(pattern)):
+                paths.extend(_read_ld_so_conf(included_file))
+        elif os.path.isabs(entry):
+            paths.append(entry)
+
+    return paths
+
+
 class Patcher:
     """Patcher holds the necessary logic to patch elf files."""
 
     def __init__(
-        self, *, dynamic_linker: str, root_path: str, preferred_patchelf_path=None
+        self,
+        *,
+        dynamic_linker: str,
+        root_path: str,
+        preferred_patchelf_path=None,
+        work_dir: str = None
     ) -> None:
         """Create a Patcher instance.
 
@@ -388,9 +845,13 @@ class Patcher:
                               if use of $ORIGIN is possible.
         :param str preferred_patchelf_path: patch the necessary elf_files with
                                         this patchelf.
+        :param str work_dir: the directory to patch copies of the elf files
+                             in, ideally on the same filesystem as them. If
+                             not set, the copies are made next to each file.
         """
         self._dynamic_linker = dynamic_linker
         self._root_path = root_path
+        self._work_dir = work_dir
 
         if preferred_patchelf_path:
             self._patchelf_cmd = preferred_patchelf_path
@@ -411,33 +872,41 @@ class Patcher:
             raised when the elf_file cannot be patched.
         """
         patchelf_args = []
-        if elf_file.interp:
+        if elf_file.interp and elf_file.interp != self._dynamic_linker:
             patchelf_args.extend(["--set-interpreter", self._dynamic_linker])
+        # Due to https://github.com/NixOS/patchelf/issues/94 we need
+        # to first clear the current RUNPATH for --force-rpath to work.
+        remove_rpath = False
         if elf_file.dependencies:
             rpath = self._get_rpath(elf_file)
-            # Due to https://github.com/NixOS/patchelf/issues/94 we need
-            # to first clear the current rpath
-            self._run_patchelf(
-                patchelf_args=["--remove-rpath"], elf_file_path=elf_file.path
-            )
-            # Parameters:
-            # --force-rpath: use RPATH instead of RUNPATH.
-            # --shrink-rpath: will remove unneeded entries, with the
-            #                 side effect of preferring host libraries
-            #                 so we simply do not use it.
-            # --set-rpath: set the RPATH to the colon separated argument.
-            patchelf_args.extend(["--force-rpath", "--set-rpath", rpath])
+            if elf_file.runpaths or ":".join(elf_file.rpaths) != rpath:
+                remove_rpath = bool(elf_file.runpaths)
+                # Parameters:
+                # --force-rpath: use RPATH instead of RUNPATH.
+                # --shrink-rpath: will remove unneeded entries, with the
+                #                 side effect of preferring host libraries
+                #                 so we simply do not use it.
+                # --set-rpath: set the RPATH to the colon separated argument.
+                patchelf_args.extend(["--force-rpath", "--set-rpath", rpath])
 
         # no patchelf_args means there is nothing to do.
         if not patchelf_args:
             return
 
-        self._run_patchelf(patchelf_args=patchelf_args, elf_file_path=elf_file.path)
+        self._run_patchelf(
+            patchelf_args=patchelf_args,
+            elf_file_path=elf_file.path,
+            remove_rpath=remove_rpath,
+        )
 
-    def _run_patchelf(self, *, patchelf_args: List[str], elf_file_path: str) -> None:
+    def _run_patchelf(
+        self, *, patchelf_args: List[str], elf_file_path: str, remove_rpath: bool
+    ) -> None:
         try:
             return self._do_run_patchelf(
-                patchelf_args=patchelf_args, elf_file_path=elf_file_path
+                patchelf_args=patchelf_args,
+                elf_file_path=elf_file_path,
+                remove_rpath=remove_rpath,
             )
         except errors.PatcherError as patch_error:
             # This is needed for patchelf to properly work with
@@ -466,57 +935,92 @@ class Patcher:
                 )
                 raise patch_error
             return self._do_run_patchelf(
-                patchelf_args=patchelf_args, elf_file_path=elf_file_path
+                patchelf_args=patchelf_args,
+                elf_file_path=elf_file_path,
+                remove_rpath=remove_rpath,
             )
 
-    def _do_run_patchelf(self, *, patchelf_args: List[str], elf_file_path: str) -> None:
-        # Run patchelf on a copy of the primed file and replace it
+    def _do_run_patchelf(
+        self, *, patchelf_args: List[str], elf_file_path: str, remove_rpath: bool
+    ) -> None:
+        # Run patchelf on a copy of the primed file and move it in place
         # after it is successful. This allows us to break the potential
         # hard link created when migrating the file across the steps of
-        # the part.
-        with tempfile.NamedTemporaryFile() as temp_file:
-            shutil.copy2(elf_file_path, temp_file.name)
-
-            cmd = [self._patchelf_cmd] + patchelf_args + [temp_file.name]
+        # the part. The copy is kept out of the primed tree, so that nothing
+        # can be left behind in it, but on the same filesystem so that moving
+        # it does not require copying it again.
+        if self._work_dir:
+            work_dir = self._work_dir
+            os.makedirs(work_dir, exist_ok=True)
+        else:
+            work_dir = os.path.dirname(elf_file_path)
+        with tempfile.NamedTemporaryFile(
+            dir=work_dir, prefix=".patchelf-", delete=False
+        ) as temp_file:
+            temp_file_path = temp_file.name
+        try:
+            file_utils.copy2(elf_file_path, temp_file_path)
+            self._call_patchelf(
+                patchelf_args=patchelf_args,
+                elf_file_path=elf_file_path,
+                temp_file_path=temp_file_path,
+                remove_rpath=remove_rpath,
+            )
             try:
+                os.replace(temp_file_path, elf_file_path)
+            except OSError as error:
+                if error.errno != errno.EXDEV:
+                    raise
+                # The work directory is on another filesystem after all,
+                # unlink first so that a hard link is not written through.
+                os.unlink(elf_file_path)
+                file_utils.copy2(temp_file_path, elf_file_path)
+        finally:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(temp_file_path)
+
+    def _call_patchelf(
+        self,
+        *,
+        patchelf_args: List[str],
+        elf_file_path: str,
+        temp_file_path: str,
+        remove_rpath: bool
+    ) -> None:
+        cmds = [[self._patchelf_cmd] + patchelf_args + [temp_file_path]]
+        if remove_rpath:
+            cmds.insert(0, [self._patchelf_cmd, "--remove-rpath", temp_file_path])
+        try:
+            for cmd in cmds:
                 subprocess.check_call(cmd)
-            # There is no need to catch FileNotFoundError as patchelf should be
-            # bundled with snapcraft which means its lack of existence is a
-            # "packager" error.
-            except subprocess.CalledProcessError as call_error:
-                patchelf_version = (
-                    subprocess.check_output([self._patchelf_cmd, "--version"])
-                    .decode()
-                    .strip()
+        # There is no need to catch FileNotFoundError as patchelf should be
+        # bundled with snapcraft which means its lack of existence is a
+        # "packager" error.
+        except subprocess.CalledProcessError as call_error:
+            patchelf_version = (
+                subprocess.check_output([self._patchelf_cmd, "--version"])
+                .decode()
+                .strip()
+            )
+            # 0.10 is the version where patching certain binaries will
+            # work (currently known affected packages are mostly built
+            # with go).
+            if parse_version(patchelf_version) < parse_version("0.10"):
+                raise errors.PatcherNewerPatchelfError(
+                    elf_file=elf_file_path,
+                    process_exception=call_error,
+                    patchelf_version=patchelf_version,
+                )
+            else:
+                raise errors.PatcherGenericError(
+                    elf_file=elf_file_path, process_exception=call_error
                 )
-                # 0.10 is the version where patching certain binaries will
-                # work (currently known affected packages are mostly built
-                # with go).
-                if parse_version(patchelf_version) < parse_version("0.10"):
-                    raise errors.PatcherNewerPatchelfError(
-                        elf_file=elf_file_path,
-                        process_exception=call_error,
-                        patchelf_version=patchelf_version,
-                    )
-                else:
-                    raise errors.PatcherGenericError(
-                        elf_file=elf_file_path, process_exception=call_error
-                    )
-
-            # We unlink to break the potential hard link
-            os.unlink(elf_file_path)
-            shutil.copy2(temp_file.name, elf_file_path)
-
-    def _get_existing_rpath(self, elf_file_path):
-        output = subprocess.check_output(
-            [self._patchelf_cmd, "--print-rpath", elf_file_path]
-        )
-        return output.decode().strip().split(":")
 
     def _get_rpath(self, elf_file) -> str:
         origin_rpaths = list()  # type: List[str]
         base_rpaths = set()  # type: Set[str]
-        existing_rpaths = self._get_existing_rpath(elf_file.path)
+        # This is what patchelf --print-rpath would return.
+        existing_rpaths = elf_file.runpaths or elf_file.rpaths
 
         for dependency in elf_file.dependencies:
             if dependency.path:
@@ -540,7 +1044,7 @@ class Patcher:
             origin_rpaths = existing_rpaths + origin_rpaths
 
         origin_paths = ":".join((r for r in origin_rpaths if r))
-        core_base_rpaths = ":".join(base_rpaths)
+        core_base_rpaths = ":".join(sorted(base_rpaths))
 
         if origin_paths and core_base_rpaths:
             return "{}:{}".format(origin_paths, core_base_rpaths)
@@ -618,13 +1122,22 @@ def _get_system_libs() -> FrozenSet[str]:
     return _libraries
 
 
-def get_elf_files(root: str, file_list: Sequence[str]) -> FrozenSet[ElfFile]:
+def get_elf_files(
+    root: str, file_list: Sequence[str], elf_file_cache: ElfFileCache = None
+) -> FrozenSet[ElfFile]:
     """Return a frozenset of elf files from file_list prepended with root.
 
     :param str root: the root directory from where the file_list is generated.
     :param file_list: a list of file in root.
+    :param ElfFileCache elf_file_cache: a cache of previously extracted
+                                        elf file data.
     :returns: a frozentset of ElfFile objects.
     """
+    if elf_file_cache is None:
+        is_elf = ElfFile.is_elf
+    else:
+        is_elf = elf_file_cache.is_elf
+
     elf_files = set()  # type: Set[ElfFile]
 
     for part_file in file_list:
@@ -638,8 +1151,8 @@ def get_elf_files(root: str, file_list: Sequence[str]) -> FrozenSet[ElfFile]:
             logger.debug("Skipped link {!r} while finding dependencies".format(path))
             continue
         # Finally, make sure this is actually an ELF file
-        if ElfFile.is_elf(path):
-            elf_file = ElfFile(path=path)
+        if is_elf(path):
+            elf_file = ElfFile(path=path, elf_file_cache=elf_file_cache)
             # if we have dyn symbols we are dynamic
             if elf_file.needed:
                 elf_files.add(elf_file)
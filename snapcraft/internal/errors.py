@@ -638,6 +638,17 @@ class StepHasNotRunError(SnapcraftError):
         super().__init__(part_name=part_name, step=step)
 
 
+class PartWorkerError(SnapcraftError):
+    fmt = (
+        "Failed to run the {step.name!r} step for {part_name!r}: {message}\n"
+        "Check the output prefixed with {part_name!r} above for details, or "
+        "run again with `--jobs 1` to process one part at a time."
+    )
+
+    def __init__(self, *, part_name, step, message):
+        super().__init__(part_name=part_name, step=step, message=message)
+
+
 class NoLatestStepError(SnapcraftError):
     fmt = "The {part_name!r} part hasn't run any steps"
 
@@ -19,6 +19,9 @@ import sys
 from urllib.request import urlretrieve
 from progressbar import AnimatedMarker, Bar, Percentage, ProgressBar, UnknownLength
 
+# Large reads and writes keep the overhead per chunk low for big downloads.
+_DOWNLOAD_CHUNK_SIZE = 2 ** 20
+
 
 def _init_progress_bar(total_length, destination, message=None):
     if not message:
@@ -42,8 +45,14 @@ def _init_progress_bar(total_length, destination, message=None):
     return ProgressBar(widgets=widgets, maxval=maxval)
 
 
-def download_requests_stream(request_stream, destination, message=None, total_read=0):
-    """This is a facility to download a request with nice progress bars."""
+def download_requests_stream(
+    request_stream, destination, message=None, total_read=0, *, hasher=None
+):
+    """This is a facility to download a request with nice progress bars.
+
+    If hasher (e.g. a hashlib object) is given, it is updated with everything
+    written to destination, saving a read of the whole file to verify it.
+    """
 
     # Doing len(request_stream.content) may defeat the purpose of a
     # progress bar
@@ -61,16 +70,26 @@ def download_requests_stream(request_stream, destination, message=None, total_re
 
     if os.path.exists(destination):
         mode = "ab"
+        if hasher is not None:
+            _update_hasher(hasher, destination)
     else:
         mode = "wb"
     with open(destination, mode) as destination_file:
-        for buf in request_stream.iter_content(1024):
+        for buf in request_stream.iter_content(_DOWNLOAD_CHUNK_SIZE):
             destination_file.write(buf)
+            if hasher is not None:
+                hasher.update(buf)
             total_read += len(buf)
             progress_bar.update(total_read)
     progress_bar.finish()
 
 
+def _update_hasher(hasher, path):
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(_DOWNLOAD_CHUNK_SIZE), b""):
+            hasher.update(buf)
+
+
 class UrllibDownloader(object):
     """This is a facility to download an uri with nice progress bars."""
 
@@ -18,5 +18,6 @@ from ._containers import cleanbuild  # noqa
 from ._containers import containerbuild  # noqa
 from ._init import init, get_init_data  # noqa
 from ._packer import pack  # noqa
+from ._packer import COMPRESSIONS, STORE_COMPRESSION  # noqa
 from ._runner import execute  # noqa
 from ._status_cache import StatusCache  # noqa
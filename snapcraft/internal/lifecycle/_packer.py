@@ -14,9 +14,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import logging
+import multiprocessing
 import os
 import time
-from subprocess import Popen, PIPE, STDOUT
+from subprocess import Popen, PIPE, STDOUT, TimeoutExpired
 
 from progressbar import AnimatedMarker, ProgressBar
 
@@ -27,6 +28,17 @@ from snapcraft.internal.indicators import is_dumb_terminal
 
 logger = logging.getLogger(__name__)
 
+# The compression snaps are packed with by default, which is what snaps
+# released to the store are expected to use.
+STORE_COMPRESSION = "xz"
+# lzo packs much faster than xz, at the expense of a larger snap, and is
+# meant for local iterations.
+COMPRESSIONS = (STORE_COMPRESSION, "lzo")
+
+# mksquashfs's default block size, set explicitly so that snaps do not depend
+# on the version of mksquashfs they were packed with.
+_BLOCK_SIZE = 128 * 1024
+
 
 def _snap_data_from_dir(directory):
     with open(os.path.join(directory, "meta", "snap.yaml")) as f:
@@ -40,11 +52,46 @@ def _snap_data_from_dir(directory):
     }
 
 
-def pack(directory, output=None):
+def _get_default_processors() -> int:
+    try:
+        return multiprocessing.cpu_count()
+    except NotImplementedError:
+        return 1
+
+
+def _get_directory_size(directory: str) -> int:
+    size = 0
+    for root, directories, files in os.walk(directory):
+        for file_name in files:
+            try:
+                size += os.lstat(os.path.join(root, file_name)).st_size
+            except OSError:
+                pass
+    return size
+
+
+def pack(directory, output=None, *, compression: str = None, processors: int = None):
+    """Pack directory into a snap.
+
+    :param str directory: the directory holding the snap, with meta/snap.yaml.
+    :param str output: the path to the snap, derived from snap.yaml (and the
+                       compression, unless it is STORE_COMPRESSION) if None.
+    :param str compression: one of COMPRESSIONS, STORE_COMPRESSION if None.
+    :param int processors: the number of processors mksquashfs is to use, all
+                           of them if None.
+    :returns: the path to the snap.
+    """
+    if compression is None:
+        compression = STORE_COMPRESSION
+    elif compression not in COMPRESSIONS:
+        raise ValueError("unsupported compression {!r}".format(compression))
+    if processors is None:
+        processors = _get_default_processors()
+
     mksquashfs_path = file_utils.get_tool_path("mksquashfs")
 
     snap = _snap_data_from_dir(directory)
-    output_snap_name = output or common.format_snap_name(snap)
+    output_snap_name = output or _get_default_output(snap, compression)
 
     # If a .snap-build exists at this point, when we are about to override
     # the snap blob, it is stale. We rename it so user have a chance to
@@ -55,23 +102,84 @@ def pack(directory, output=None):
         logger.warning("Renaming stale build assertion to {}".format(_new))
         os.rename(snap_build, _new)
 
+    if compression != STORE_COMPRESSION:
+        logger.warning(
+            "Packing {!r} with {} compression, which is meant for local use. "
+            "Snaps for the store should be packed with the default {} "
+            "compression.".format(output_snap_name, compression, STORE_COMPRESSION)
+        )
+
+    start_time = time.monotonic()
     _run_mksquashfs(
         mksquashfs_path,
         directory=directory,
         snap_name=snap["name"],
         snap_type=snap["type"],
         output_snap_name=output_snap_name,
+        compression=compression,
+        processors=processors,
+    )
+    _report(
+        directory=directory,
+        output_snap_name=output_snap_name,
+        elapsed_time=time.monotonic() - start_time,
     )
 
     return output_snap_name
 
 
+def _get_default_output(snap, compression: str) -> str:
+    snap_name = common.format_snap_name(snap)
+    if compression == STORE_COMPRESSION:
+        return snap_name
+
+    # So that a snap meant for local use is not mistaken for one that can be
+    # pushed to the store.
+    return "{}.{}.snap".format(snap_name[: -len(".snap")], compression)
+
+
+def _report(*, directory: str, output_snap_name: str, elapsed_time: float) -> None:
+    input_size = _get_directory_size(directory)
+    try:
+        output_size = os.path.getsize(output_snap_name)
+    except OSError:
+        # There is nothing to report on without a snap.
+        return
+
+    mebibyte = 1024 * 1024
+    logger.info(
+        "Packed {:.1f} MiB into {:.1f} MiB in {:.1f}s ({:.1f} MiB/s).".format(
+            input_size / mebibyte,
+            output_size / mebibyte,
+            elapsed_time,
+            input_size / mebibyte / max(elapsed_time, 0.001),
+        )
+    )
+
+
 def _run_mksquashfs(
-    mksquashfs_command, *, directory, snap_name, snap_type, output_snap_name
+    mksquashfs_command,
+    *,
+    directory,
+    snap_name,
+    snap_type,
+    output_snap_name,
+    compression,
+    processors
 ):
     # These options need to match the review tools:
     # http://bazaar.launchpad.net/~click-reviewers/click-reviewers-tools/trunk/view/head:/clickreviews/common.py#L38
-    mksquashfs_args = ["-noappend", "-comp", "xz", "-no-xattrs", "-no-fragments"]
+    mksquashfs_args = [
+        "-noappend",
+        "-comp",
+        compression,
+        "-no-xattrs",
+        "-no-fragments",
+        "-b",
+        str(_BLOCK_SIZE),
+        "-processors",
+        str(processors),
+    ]
     if snap_type not in ("os", "base"):
         mksquashfs_args.append("-all-root")
 
@@ -82,10 +190,9 @@ def _run_mksquashfs(
     ] + mksquashfs_args
 
     with Popen(complete_command, stdout=PIPE, stderr=STDOUT) as proc:
-        ret = None
         if is_dumb_terminal():
             logger.info("Snapping {!r} ...".format(snap_name))
-            ret = proc.wait()
+            output, _ = proc.communicate()
         else:
             message = "\033[0;32m\rSnapping {!r}\033[0;32m ".format(snap_name)
             progress_indicator = ProgressBar(
@@ -93,20 +200,23 @@ def _run_mksquashfs(
             )
             progress_indicator.start()
 
-            ret = proc.poll()
             count = 0
-
-            while ret is None:
+            while True:
+                # Waiting on the output, rather than sleeping, also keeps
+                # mksquashfs from blocking on a full pipe.
+                try:
+                    output, _ = proc.communicate(timeout=.2)
+                    break
+                except TimeoutExpired:
+                    pass
                 if count >= 7:
                     progress_indicator.start()
                     count = 0
                 progress_indicator.update(count)
                 count += 1
-                time.sleep(.2)
-                ret = proc.poll()
         print("")
-        if ret != 0:
-            logger.error(proc.stdout.read().decode("utf-8"))
+        if proc.returncode != 0:
+            logger.error(output.decode("utf-8"))
             raise RuntimeError("Failed to create snap {!r}".format(output_snap_name))
 
-        logger.debug(proc.stdout.read().decode("utf-8"))
+        logger.debug(output.decode("utf-8"))
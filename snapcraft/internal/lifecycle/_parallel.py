@@ -0,0 +1,196 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import logging
+import multiprocessing
+import multiprocessing.connection
+import os
+import pickle
+import sys
+import tempfile
+from typing import Callable, Dict, List, Tuple  # noqa: F401
+
+from snapcraft.internal import errors, steps
+
+
+logger = logging.getLogger(__name__)
+
+
+# Parts are run in forked processes rather than threads: plugins share the
+# module level environment in snapcraft.internal.common and freely modify
+# their own state, neither of which is safe to do concurrently.
+_context = multiprocessing.get_context("fork")
+
+_STDOUT_FILENO = 1
+_STDERR_FILENO = 2
+
+
+class _PartWorker:
+    def __init__(self, *, part_name: str, step: steps.Step, target: Callable) -> None:
+        self.part_name = part_name
+        self._step = step
+        self._target = target
+        self._reader, self._writer = _context.Pipe(duplex=False)
+        self._output = tempfile.TemporaryFile()
+        self._process = _context.Process(target=self._run, name=part_name)
+
+    @property
+    def connection(self):
+        return self._reader
+
+    def start(self) -> None:
+        # Anything still buffered would otherwise be written twice, once by
+        # each process.
+        sys.stdout.flush()
+        sys.stderr.flush()
+        self._process.start()
+        self._writer.close()
+
+    def _run(self) -> None:
+        self._reader.close()
+        # Everything this part writes, including the output of the commands
+        # its plugin spawns, is kept aside and replayed in one block once the
+        # part is done so that output from concurrent parts does not mix.
+        os.dup2(self._output.fileno(), _STDOUT_FILENO)
+        os.dup2(self._output.fileno(), _STDERR_FILENO)
+        try:
+            result = (True, self._target(), None)
+        except Exception as exception:
+            result = (False, _get_transferable(exception), str(exception))
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        self._writer.send(result)
+
+    def join(self) -> Tuple[bool, object]:
+        try:
+            succeeded, value, message = self._reader.recv()
+        except EOFError:
+            succeeded, value, message = False, None, None
+        finally:
+            self._reader.close()
+            self._process.join()
+
+        if message is None and not succeeded:
+            # The exit code is only known once the process has been joined.
+            message = "worker exited with code {}".format(self._process.exitcode)
+
+        self._replay_output()
+        if isinstance(value, _TransferredError):
+            value = value.recreate()
+        if not succeeded and value is None:
+            value = errors.PartWorkerError(
+                part_name=self.part_name, step=self._step, message=message
+            )
+        return succeeded, value
+
+    def _replay_output(self) -> None:
+        prefix = "{} | ".format(self.part_name)
+        with self._output:
+            self._output.seek(0)
+            for line in self._output:
+                sys.stdout.write(prefix + line.decode(errors="replace"))
+        sys.stdout.flush()
+
+
+class _TransferredError:
+    """What is needed to recreate an error that cannot be unpickled as is."""
+
+    def __init__(self, exception: Exception) -> None:
+        self.error_class = type(exception)
+        self.args = exception.args
+        self.state = {
+            key: value for key, value in vars(exception).items() if _is_picklable(value)
+        }
+        self.message = str(exception)
+
+    def recreate(self) -> Exception:
+        # Unpickling calls __init__ with the positional arguments only, which
+        # errors taking keyword-only arguments (most of ours) do not accept.
+        # Restore the state without going through __init__ instead, and only
+        # trust the result if it formats as the original error did.
+        try:
+            error = self.error_class.__new__(self.error_class)
+            error.args = self.args
+            error.__dict__.update(self.state)
+            if str(error) == self.message:
+                return error
+        except Exception:
+            pass
+        return None
+
+
+def _is_picklable(value) -> bool:
+    try:
+        pickle.loads(pickle.dumps(value))
+    except Exception:
+        return False
+    return True
+
+
+def _get_transferable(exception: Exception):
+    if _is_picklable(exception):
+        return exception
+
+    transferred = _TransferredError(exception)
+    if _is_picklable(transferred):
+        return transferred
+    # Not every error can be recreated on the other end of the pipe, e.g. the
+    # ones defined locally, the formatted message is all that is left then.
+    return None
+
+
+def run_parts(
+    tasks: List[Tuple[str, Callable[[], bool]]], *, step: steps.Step, jobs: int
+) -> bool:
+    """Run each part's task in its own process, at most jobs at a time.
+
+    The output of each part is buffered and printed, prefixed with the part
+    name, as soon as that part is done. If a task fails no new ones are
+    started; the ones already running are waited for and the first error is
+    raised.
+
+    :param list tasks: (part name, callable) tuples, the callable returns
+                       whether a step was actually run.
+    :param step: the lifecycle step the tasks are running.
+    :param int jobs: the maximum number of parts to process at the same time.
+    :returns: True if any of the tasks ran a step.
+    """
+    pending = list(tasks)
+    running = dict()  # type: Dict[object, _PartWorker]
+    steps_were_run = False
+    failure = None  # type: Exception
+
+    while running or (pending and failure is None):
+        while pending and failure is None and len(running) < jobs:
+            part_name, target = pending.pop(0)
+            worker = _PartWorker(part_name=part_name, step=step, target=target)
+            logger.debug("Starting {} worker for {!r}".format(step.name, part_name))
+            worker.start()
+            running[worker.connection] = worker
+
+        for connection in multiprocessing.connection.wait(list(running)):
+            worker = running.pop(connection)
+            succeeded, value = worker.join()
+            if not succeeded:
+                failure = failure or value
+            elif value:
+                steps_were_run = True
+
+    if failure:
+        raise failure
+
+    return steps_were_run
@@ -14,11 +14,12 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import functools
 import logging
 import os
 from subprocess import check_call
 from tempfile import TemporaryDirectory
-from typing import Sequence
+from typing import Dict, Sequence  # noqa: F401
 
 import snapcraft
 from snapcraft import config
@@ -32,7 +33,8 @@ from snapcraft.internal import (
     states,
     steps,
 )
-from snapcraft.internal.cache import SnapCache
+from snapcraft.internal.cache import PackageManagerCache, SnapCache
+from ._parallel import run_parts
 from ._status_cache import StatusCache
 
 
@@ -86,8 +88,11 @@ def execute(
             project_config.project.deb_arch, project_config.data.get("base", "core")
         )
 
-    executor = _Executor(project_config)
-    executor.run(step, part_names)
+    executor = _Executor(project_config, jobs=project_config.project.jobs)
+    try:
+        executor.run(step, part_names)
+    finally:
+        executor.save_status()
     if not executor.steps_were_run:
         logger.warn(
             "The requested action has already been taken. Consider\n"
@@ -165,14 +170,21 @@ def _replace_in_part(part):
 
 
 class _Executor:
-    def __init__(self, project_config):
+    def __init__(self, project_config, *, jobs: int = 1) -> None:
         self.config = project_config
         self.project = project_config.project
         self.parts_config = project_config.parts
         self.steps_were_run = False
+        self._jobs = jobs
 
         self._cache = StatusCache(project_config)
 
+    def save_status(self) -> None:
+        self._cache.save()
+        # Saved once for all the parts primed rather than after each of them,
+        # the cache is written out as a whole.
+        self.parts_config.save_elf_file_cache()
+
     def run(self, step: steps.Step, part_names=None):
         if part_names:
             self.parts_config.validate(part_names)
@@ -190,11 +202,93 @@ class _Executor:
                     # XXX check only for collisions on the parts that have
                     # already been built --elopio - 20170713
                     pluginhandler.check_for_collisions(self.config.all_parts)
+                if self._jobs > 1 and current_step < steps.STAGE:
+                    self._handle_step_in_parallel(
+                        part_names, parts, step, current_step, cli_config
+                    )
+                    continue
                 for part in parts:
                     self._handle_step(part_names, part, step, current_step, cli_config)
 
         self._create_meta(step, processed_part_names)
 
+    def _handle_step_in_parallel(
+        self,
+        requested_part_names: Sequence[str],
+        parts: Sequence[pluginhandler.PluginHandler],
+        requested_step: steps.Step,
+        current_step: steps.Step,
+        cli_config,
+    ) -> None:
+        # Pulling and building only share files through the stage directory,
+        # so parts can be processed at the same time as long as everything
+        # they are after has been staged. That staging, and any part that has
+        # nothing left to do, is handled here in the main process.
+        for wave in _get_dependency_waves(parts, self.parts_config):
+            tasks = []
+            for part in wave:
+                if not self._step_will_run(
+                    requested_part_names, part, requested_step, current_step
+                ):
+                    self._handle_step(
+                        requested_part_names,
+                        part,
+                        requested_step,
+                        current_step,
+                        cli_config,
+                    )
+                    continue
+
+                self._stage_dependencies(step=current_step, part=part)
+                tasks.append(
+                    (
+                        part.name,
+                        functools.partial(
+                            self._handle_step_in_worker,
+                            requested_part_names,
+                            part,
+                            requested_step,
+                            current_step,
+                            cli_config,
+                        ),
+                    )
+                )
+
+            try:
+                if run_parts(tasks, step=current_step, jobs=self._jobs):
+                    self.steps_were_run = True
+            finally:
+                # The workers updated the state on disk, not our cache.
+                for part_name, _ in tasks:
+                    part = self.parts_config.get_part(part_name)
+                    for cleared_step in [current_step] + current_step.next_steps():
+                        self._cache.clear_step(part, cleared_step)
+
+    def _handle_step_in_worker(self, *args) -> bool:
+        # Dependencies have already been staged by the main process, a worker
+        # must never need to go back to running other parts.
+        self._jobs = 1
+        self.steps_were_run = False
+        self._handle_step(*args)
+        return self.steps_were_run
+
+    def _step_will_run(
+        self,
+        requested_part_names: Sequence[str],
+        part: pluginhandler.PluginHandler,
+        requested_step: steps.Step,
+        current_step: steps.Step,
+    ) -> bool:
+        # Mirrors the decisions taken in _handle_step
+        if (
+            requested_part_names
+            and current_step == requested_step
+            and part.name in requested_part_names
+        ):
+            return True
+
+        return self._cache.should_step_run(part, current_step)
+
     def _handle_step(
         self,
         requested_part_names: Sequence[str],
@@ -287,6 +381,23 @@ class _Executor:
 
     def _prepare_step(self, *, step: steps.Step, part: pluginhandler.PluginHandler):
         common.reset_env()
+        self._stage_dependencies(step=step, part=part)
+
+        # Run the preparation function for this step (if implemented)
+        preparation_function = getattr(part, "prepare_{}".format(step.name), None)
+        if preparation_function:
+            notify_part_progress(part, "Preparing to {}".format(step.name), debug=True)
+            preparation_function()
+
+        common.env = self.parts_config.build_env_for_part(part)
+        common.env.extend(self.config.project_env())
+        common.env.extend(PackageManagerCache().get_env())
+
+        part = _replace_in_part(part)
+
+    def _stage_dependencies(
+        self, *, step: steps.Step, part: pluginhandler.PluginHandler
+    ) -> None:
         all_dependencies = self.parts_config.get_dependencies(part.name)
 
         # Filter dependencies down to only those that need to run the
@@ -309,17 +420,6 @@ class _Executor:
             )
             self.run(prerequisite_step, dependency_names)
 
-        # Run the preparation function for this step (if implemented)
-        preparation_function = getattr(part, "prepare_{}".format(step.name), None)
-        if preparation_function:
-            notify_part_progress(part, "Preparing to {}".format(step.name), debug=True)
-            preparation_function()
-
-        common.env = self.parts_config.build_env_for_part(part)
-        common.env.extend(self.config.project_env())
-
-        part = _replace_in_part(part)
-
     def _run_step(self, *, step: steps.Step, part, progress, hint=""):
         self._prepare_step(step=step, part=part)
 
@@ -339,8 +439,9 @@ class _Executor:
         staged_state = self.config.get_project_state(steps.STAGE)
         primed_state = self.config.get_project_state(steps.PRIME)
 
-        # First clean the step, then run it again
-        part.clean(staged_state, primed_state, step)
+        # First clean the step, then run it again. Files that are migrated
+        # again are left in place and only replaced if they changed.
+        part.clean(staged_state, primed_state, step, keep_migrated=True)
 
         # Uncache this and later steps since we just cleaned them: their status
         # has changed
@@ -392,6 +493,29 @@ class _Executor:
             )
 
 
+def _get_dependency_waves(parts, parts_config):
+    """Group parts so that each one comes after the ones it depends on.
+
+    Dependencies that are not in parts do not delay a part; they are taken
+    care of while preparing its step.
+    """
+    part_names = {p.name for p in parts}
+    levels = dict()  # type: Dict[str, int]
+    # parts is already ordered so that dependencies come first
+    for part in parts:
+        dependency_levels = [
+            levels[p.name]
+            for p in parts_config.get_dependencies(part.name)
+            if p.name in part_names
+        ]
+        levels[part.name] = max(dependency_levels, default=-1) + 1
+
+    waves = [[] for _ in range(max(levels.values(), default=-1) + 1)]
+    for part in parts:
+        waves[levels[part.name]].append(part)
+    return waves
+
+
 def notify_part_progress(part, progress, hint="", debug=False):
     if debug:
         logger.debug("%s %s %s", progress, part.name, hint)
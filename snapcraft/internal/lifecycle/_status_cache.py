@@ -16,15 +16,93 @@
 
 import collections
 import contextlib
-from typing import Any, Dict, List, Set  # noqa: F401
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Set, Tuple  # noqa: F401
 
-from snapcraft.internal import errors, pluginhandler, steps
+from snapcraft.internal import errors, pluginhandler, states, steps
 import snapcraft.internal.project_loader._config as _config
 
+logger = logging.getLogger(__name__)
+
 _DirtyReport = Dict[str, Dict[steps.Step, pluginhandler.DirtyReport]]
 _OutdatedReport = Dict[str, Dict[steps.Step, pluginhandler.OutdatedReport]]
 
 
+class _StatusIndex:
+    """A persistent record of the steps found not to be dirty.
+
+    Telling whether a step is dirty means loading its state, so steps found
+    clean are recorded along with what that depends on: the stat data of the
+    state file and a digest of the part properties and project options it was
+    compared against. As long as neither changes, the state is not loaded
+    again.
+    """
+
+    _VERSION = 1
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._entries = dict()  # type: Dict[str, Dict[str, list]]
+        self._changed = False
+
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as index_file:
+                index_data = json.load(index_file)
+        except (OSError, ValueError) as error:
+            logger.debug("Ignoring unreadable index {!r}: {}".format(self._path, error))
+            return
+
+        if index_data.get("version") == self._VERSION:
+            self._entries = index_data.get("entries", dict())
+
+    def _get_key(
+        self, part: pluginhandler.PluginHandler, step: steps.Step
+    ) -> Optional[list]:
+        state_file = states.get_step_state_file(part.plugin.statedir, step)
+        try:
+            state_stat = os.stat(state_file)
+        except FileNotFoundError:
+            return None
+        return [
+            [state_stat.st_ino, state_stat.st_size, state_stat.st_mtime_ns],
+            part.get_dirty_report_digest(),
+        ]
+
+    def is_clean(self, part: pluginhandler.PluginHandler, step: steps.Step) -> bool:
+        entry = self._entries.get(part.name, dict()).get(step.name)
+        return entry is not None and entry == self._get_key(part, step)
+
+    def set_clean(
+        self, part: pluginhandler.PluginHandler, step: steps.Step, clean: bool
+    ) -> None:
+        key = self._get_key(part, step) if clean else None
+        if key is not None:
+            self._entries.setdefault(part.name, dict())[step.name] = key
+            self._changed = True
+        elif step.name in self._entries.get(part.name, dict()):
+            del self._entries[part.name][step.name]
+            self._changed = True
+
+    def save(self, part_names: List[str]) -> None:
+        for part_name in set(self._entries) - set(part_names):
+            del self._entries[part_name]
+            self._changed = True
+
+        if not self._changed:
+            return
+
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "w") as index_file:
+            json.dump({"version": self._VERSION, "entries": self._entries}, index_file)
+        self._changed = False
+
+
 class StatusCache:
     """The StatusCache is a lazy caching interface for the status of parts."""
 
@@ -37,6 +115,8 @@ class StatusCache:
         self._steps_run = dict()  # type: Dict[str, Set[steps.Step]]
         self._outdated_reports = collections.defaultdict(dict)  # type: _OutdatedReport
         self._dirty_reports = collections.defaultdict(dict)  # type: _DirtyReport
+        self._should_step_run = dict()  # type: Dict[Tuple[str, steps.Step], bool]
+        self._index = _StatusIndex(config.project._status_index_file)
 
     def should_step_run(
         self, part: pluginhandler.PluginHandler, step: steps.Step
@@ -55,18 +135,25 @@ class StatusCache:
             4. Either (1), (2), or (3) apply to any earlier steps in the part's
                lifecycle
         """
+        # Dependencies are shared between parts, so answers are remembered
+        # to visit each part and step of the graph just once.
+        with contextlib.suppress(KeyError):
+            return self._should_step_run[(part.name, step)]
+
         if (
             not self.has_step_run(part, step)
             or self.get_outdated_report(part, step) is not None
             or self.get_dirty_report(part, step) is not None
         ):
-            return True
+            should_step_run = True
+        else:
+            previous_step = step.previous_step()
+            should_step_run = bool(
+                previous_step and self.should_step_run(part, previous_step)
+            )
 
-        previous_step = step.previous_step()
-        if previous_step:
-            return self.should_step_run(part, previous_step)
-
-        return False
+        self._should_step_run[(part.name, step)] = should_step_run
+        return should_step_run
 
     def add_step_run(self, part: pluginhandler.PluginHandler, step: steps.Step) -> None:
         """Cache the fact that a given step has now run for the given part.
@@ -76,6 +163,7 @@ class StatusCache:
         """
         self._ensure_steps_run(part)
         self._steps_run[part.name].add(step)
+        self._should_step_run.clear()
 
     def has_step_run(self, part: pluginhandler.PluginHandler, step: steps.Step) -> bool:
         """Determine if a given step of a given part has already run.
@@ -120,6 +208,8 @@ class StatusCache:
 
         This function does nothing if the step wasn't cached.
         """
+        # Any step depending on this one may have a different answer now.
+        self._should_step_run.clear()
         if part.name in self._steps_run:
             _remove_key(self._steps_run[part.name], step)
             if not self._steps_run[part.name]:
@@ -131,6 +221,10 @@ class StatusCache:
         if not self._dirty_reports[part.name]:
             _del_key(self._dirty_reports, part.name)
 
+    def save(self) -> None:
+        """Save what was learnt about the parts for the next invocation."""
+        self._index.save(self.config.part_names)
+
     def _ensure_steps_run(self, part: pluginhandler.PluginHandler) -> None:
         if part.name not in self._steps_run:
             self._steps_run[part.name] = _get_steps_run(part)
@@ -148,9 +242,16 @@ class StatusCache:
         if step in self._dirty_reports[part.name]:
             return
 
-        # Get the dirty report from the PluginHandler. If it's dirty, we can
-        # stop here
-        self._dirty_reports[part.name][step] = part.get_dirty_report(step)
+        # Get the dirty report from the PluginHandler, unless the index shows
+        # nothing it depends on changed since it was found clean. If it's
+        # dirty, we can stop here
+        if self._index.is_clean(part, step):
+            self._dirty_reports[part.name][step] = None
+        else:
+            self._dirty_reports[part.name][step] = part.get_dirty_report(step)
+            self._index.set_clean(
+                part, step, self._dirty_reports[part.name][step] is None
+            )
         if self._dirty_reports[part.name][step]:
             return
 
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import logging
+import os
 import re
 import subprocess
 from typing import FrozenSet
@@ -25,20 +26,53 @@ from snapcraft.internal import elf
 logger = logging.getLogger(__name__)
 
 
+_ARGLESS_SHEBANG_PATTERN = re.compile(r"\A#!.*(python\S*)$", re.MULTILINE)
+_SHEBANG_PATTERN_WITH_ARGS = re.compile(
+    r"\A#!.*(python\S*)[ \t\f\v]+(\S+)$", re.MULTILINE
+)
+# Longer than any shebang line the kernel would honor.
+_SHEBANG_MAX_LENGTH = 4096
+
+
 def rewrite_python_shebangs(root_dir):
     """Recursively change #!/usr/bin/pythonX shebangs to #!/usr/bin/env pythonX
 
     :param str root_dir: Directory that will be crawled for shebangs.
     """
 
-    file_pattern = re.compile(r"")
-    argless_shebang_pattern = re.compile(r"\A#!.*(python\S*)$", re.MULTILINE)
-    shebang_pattern_with_args = re.compile(
-        r"\A#!.*(python\S*)[ \t\f\v]+(\S+)$", re.MULTILINE
-    )
+    for root, directories, files in os.walk(root_dir):
+        for file_name in files:
+            file_path = os.path.join(root, file_name)
+            # Don't bother trying to rewrite a symlink. It's either invalid
+            # or the linked file will be rewritten on its own.
+            if not os.path.islink(file_path):
+                rewrite_python_shebang(file_path)
+
+
+def rewrite_python_shebang(file_path: str) -> None:
+    """Change a #!/usr/bin/pythonX shebang in file_path to use env.
+
+    Only the first line of file_path is read unless it is a python shebang.
+
+    :param str file_path: Path of the file to rewrite.
+    """
+
+    try:
+        with open(file_path, "rb") as f:
+            if f.read(2) != b"#!":
+                return
+            first_line = f.readline(_SHEBANG_MAX_LENGTH)
+    except PermissionError as e:
+        logger.warning(
+            "Unable to open {path} for reading: {error}".format(path=file_path, error=e)
+        )
+        return
+
+    if b"python" not in first_line:
+        return
 
-    file_utils.replace_in_file(
-        root_dir, file_pattern, argless_shebang_pattern, r"#!/usr/bin/env \1"
+    file_utils.search_and_replace_contents(
+        file_path, _ARGLESS_SHEBANG_PATTERN, r"#!/usr/bin/env \1"
     )
 
     # The above rewrite will barf if the shebang includes any args to python.
@@ -50,10 +84,9 @@ def rewrite_python_shebangs(root_dir):
     # then exec the original shebang with included arguments. This requires
     # some quoting hacks to ensure the file can be interpreted by both sh as
     # well as python, but it's better than shipping our own `env`.
-    file_utils.replace_in_file(
-        root_dir,
-        file_pattern,
-        shebang_pattern_with_args,
+    file_utils.search_and_replace_contents(
+        file_path,
+        _SHEBANG_PATTERN_WITH_ARGS,
         r"""#!/bin/sh\n''''exec \1 \2 -- "$0" "$@" # '''""",
     )
 
@@ -17,22 +17,26 @@
 import collections
 import contextlib
 import copy
-import filecmp
+import hashlib
+import json
 import logging
 import os
 import shutil
+import stat
 import subprocess
 import sys
-from glob import glob, iglob
-from typing import cast, Dict, Set, Sequence  # noqa: F401
+from glob import escape, iglob
+from typing import cast, Dict, List, Set, Sequence, Tuple  # noqa: F401
 
 import snapcraft.extractors
-from snapcraft import file_utils, yaml_utils
+from snapcraft import file_utils
 from snapcraft.internal import common, elf, errors, repo, sources, states, steps
 from snapcraft.internal.mangling import clear_execstack
 
 from ._build_attributes import BuildAttributes
+from ._fileset_matcher import FilesetMatcher
 from ._metadata_extraction import extract_metadata
+from ._migration_manifest import MigrationManifest
 from ._plugin_loader import load_plugin  # noqa
 from ._runner import Runner
 from ._patchelf import PartPatcher
@@ -41,6 +45,8 @@ from ._outdated_report import OutdatedReport
 
 logger = logging.getLogger(__name__)
 
+_content_digests = dict()  # type: Dict[Tuple[int, int, int, int], str]
+
 
 class PluginHandler:
     @property
@@ -61,7 +67,9 @@ class PluginHandler:
         base,
         confinement,
         snap_type,
-        soname_cache
+        soname_cache,
+        elf_file_cache,
+        soname_index
     ):
         self.valid = False
         self.plugin = plugin
@@ -74,6 +82,8 @@ class PluginHandler:
         self._confinement = confinement
         self._snap_type = snap_type
         self._soname_cache = soname_cache
+        self._elf_file_cache = elf_file_cache
+        self._soname_index = soname_index
         self._source = grammar_processor.get_source()
         if not self._source:
             self._source = part_schema["source"].get("default")
@@ -154,6 +164,9 @@ class PluginHandler:
             handler_class = sources.get_source_handler(
                 self._source, source_type=properties["source-type"]
             )
+            handler_kwargs = dict()
+            if issubclass(handler_class, sources.Local):
+                handler_kwargs["snapshot_file"] = self._get_snapshot_file(steps.PULL)
             source_handler = handler_class(
                 self._source,
                 self.plugin.sourcedir,
@@ -162,10 +175,14 @@ class PluginHandler:
                 source_tag=properties["source-tag"],
                 source_depth=properties["source-depth"],
                 source_commit=properties["source-commit"],
+                **handler_kwargs
             )
 
         return source_handler
 
+    def _get_snapshot_file(self, step):
+        return os.path.join(self.plugin.statedir, "{}-snapshot.json".format(step.name))
+
     def _set_version(self, *, version):
         try:
             self._set_scriptlet_metadata(
@@ -352,6 +369,24 @@ class PluginHandler:
 
         return None
 
+    def get_dirty_report_digest(self) -> str:
+        """Return a digest of what get_dirty_report() compares states against.
+
+        That is the part properties and the project options of interest, as
+        they are now. If neither the digest nor a step's state changed, the
+        dirty report for that step did not change either.
+        """
+        return hashlib.sha256(
+            json.dumps(
+                {
+                    "properties": self._part_properties,
+                    "deb_arch": getattr(self._project_options, "deb_arch", None),
+                },
+                sort_keys=True,
+                default=repr,
+            ).encode()
+        ).hexdigest()
+
     def should_step_run(self, step, force=False):
         return force or self.is_clean(step)
 
@@ -367,8 +402,7 @@ class PluginHandler:
         if not state:
             state = {}
 
-        with open(states.get_step_state_file(self.plugin.statedir, step), "w") as f:
-            f.write(yaml_utils.dump(state))
+        states.save_state(self.plugin.statedir, step, state)
 
     def mark_cleaned(self, step):
         state_file = states.get_step_state_file(self.plugin.statedir, step)
@@ -478,6 +512,9 @@ class PluginHandler:
             else:
                 shutil.rmtree(self.plugin.sourcedir)
 
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._get_snapshot_file(steps.PULL))
+
         self.plugin.clean_pull()
         self.mark_cleaned(steps.PULL)
 
@@ -494,29 +531,15 @@ class PluginHandler:
             if os.path.exists(self.plugin.build_basedir):
                 shutil.rmtree(self.plugin.build_basedir)
 
-            # FIXME: It's not necessary to ignore here anymore since it's now
-            # done in the Local source. However, it's left here so that it
-            # continues to work on old snapcraft trees that still have src
-            # symlinks.
-            def ignore(directory, files):
-                if directory == self.plugin.sourcedir:
-                    snaps = glob(os.path.join(directory, "*.snap"))
-                    if snaps:
-                        snaps = [os.path.basename(s) for s in snaps]
-                        return common.SNAPCRAFT_FILES + snaps
-                    else:
-                        return common.SNAPCRAFT_FILES
-                else:
-                    return []
-
             # No hard-links being used here in case the build process modifies
-            # these files.
-            shutil.copytree(
+            # these files. The Local source also ignores the snapcraft files
+            # of old snapcraft trees that still have src symlinks.
+            sources.Local(
                 self.plugin.sourcedir,
                 self.plugin.build_basedir,
-                symlinks=True,
-                ignore=ignore,
-            )
+                copy_function=file_utils.copy,
+                snapshot_file=self._get_snapshot_file(steps.BUILD),
+            ).pull()
 
         self._do_build()
 
@@ -529,6 +552,7 @@ class PluginHandler:
                 self.plugin.sourcedir,
                 self.plugin.build_basedir,
                 copy_function=file_utils.copy,
+                snapshot_file=self._get_snapshot_file(steps.BUILD),
             )
             if not source.check(
                 states.get_step_state_file(self.plugin.statedir, steps.BUILD)
@@ -645,6 +669,9 @@ class PluginHandler:
         if os.path.exists(self.plugin.installdir):
             shutil.rmtree(self.plugin.installdir)
 
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._get_snapshot_file(steps.BUILD))
+
         self.plugin.clean_build()
         self.mark_cleaned(steps.BUILD)
 
@@ -693,18 +720,26 @@ class PluginHandler:
                 return
             repo.fix_pkg_config(self.stagedir, file_path, self.plugin.installdir)
 
+        manifest = self._get_migration_manifest(steps.STAGE)
         _migrate_files(
             snap_files,
             snap_dirs,
             self.plugin.installdir,
             self.stagedir,
             fixup_func=fixup_func,
+            manifest=manifest,
         )
+        manifest.save()
         # TODO once `snappy try` is in place we will need to copy
         # dependencies here too
 
         self.mark_stage_done(snap_files, snap_dirs)
 
+    def _get_migration_manifest(self, step):
+        return MigrationManifest(
+            os.path.join(self.plugin.statedir, "{}-manifest.json".format(step.name))
+        )
+
     def mark_stage_done(self, snap_files, snap_dirs):
         self.mark_done(
             steps.STAGE,
@@ -717,17 +752,24 @@ class PluginHandler:
             ),
         )
 
-    def clean_stage(self, project_staged_state):
+    def clean_stage(self, project_staged_state, *, keep_migrated=False):
         if self.is_clean(steps.STAGE):
             return
 
         state = states.get_state(self.plugin.statedir, steps.STAGE)
 
         try:
-            self._clean_shared_area(self.stagedir, state, project_staged_state)
+            self._clean_shared_area(
+                self.stagedir,
+                state,
+                project_staged_state,
+                keep_migrated_for=steps.STAGE if keep_migrated else None,
+            )
         except AttributeError:
             raise errors.MissingStateCleanError(steps.STAGE)
 
+        if not keep_migrated:
+            self._get_migration_manifest(steps.STAGE).remove()
         self.mark_cleaned(steps.STAGE)
 
     def prime(self, force=False) -> None:
@@ -741,20 +783,34 @@ class PluginHandler:
 
     def _do_prime(self) -> None:
         snap_files, snap_dirs = self.migratable_fileset_for(steps.PRIME)
-        _migrate_files(snap_files, snap_dirs, self.stagedir, self.primedir)
+        manifest = self._get_migration_manifest(steps.PRIME)
+        _migrate_files(
+            snap_files, snap_dirs, self.stagedir, self.primedir, manifest=manifest
+        )
+        self._soname_index.add_files(self.primedir, snap_files)
 
         if self._snap_type == "app":
             dependency_paths = self._handle_elf(snap_files)
         else:
             dependency_paths = set()
+        # Saved once the primed files are patched, so that unchanged files
+        # are not migrated and patched all over again.
+        manifest.save()
 
         self.mark_prime_done(snap_files, snap_dirs, dependency_paths)
 
     def _handle_elf(self, snap_files: Sequence[str]) -> Set[str]:
-        elf_files = elf.get_elf_files(self.primedir, snap_files)
+        elf_files = elf.get_elf_files(
+            self.primedir, snap_files, elf_file_cache=self._elf_file_cache
+        )
         all_dependencies = set()
         # TODO: base snap support
         core_path = common.get_core_path(self._base)
+        dependency_resolver = elf.DependencyResolver(
+            root_path=self.primedir,
+            core_base_path=core_path,
+            elf_file_cache=self._elf_file_cache,
+        )
 
         # Clear the cache of all libs that aren't already in the primedir
         self._soname_cache.reset_except_root(self.primedir)
@@ -764,6 +820,8 @@ class PluginHandler:
                     root_path=self.primedir,
                     core_base_path=core_path,
                     soname_cache=self._soname_cache,
+                    dependency_resolver=dependency_resolver,
+                    soname_index=self._soname_index,
                 )
             )
 
@@ -807,23 +865,40 @@ class PluginHandler:
             ),
         )
 
-    def clean_prime(self, project_primed_state, hint=""):
+    def clean_prime(self, project_primed_state, hint="", *, keep_migrated=False):
         if self.is_clean(steps.PRIME):
             return
 
         state = self.get_prime_state()
 
         try:
-            self._clean_shared_area(self.primedir, state, project_primed_state)
+            self._clean_shared_area(
+                self.primedir,
+                state,
+                project_primed_state,
+                keep_migrated_for=steps.PRIME if keep_migrated else None,
+            )
         except AttributeError:
             raise errors.MissingStateCleanError(steps.PRIME)
 
+        if not keep_migrated:
+            self._get_migration_manifest(steps.PRIME).remove()
         self.mark_cleaned(steps.PRIME)
 
-    def _clean_shared_area(self, shared_directory, part_state, project_state):
+    def _clean_shared_area(
+        self, shared_directory, part_state, project_state, *, keep_migrated_for=None
+    ):
         primed_files = part_state.files
         primed_directories = part_state.directories
 
+        # When the step is about to run again, what it is going to migrate
+        # is left in place, along with its migration manifest, so that only
+        # the files that changed since are migrated again.
+        if keep_migrated_for:
+            snap_files, snap_dirs = self.migratable_fileset_for(keep_migrated_for)
+            primed_files = primed_files - snap_files
+            primed_directories = primed_directories - snap_dirs
+
         # We want to make sure we don't remove a file or directory that's
         # being used by another part. So we'll examine the state for all parts
         # in the project and leave any files or directories found to be in
@@ -865,6 +940,8 @@ class PluginHandler:
                     self.primedir,
                     follow_symlinks=True,
                 )
+                # So the parts primed after this one find these in prime.
+                self._soname_index.add_files(self.primedir, system)
                 formatted_system = "\n".join(sorted(system))
                 logger.warning(
                     "Files from the build host were migrated into the snap to "
@@ -890,7 +967,23 @@ class PluginHandler:
     def env(self, root):
         return self.plugin.env(root)
 
-    def clean(self, project_staged_state=None, project_primed_state=None, step=None):
+    def clean(
+        self,
+        project_staged_state=None,
+        project_primed_state=None,
+        step=None,
+        *,
+        keep_migrated=False
+    ):
+        """Clean the given step of this part, and the steps after it.
+
+        :param dict project_staged_state: the stage state of every part.
+        :param dict project_primed_state: the prime state of every part.
+        :param step: the step to clean, every step if not set.
+        :param bool keep_migrated: whether to leave in place the files that
+                                   the step will migrate when it runs again,
+                                   when the step migrates files.
+        """
         if not project_staged_state:
             project_staged_state = {}
 
@@ -898,7 +991,12 @@ class PluginHandler:
             project_primed_state = {}
 
         try:
-            self._clean_steps(project_staged_state, project_primed_state, step)
+            self._clean_steps(
+                project_staged_state,
+                project_primed_state,
+                step,
+                keep_migrated=keep_migrated,
+            )
         except errors.MissingStateCleanError:
             # If one of the step cleaning rules is missing state, it must be
             # running on the output of an old Snapcraft. In that case, if we
@@ -917,18 +1015,28 @@ class PluginHandler:
         if os.path.exists(self.plugin.partdir) and not os.listdir(self.plugin.partdir):
             os.rmdir(self.plugin.partdir)
 
-    def _clean_steps(self, project_staged_state, project_primed_state, step=None):
+    def _clean_steps(
+        self, project_staged_state, project_primed_state, step=None, *, keep_migrated
+    ):
         if step:
             if step not in steps.STEPS:
                 raise RuntimeError(
                     "{!r} is not a valid step for part {!r}".format(step, self.name)
                 )
 
+        # Only the files of the step itself are kept, the steps after it are
+        # not run again right away.
         if not step or step <= steps.PRIME:
-            self.clean_prime(project_primed_state)
+            self.clean_prime(
+                project_primed_state,
+                keep_migrated=keep_migrated and step == steps.PRIME,
+            )
 
         if not step or step <= steps.STAGE:
-            self.clean_stage(project_staged_state)
+            self.clean_stage(
+                project_staged_state,
+                keep_migrated=keep_migrated and step == steps.STAGE,
+            )
 
         if not step or step <= steps.BUILD:
             self.clean_build()
@@ -1007,24 +1115,29 @@ def _expand_part_properties(part_properties, part_schema):
 def _migratable_filesets(fileset, srcdir):
     includes, excludes = _get_file_list(fileset)
 
-    include_files = _generate_include_set(srcdir, includes)
-    exclude_files, exclude_dirs = _generate_exclude_set(srcdir, excludes)
-
-    # And chop files, including whole trees if any dirs are mentioned
-    snap_files = include_files - exclude_files
-    for exclude_dir in exclude_dirs:
-        snap_files = set([x for x in snap_files if not x.startswith(exclude_dir + "/")])
-
-    # Separate dirs from files
-    snap_dirs = set(
-        [
-            x
-            for x in snap_files
-            if os.path.isdir(os.path.join(srcdir, x))
-            and not os.path.islink(os.path.join(srcdir, x))
-        ]
+    # Includes without a wildcard are taken as plain paths, whether they
+    # exist or not.
+    literal_includes = [i for i in includes if "*" not in i]
+    include_matcher = FilesetMatcher(
+        [i for i in includes if "*" in i] + [escape(i) for i in literal_includes]
     )
-    snap_files = snap_files - snap_dirs
+    exclude_matcher = FilesetMatcher(excludes)
+
+    snap_files, snap_dirs, excluded, exclude_dirs = _walk_filesets(
+        srcdir, include_matcher, exclude_matcher
+    )
+
+    for include in literal_includes:
+        path = os.path.relpath(os.path.join(srcdir, include), srcdir)
+        if path in snap_files or path in snap_dirs or path in excluded:
+            continue
+        if any(path.startswith(d + "/") for d in exclude_dirs):
+            continue
+        full_path = os.path.join(srcdir, path)
+        if os.path.isdir(full_path) and not os.path.islink(full_path):
+            snap_dirs.add(path)
+        else:
+            snap_files.add(path)
 
     # Make sure we also obtain the parent directories of files
     for snap_file in snap_files:
@@ -1036,6 +1149,134 @@ def _migratable_filesets(fileset, srcdir):
     return snap_files, snap_dirs
 
 
+def _walk_filesets(srcdir, include_matcher, exclude_matcher):
+    """Walk srcdir once, matching every path against both matchers.
+
+    Included directories are included with all their contents, excluded
+    directories are excluded with all their contents and not walked into.
+    Directories are only walked into if something below them can match.
+    """
+    walk = _FilesetWalk(include_matcher, exclude_matcher)
+    walk.run(srcdir)
+    return walk.snap_files, walk.snap_dirs, walk.excluded, walk.exclude_dirs
+
+
+class _FilesetWalk:
+    def __init__(self, include_matcher, exclude_matcher) -> None:
+        self._include_matcher = include_matcher
+        self._exclude_matcher = exclude_matcher
+        self.snap_files = set()  # type: Set[str]
+        self.snap_dirs = set()  # type: Set[str]
+        self.excluded = set()  # type: Set[str]
+        self.exclude_dirs = []  # type: List[str]
+        # Each item is (path, relative path, include state, exclude state,
+        # whether the whole directory is included, the directories walked to
+        # get there).
+        self._pending = []  # type: List[tuple]
+
+    def run(self, srcdir: str) -> None:
+        root_include_state = self._include_matcher.root_state()
+        # The only way to match the root itself is with "**", in which case
+        # it is included with everything in it.
+        root_included = self._include_matcher.is_match(root_include_state, is_dir=True)
+        if root_included:
+            self._add(".", is_dir=True, is_link=False)
+
+        self._pending.append(
+            (
+                srcdir,
+                "",
+                root_include_state,
+                self._exclude_matcher.root_state(),
+                root_included,
+                frozenset(),
+            )
+        )
+        while self._pending:
+            self._walk_directory(*self._pending.pop())
+
+    def _add(self, relative_path: str, *, is_dir: bool, is_link: bool) -> None:
+        if is_dir and not is_link:
+            self.snap_dirs.add(relative_path)
+        else:
+            self.snap_files.add(relative_path)
+
+    def _walk_directory(
+        self,
+        directory,
+        relative_directory,
+        include_state,
+        exclude_state,
+        included,
+        seen,
+    ) -> None:
+        try:
+            directory_stat = os.stat(directory)
+            entries = list(os.scandir(directory))
+        except OSError:
+            return
+
+        # Guard against symlink loops.
+        directory_key = (directory_stat.st_dev, directory_stat.st_ino)
+        if directory_key in seen:
+            return
+        seen = seen | {directory_key}
+
+        for entry in entries:
+            self._match_entry(
+                entry,
+                os.path.join(relative_directory, entry.name),
+                include_state,
+                exclude_state,
+                included,
+                seen,
+            )
+
+    def _match_entry(
+        self, entry, relative_path, include_state, exclude_state, included, seen
+    ) -> None:
+        is_link = entry.is_symlink()
+        try:
+            is_dir = entry.is_dir()
+        except OSError:
+            is_dir = False
+
+        entry_exclude_state = self._exclude_matcher.child_state(
+            exclude_state, entry.name
+        )
+        if self._exclude_matcher.is_match(entry_exclude_state, is_dir=is_dir):
+            self.excluded.add(relative_path)
+            if is_dir:
+                self.exclude_dirs.append(relative_path)
+            return
+
+        entry_include_state = self._include_matcher.child_state(
+            include_state, entry.name
+        )
+        is_match = self._include_matcher.is_match(entry_include_state, is_dir=is_dir)
+        if included or is_match:
+            self._add(relative_path, is_dir=is_dir, is_link=is_link)
+
+        if not is_dir:
+            return
+
+        # Just like os.walk, including a directory does not include what is
+        # in the directories it links to, unless those are included
+        # themselves.
+        entry_included = is_match or (included and not is_link)
+        if entry_included or self._include_matcher.can_match_below(entry_include_state):
+            self._pending.append(
+                (
+                    entry.path,
+                    relative_path,
+                    entry_include_state,
+                    entry_exclude_state,
+                    entry_included,
+                    seen,
+                )
+            )
+
+
 def _migrate_files(
     snap_files,
     snap_dirs,
@@ -1044,21 +1285,34 @@ def _migrate_files(
     missing_ok=False,
     follow_symlinks=False,
     fixup_func=lambda *args: None,
+    manifest=None,
 ):
 
+    # Directory metadata only needs to be applied once per directory.
+    created_dirs = set()  # type: Set[str]
+
     for directory in snap_dirs:
         src = os.path.join(srcdir, directory)
         dst = os.path.join(dstdir, directory)
 
         snapcraft.file_utils.create_similar_directory(src, dst)
+        created_dirs.add(dst)
 
     for snap_file in snap_files:
         src = os.path.join(srcdir, snap_file)
         dst = os.path.join(dstdir, snap_file)
 
-        snapcraft.file_utils.create_similar_directory(
-            os.path.dirname(src), os.path.dirname(dst)
-        )
+        dst_dir = os.path.dirname(dst)
+        if dst_dir not in created_dirs:
+            snapcraft.file_utils.create_similar_directory(os.path.dirname(src), dst_dir)
+            created_dirs.add(dst_dir)
+
+        # Leave alone what has not changed since it was last migrated.
+        if manifest and manifest.is_current(
+            snap_file, src, dst, follow_symlinks=follow_symlinks
+        ):
+            manifest.add(snap_file, src, dst, follow_symlinks=follow_symlinks)
+            continue
 
         if missing_ok and not os.path.exists(src):
             continue
@@ -1072,12 +1326,15 @@ def _migrate_files(
             os.remove(dst)
 
         if src.endswith(".pc"):
-            shutil.copy2(src, dst, follow_symlinks=follow_symlinks)
+            file_utils.copy2(src, dst, follow_symlinks=follow_symlinks)
         else:
             file_utils.link_or_copy(src, dst, follow_symlinks=follow_symlinks)
 
         fixup_func(dst)
 
+        if manifest:
+            manifest.add(snap_file, src, dst, follow_symlinks=follow_symlinks)
+
 
 def _organize_filesets(fileset, base_dir):
     for key in sorted(fileset, key=lambda x: ["*" in x, x]):
@@ -1140,58 +1397,39 @@ def _get_file_list(stage_set):
     return includes, excludes
 
 
-def _generate_include_set(directory, includes):
-    include_files = set()
-    for include in includes:
-        if "*" in include:
-            pattern = os.path.join(directory, include)
-            matches = iglob(pattern, recursive=True)
-            include_files |= set(matches)
-        else:
-            include_files |= set([os.path.join(directory, include)])
-
-    include_dirs = [x for x in include_files if os.path.isdir(x)]
-    include_files = set([os.path.relpath(x, directory) for x in include_files])
-
-    # Expand includeFiles, so that an exclude like '*/*.so' will still match
-    # files from an include like 'lib'
-    for include_dir in include_dirs:
-        for root, dirs, files in os.walk(include_dir):
-            include_files |= set(
-                [os.path.relpath(os.path.join(root, d), directory) for d in dirs]
-            )
-            include_files |= set(
-                [os.path.relpath(os.path.join(root, f), directory) for f in files]
-            )
-
-    return include_files
-
-
-def _generate_exclude_set(directory, excludes):
-    exclude_files = set()
-
-    for exclude in excludes:
-        pattern = os.path.join(directory, exclude)
-        matches = iglob(pattern, recursive=True)
-        exclude_files |= set(matches)
-
-    exclude_dirs = [
-        os.path.relpath(x, directory) for x in exclude_files if os.path.isdir(x)
-    ]
-    exclude_files = set([os.path.relpath(x, directory) for x in exclude_files])
-
-    return exclude_files, exclude_dirs
-
-
 def _validate_relative_paths(files):
     for d in files:
         if os.path.isabs(d):
             raise errors.PluginError('path "{}" must be relative'.format(d))
 
 
+def _get_content_digest(file_path: str, file_stat: os.stat_result) -> str:
+    # The same file can be staged by several parts, so its digest is kept
+    # for as long as it is not modified.
+    key = (file_stat.st_dev, file_stat.st_ino, file_stat.st_size, file_stat.st_mtime_ns)
+    if key not in _content_digests:
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(2 ** 20), b""):
+                digest.update(chunk)
+        _content_digests[key] = digest.hexdigest()
+
+    return _content_digests[key]
+
+
 def _file_collides(file_this, file_other):
     if not file_this.endswith(".pc"):
-        return not filecmp.cmp(file_this, file_other, shallow=False)
+        stat_this = os.stat(file_this)
+        stat_other = os.stat(file_other)
+        # Hard links to the same file never collide, files of different
+        # sizes always do.
+        if os.path.samestat(stat_this, stat_other):
+            return False
+        if stat_this.st_size != stat_other.st_size:
+            return True
+        return _get_content_digest(file_this, stat_this) != _get_content_digest(
+            file_other, stat_other
+        )
 
     pc_file_1 = open(file_this)
     pc_file_2 = open(file_other)
@@ -1213,45 +1451,44 @@ def _file_collides(file_this, file_other):
 
 def check_for_collisions(parts):
     """Raises a SnapcraftPartConflictError if conflicts are found."""
-    parts_files = {}
+    part_indexes = {part.name: index for index, part in enumerate(parts)}
+    # The parts checked so far that stage each path, in order.
+    path_owners = collections.defaultdict(list)  # type: Dict[str, List[PluginHandler]]
     for part in parts:
         # Gather our own files up
         part_files, part_directories = part.migratable_fileset_for(steps.STAGE)
-        part_contents = part_files | part_directories
 
-        # Scan previous parts for collisions
-        for other_part_name in parts_files:
-            common = part_contents & parts_files[other_part_name]["files"]
-            conflict_files = []
-            for f in common:
+        # Check them against the previous parts staging the same paths
+        conflict_files = collections.defaultdict(list)  # type: Dict[str, List[str]]
+        for f in part_files | part_directories:
+            for other_part in path_owners[f]:
                 this = os.path.join(part.plugin.installdir, f)
-                other = os.path.join(parts_files[other_part_name]["installdir"], f)
+                other = os.path.join(other_part.plugin.installdir, f)
 
                 if _paths_collide(this, other):
-                    conflict_files.append(f)
-
-            if conflict_files:
-                raise errors.SnapcraftPartConflictError(
-                    other_part_name=other_part_name,
-                    part_name=part.name,
-                    conflict_files=conflict_files,
-                )
-
-        # And add our files to the list
-        parts_files[part.name] = {
-            "files": part_contents,
-            "installdir": part.plugin.installdir,
-        }
+                    conflict_files[other_part.name].append(f)
+            path_owners[f].append(part)
+
+        if conflict_files:
+            other_part_name = min(conflict_files, key=part_indexes.get)
+            raise errors.SnapcraftPartConflictError(
+                other_part_name=other_part_name,
+                part_name=part.name,
+                conflict_files=conflict_files[other_part_name],
+            )
 
 
 def _paths_collide(path1: str, path2: str) -> bool:
-    if not (os.path.lexists(path1) and os.path.lexists(path2)):
+    try:
+        path1_mode = os.lstat(path1).st_mode
+        path2_mode = os.lstat(path2).st_mode
+    except FileNotFoundError:
         return False
 
-    path1_is_dir = os.path.isdir(path1)
-    path2_is_dir = os.path.isdir(path2)
-    path1_is_link = os.path.islink(path1)
-    path2_is_link = os.path.islink(path2)
+    path1_is_dir = stat.S_ISDIR(path1_mode)
+    path2_is_dir = stat.S_ISDIR(path2_mode)
+    path1_is_link = stat.S_ISLNK(path1_mode)
+    path2_is_link = stat.S_ISLNK(path2_mode)
 
     # Paths collide if they're both symlinks, but pointing to different places
     if path1_is_link and path2_is_link:
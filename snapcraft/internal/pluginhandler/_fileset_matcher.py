@@ -0,0 +1,132 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import fnmatch
+import re
+from typing import FrozenSet, List, Sequence, Set, Tuple  # noqa: F401
+
+
+_MAGIC_CHECK = re.compile(r"[*?[]")
+_RECURSIVE = "**"
+
+# A position in a given pattern, a pair of (pattern index, component index).
+_State = Tuple[int, int]
+
+
+class _Pattern:
+    def __init__(self, pattern: str) -> None:
+        self.dir_only = pattern.endswith("/")
+        self.components = []  # type: List[object]
+        for component in pattern.split("/"):
+            # Empty and "." components do not change what glob matches.
+            if component in ("", "."):
+                continue
+            if not _MAGIC_CHECK.search(component):
+                self.components.append(component)
+            elif component == _RECURSIVE:
+                self.components.append(_RECURSIVE)
+            else:
+                self.components.append(
+                    (
+                        re.compile(fnmatch.translate(component)),
+                        # Just like glob, wildcards do not match hidden
+                        # files unless asked to.
+                        not component.startswith("."),
+                    )
+                )
+
+    def matches(self, index: int, name: str) -> bool:
+        component = self.components[index]
+        if isinstance(component, str):
+            return component == name
+        regex, skip_hidden = component
+        if skip_hidden and name.startswith("."):
+            return False
+        return regex.match(name) is not None
+
+
+class FilesetMatcher:
+    """Match paths against a list of glob patterns, one path at a time.
+
+    The patterns follow the same rules as glob.glob with recursive set, but
+    a tree can be matched while walking it just once: the state for a path
+    is derived from the state of its parent directory, and tells whether
+    anything below that path can match at all.
+    """
+
+    def __init__(self, patterns: Sequence[str]) -> None:
+        """Compile patterns into a matcher.
+
+        :param patterns: the patterns, relative to the root of the tree.
+        """
+        self._patterns = [_Pattern(p) for p in patterns]
+
+    def _closure(self, states: Set[_State]) -> FrozenSet[_State]:
+        # "**" also matches no directory at all.
+        pending = list(states)
+        while pending:
+            pattern_index, index = pending.pop()
+            components = self._patterns[pattern_index].components
+            if index < len(components) and components[index] is _RECURSIVE:
+                state = (pattern_index, index + 1)
+                if state not in states:
+                    states.add(state)
+                    pending.append(state)
+        return frozenset(states)
+
+    def root_state(self) -> FrozenSet[_State]:
+        """Return the state for the root of the tree."""
+        return self._closure({(i, 0) for i in range(len(self._patterns))})
+
+    def child_state(self, state: FrozenSet[_State], name: str) -> FrozenSet[_State]:
+        """Return the state for the entry name within a directory.
+
+        :param state: the state of the directory.
+        :param str name: the name of the entry within the directory.
+        """
+        child_states = set()  # type: Set[_State]
+        for pattern_index, index in state:
+            pattern = self._patterns[pattern_index]
+            if index == len(pattern.components):
+                continue
+            if pattern.components[index] is _RECURSIVE:
+                if not name.startswith("."):
+                    child_states.add((pattern_index, index))
+            elif pattern.matches(index, name):
+                child_states.add((pattern_index, index + 1))
+        return self._closure(child_states)
+
+    def is_match(self, state: FrozenSet[_State], *, is_dir: bool) -> bool:
+        """Return True if a path in state matches any of the patterns.
+
+        :param state: the state of the path.
+        :param bool is_dir: whether or not the path is a directory.
+        """
+        for pattern_index, index in state:
+            pattern = self._patterns[pattern_index]
+            if index == len(pattern.components) and (is_dir or not pattern.dir_only):
+                return True
+        return False
+
+    def can_match_below(self, state: FrozenSet[_State]) -> bool:
+        """Return True if anything below a directory in state may match.
+
+        :param state: the state of the directory.
+        """
+        return any(
+            index < len(self._patterns[pattern_index].components)
+            for pattern_index, index in state
+        )
@@ -0,0 +1,129 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import contextlib
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Tuple  # noqa: F401
+
+
+logger = logging.getLogger(__name__)
+
+
+def _get_stat_key(path: str, *, follow_symlinks: bool) -> Optional[List[int]]:
+    try:
+        file_stat = os.stat(path, follow_symlinks=follow_symlinks)
+    except OSError:
+        return None
+    return [
+        file_stat.st_dev,
+        file_stat.st_ino,
+        file_stat.st_size,
+        file_stat.st_mtime_ns,
+    ]
+
+
+class MigrationManifest:
+    """A record of the files a part migrated in a step.
+
+    For every migrated file the device, inode, size and modification time of
+    both its source and its destination are recorded, so that migrating again
+    can leave alone the files that did not change since.
+    """
+
+    _VERSION = 1
+
+    def __init__(self, path: str) -> None:
+        """Initialize a manifest.
+
+        :param str path: the file to load the manifest from and save it to.
+        """
+        self._path = path
+        self._entries = dict()  # type: Dict[str, list]
+        self._migrated = dict()  # type: Dict[str, Tuple[str, str, bool]]
+
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self._path) as manifest_file:
+                manifest_data = json.load(manifest_file)
+        except (OSError, ValueError) as error:
+            logger.debug(
+                "Ignoring unreadable manifest {!r}: {}".format(self._path, error)
+            )
+            return
+
+        if manifest_data.get("version") == self._VERSION:
+            self._entries = manifest_data.get("entries", dict())
+
+    def is_current(
+        self, relative_path: str, src: str, dst: str, *, follow_symlinks: bool
+    ) -> bool:
+        """Return True if neither src nor dst changed since they were recorded.
+
+        :param str relative_path: the path of the file relative to the step.
+        :param str src: the path the file was migrated from.
+        :param str dst: the path the file was migrated to.
+        :param bool follow_symlinks: whether or not src is followed.
+        """
+        entry = self._entries.get(relative_path)
+        if entry is None:
+            return False
+
+        src_key = _get_stat_key(src, follow_symlinks=follow_symlinks)
+        dst_key = _get_stat_key(dst, follow_symlinks=False)
+        return src_key is not None and entry == [src_key, dst_key]
+
+    def add(
+        self, relative_path: str, src: str, dst: str, *, follow_symlinks: bool
+    ) -> None:
+        """Record a migrated file, its stat data is taken when saving.
+
+        :param str relative_path: the path of the file relative to the step.
+        :param str src: the path the file was migrated from.
+        :param str dst: the path the file was migrated to.
+        :param bool follow_symlinks: whether or not src is followed.
+        """
+        self._migrated[relative_path] = (src, dst, follow_symlinks)
+
+    def save(self) -> None:
+        """Save every file recorded with add, dropping any other entries.
+
+        Files may still be modified after being migrated (e.g. patched), so
+        this is meant to be called once the step is done with them.
+        """
+        entries = dict()  # type: Dict[str, list]
+        for relative_path, (src, dst, follow_symlinks) in self._migrated.items():
+            src_key = _get_stat_key(src, follow_symlinks=follow_symlinks)
+            dst_key = _get_stat_key(dst, follow_symlinks=False)
+            if src_key is not None and dst_key is not None:
+                entries[relative_path] = [src_key, dst_key]
+        self._entries = entries
+        self._migrated = dict()
+
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path, "w") as manifest_file:
+            json.dump({"version": self._VERSION, "entries": entries}, manifest_file)
+
+    def remove(self) -> None:
+        """Forget every entry and remove the saved manifest."""
+        self._entries = dict()
+        self._migrated = dict()
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self._path)
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import concurrent.futures
 import contextlib
 import logging
 import os
@@ -91,6 +92,8 @@ class PartPatcher:
         self._is_libc6_staged = "libc6" in stage_packages
         self._stagedir = stagedir
         self._primedir = primedir
+        # Files are patched in the part's directory rather than in prime.
+        self._work_dir = plugin.partdir
 
     def _get_glibc_compatibility(self, linker_version: str) -> Dict[str, str]:
         linker_incompat = dict()  # type: Dict[str, str]
@@ -114,14 +117,25 @@ class PartPatcher:
             dynamic_linker=dynamic_linker,
             root_path=self._primedir,
             preferred_patchelf_path=preferred_patchelf_path,
+            work_dir=self._work_dir,
         )
 
         # Patching all files instead of a subset of them to ensure the
         # environment is consistent and the chain of dlopens that may
         # happen remains sane.
-        for elf_file in self._elf_files:
+        # The work happens in patchelf, so threads are enough to patch
+        # files concurrently.
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._project.parallel_build_count
+        ) as executor:
+            patches = [
+                (elf_file, executor.submit(elf_patcher.patch, elf_file=elf_file))
+                for elf_file in self._elf_files
+            ]
+
+        for elf_file, patch in patches:
             try:
-                elf_patcher.patch(elf_file=elf_file)
+                patch.result()
             except errors.PatcherError as patch_error:
                 logger.warning(
                     "An attempt to patch {!r} so that it would work "
@@ -17,11 +17,11 @@
 from collections import ChainMap
 import logging
 from os import path
-from typing import List
+from typing import Dict, List
 from typing import Set  # noqa: F401
 
 import snapcraft
-from snapcraft.internal import deprecations, elf, pluginhandler, repo
+from snapcraft.internal import cache, deprecations, elf, pluginhandler, repo
 from ._env import (
     env_for_classic,
     build_env,
@@ -41,6 +41,15 @@ class PartsConfig:
         self._base = parts.get("base", "core")
         self._confinement = parts.get("confinement")
         self._soname_cache = elf.SonameCache()
+        self._elf_file_cache = elf.ElfFileCache(
+            path=path.join(
+                cache.SnapcraftProjectCache(
+                    project_name=self._snap_name
+                ).project_cache_root,
+                "elf-files.json",
+            )
+        )
+        self._soname_index = elf.SonameIndex(elf_file_cache=self._elf_file_cache)
         self._parts_data = parts.get("parts", {})
         self._snap_type = parts.get("type", "app")
         self._project = project
@@ -176,6 +185,10 @@ class PartsConfig:
 
         return None
 
+    def save_elf_file_cache(self) -> None:
+        """Write out what was learnt about the ELF files of all the parts."""
+        self._elf_file_cache.save()
+
     def clean_part(self, part_name, staged_state, primed_state, step):
         part = self.get_part(part_name)
         part.clean(staged_state, primed_state, step)
@@ -236,6 +249,8 @@ class PartsConfig:
             confinement=self._confinement,
             snap_type=self._snap_type,
             soname_cache=self._soname_cache,
+            elf_file_cache=self._elf_file_cache,
+            soname_index=self._soname_index,
         )
 
         self.build_snaps |= grammar_processor.get_build_snaps()
@@ -259,12 +274,13 @@ class PartsConfig:
         env = []  # type: List[str]
         stagedir = self._project.stage_dir
         is_host_compat = self._project.is_host_compatible_with_base(self._base)
+        stage_runtime_env = runtime_env(stagedir, self._project.arch_triplet)
 
         if root_part:
             # this has to come before any {}/usr/bin
             env += part.env(part.plugin.installdir)
             env += runtime_env(part.plugin.installdir, self._project.arch_triplet)
-            env += runtime_env(stagedir, self._project.arch_triplet)
+            env += stage_runtime_env
             env += build_env(
                 part.plugin.installdir, self._snap_name, self._project.arch_triplet
             )
@@ -282,11 +298,11 @@ class PartsConfig:
                 env.append('{}="{}"'.format(variable, value))
         else:
             env += part.env(stagedir)
-            env += runtime_env(stagedir, self._project.arch_triplet)
+            env += stage_runtime_env
 
-        for dep_part in part.deps:
-            env += dep_part.env(stagedir)
-            env += self.build_env_for_part(dep_part, root_part=False)
+        env += self._build_env_for_dependencies(
+            part, stage_runtime_env=stage_runtime_env, dependency_envs=dict()
+        )
 
         # LP: #1767625
         # Remove duplicates from using the same plugin in dependent parts.
@@ -298,3 +314,29 @@ class PartsConfig:
                 seen.add(e)
 
         return deduped_env
+
+    def _build_env_for_dependencies(
+        self,
+        part,
+        *,
+        stage_runtime_env: List[str],
+        dependency_envs: Dict[str, List[str]]
+    ) -> List[str]:
+        # Every dependency is only gone through once, however many of the
+        # parts depend on it, and the runtime env of the stage directory is
+        # the same for all of them.
+        stagedir = self._project.stage_dir
+        env = []  # type: List[str]
+        for dep_part in part.deps:
+            if dep_part.name not in dependency_envs:
+                dependency_envs[dep_part.name] = (
+                    dep_part.env(stagedir)
+                    + stage_runtime_env
+                    + self._build_env_for_dependencies(
+                        dep_part,
+                        stage_runtime_env=stage_runtime_env,
+                        dependency_envs=dependency_envs,
+                    )
+                )
+            env += dependency_envs[dep_part.name]
+        return env
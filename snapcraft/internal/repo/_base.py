@@ -201,9 +201,8 @@ class BaseRepo:
         :param str unpackdir: directory where files where unpacked.
         """
         self._remove_useless_files(unpackdir)
-        self._fix_artifacts(unpackdir)
         self._fix_xml_tools(unpackdir)
-        self._fix_shebangs(unpackdir)
+        self._fix_artifacts(unpackdir)
 
     def _remove_useless_files(self, unpackdir):
         """Remove files that aren't useful or will clash with other parts."""
@@ -222,19 +221,33 @@ class BaseRepo:
 
         Some unpacked items will also contain suid binaries which we do not
         want in the resulting snap.
+
+        Hard-coded python shebangs are changed to use env, and pkg-config
+        files are prefixed with unpackdir.
+
+        All of this is done in a single walk of unpackdir, only reading the
+        first bytes of regular files unless they need to be rewritten.
         """
         for root, dirs, files in os.walk(unpackdir):
             # Symlinks to directories will be in dirs, while symlinks to
             # non-directories will be in files.
             for entry in itertools.chain(files, dirs):
                 path = os.path.join(root, entry)
-                if os.path.islink(path) and os.path.isabs(os.readlink(path)):
-                    self._fix_symlink(path, unpackdir, root)
-                elif os.path.exists(path):
+                mode = os.lstat(path).st_mode
+                if stat.S_ISLNK(mode):
+                    if os.path.isabs(os.readlink(path)):
+                        self._fix_symlink(path, unpackdir, root)
+                    continue
+
+                if mode & (stat.S_ISUID | stat.S_ISGID):
                     _fix_filemode(path)
 
-                if path.endswith(".pc") and not os.path.islink(path):
+                if not stat.S_ISREG(mode):
+                    continue
+                if path.endswith(".pc"):
                     fix_pkg_config(unpackdir, path)
+                else:
+                    mangling.rewrite_python_shebang(path)
 
     def _fix_xml_tools(self, unpackdir):
         xml2_config_path = os.path.join(unpackdir, "usr", "bin", "xml2-config")
@@ -267,10 +280,6 @@ class BaseRepo:
         os.remove(path)
         os.symlink(os.path.relpath(target, root), path)
 
-    def _fix_shebangs(self, unpackdir):
-        """Change hard-coded shebangs in unpacked files to use env."""
-        mangling.rewrite_python_shebangs(unpackdir)
-
 
 class DummyRepo(BaseRepo):
     def get_packages_for_source_type(*args, **kwargs):
@@ -14,6 +14,7 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import concurrent.futures
 import contextlib
 import glob
 import hashlib
@@ -25,9 +26,10 @@ import stat
 import string
 import subprocess
 import sys
+import tempfile
 import urllib
 import urllib.request
-from typing import Dict, Set, List, Tuple  # noqa: F401
+from typing import Dict, Optional, Set, List, Tuple  # noqa: F401
 
 import apt
 from xml.etree import ElementTree
@@ -54,10 +56,82 @@ deb http://${security}.ubuntu.com/${suffix} ${release}-security multiverse
 """
 _GEOIP_SERVER = "http://geoip.ubuntu.com/lookup"
 _library_list = dict()  # type: Dict[str, Set[str]]
+_manifest_dep_names = None  # type: Optional[Set[str]]
 _HASHSUM_MISMATCH_PATTERN = re.compile(r"(E:Failed to fetch.+Hash Sum mismatch)+")
+_SHA256_PATTERN = re.compile(r"\A[0-9a-f]{64}\Z")
+
+
+class _HostPackages:
+    """A snapshot of the packages known to apt on the host.
+
+    Opening an apt cache takes seconds, so the host one is opened once and
+    kept around until the dpkg status file changes, that is until packages
+    are installed on or removed from the host.
+    """
+
+    _DPKG_STATUS_PATH = "/var/lib/dpkg/status"
+
+    def __init__(self) -> None:
+        self._apt_cache = None  # type: Optional[apt.Cache]
+        self._status_key = None  # type: Optional[Tuple[int, int, int]]
+        self._installed_packages = None  # type: Optional[List[str]]
+
+    def _get_status_key(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            status_stat = os.stat(self._DPKG_STATUS_PATH)
+        except FileNotFoundError:
+            return None
+        # dpkg replaces its status file when updating it, so the inode
+        # changes along with the modification time.
+        return (status_stat.st_ino, status_stat.st_size, status_stat.st_mtime_ns)
+
+    def invalidate(self) -> None:
+        """Drop the snapshot, the next query takes a new one."""
+        if self._apt_cache is not None:
+            self._apt_cache.close()
+        self._apt_cache = None
+        self._status_key = None
+        self._installed_packages = None
+
+    def get_cache(self) -> apt.Cache:
+        """Return the host apt cache, reopened if the host packages changed."""
+        status_key = self._get_status_key()
+        if self._apt_cache is None or status_key != self._status_key:
+            self.invalidate()
+            self._apt_cache = apt.Cache()
+            self._status_key = status_key
+        return self._apt_cache
+
+    def get_installed_packages(self) -> List[str]:
+        """Return the installed packages as a list of name=version."""
+        apt_cache = self.get_cache()
+        if self._installed_packages is None:
+            self._installed_packages = [
+                "{}={}".format(package.name, package.installed.version)
+                for package in apt_cache
+                if package.installed
+            ]
+        return self._installed_packages.copy()
+
+
+_host_packages = _HostPackages()
+
+
+class _SharedAptCache:
+    """An opened apt cache, shared by every user of the same apt sources."""
+
+    def __init__(self, apt_cache: apt.Cache, progress) -> None:
+        self.apt_cache = apt_cache
+        self.progress = progress
+        self.users = 0
 
 
 class _AptCache:
+    # Opening an apt cache means updating its package index, so once opened
+    # a cache is kept open and shared for the rest of the session, keyed by
+    # (cache directory, architecture).
+    _shared_caches = dict()  # type: Dict[Tuple[str, str], _SharedAptCache]
+
     def __init__(self, deb_arch, *, sources_list=None, use_geoip=False):
         self._deb_arch = deb_arch
         self._sources_list = sources_list
@@ -145,17 +219,33 @@ class _AptCache:
     @contextlib.contextmanager
     def archive(self, cache_dir):
         try:
-            apt_cache = self._setup_apt(cache_dir)
-            apt_cache.open()
+            shared_cache = self._get_shared_cache(cache_dir)
+            self.progress = shared_cache.progress
+            shared_cache.users += 1
 
             try:
-                yield apt_cache
+                yield shared_cache.apt_cache
             finally:
-                apt_cache.close()
+                shared_cache.users -= 1
+                # Leave it open for the next user, without any changes
+                # marked in it.
+                if shared_cache.users == 0:
+                    shared_cache.apt_cache.clear()
         except Exception as e:
             logger.debug("Exception occurred: {!r}".format(e))
             raise e
 
+    def _get_shared_cache(self, cache_dir: str) -> _SharedAptCache:
+        key = (cache_dir, self._deb_arch)
+        with contextlib.suppress(KeyError):
+            return self._shared_caches[key]
+
+        apt_cache = self._setup_apt(cache_dir)
+        apt_cache.open()
+        shared_cache = _SharedAptCache(apt_cache, self.progress)
+        self._shared_caches[key] = shared_cache
+        return shared_cache
+
     def sources_digest(self):
         return hashlib.sha384(
             self._collected_sources_list().encode(sys.getfilesystemencoding())
@@ -173,37 +263,52 @@ class _AptCache:
 
         return _get_local_sources_list()
 
-    def fetch_binary(self, *, package_candidate, destination: str) -> None:
+    def fetch_binaries(self, *, package_candidates, destination: str) -> List[str]:
         # This is a workaround for the overly verbose python-apt we use.
         # There is an unreleased patch which once released could replace
         # this code https://salsa.debian.org/apt-team/python-apt/commit/d122f9142df614dbb5f7644112280140dc155ecc  # noqa
         # What follows is almost a tit for tat implementation of upstream's
-        # fetch_binary logic.
-        base = os.path.basename(package_candidate._records.filename)
-        destfile = os.path.join(destination, base)
-        if apt.package._file_is_same(
-            destfile, package_candidate.size, package_candidate._records.md5_hash
-        ):
-            logging.debug("Ignoring already existing file: {}".format(destfile))
-            return os.path.abspath(destfile)
+        # fetch_binary logic, queueing every package into a single Acquire
+        # so apt can download them concurrently and report overall progress.
         acq = apt.apt_pkg.Acquire(self.progress)
-        acqfile = apt.apt_pkg.AcquireFile(
-            acq,
-            package_candidate.uri,
-            package_candidate._records.md5_hash,
-            package_candidate.size,
-            base,
-            destfile=destfile,
-        )
-        acq.run()
+        acqfiles = []
+        destfiles = []
+        total_size = 0
+        for package_candidate in package_candidates:
+            base = os.path.basename(package_candidate._records.filename)
+            destfile = os.path.join(destination, base)
+            destfiles.append(os.path.abspath(destfile))
+            if apt.package._file_is_same(
+                destfile, package_candidate.size, package_candidate._records.md5_hash
+            ):
+                logging.debug("Ignoring already existing file: {}".format(destfile))
+                continue
+            acqfiles.append(
+                apt.apt_pkg.AcquireFile(
+                    acq,
+                    package_candidate.uri,
+                    package_candidate._records.md5_hash,
+                    package_candidate.size,
+                    base,
+                    destfile=destfile,
+                )
+            )
+            total_size += package_candidate.size
 
-        if acqfile.status != acqfile.STAT_DONE:
-            raise apt.package.FetchError(
-                "The item %r could not be fetched: %s"
-                % (acqfile.destfile, acqfile.error_text)
+        if acqfiles:
+            logger.debug(
+                "Fetching {} packages ({} bytes)".format(len(acqfiles), total_size)
             )
+            acq.run()
+
+        for acqfile in acqfiles:
+            if acqfile.status != acqfile.STAT_DONE:
+                raise apt.package.FetchError(
+                    "The item %r could not be fetched: %s"
+                    % (acqfile.destfile, acqfile.error_text)
+                )
 
-        return os.path.abspath(destfile)
+        return destfiles
 
 
 class Ubuntu(BaseRepo):
@@ -253,6 +358,9 @@ class Ubuntu(BaseRepo):
                 "failed to run apt update"
             ) from call_error
 
+        # The package index changed, but not necessarily the dpkg status.
+        _host_packages.invalidate()
+
     @classmethod
     def install_build_packages(cls, package_names: List[str]) -> List[str]:
         """Install packages on the host required to build.
@@ -350,24 +458,15 @@ class Ubuntu(BaseRepo):
 
     @classmethod
     def build_package_is_valid(cls, package_name):
-        with apt.Cache() as apt_cache:
-            return package_name in apt_cache
+        return package_name in _host_packages.get_cache()
 
     @classmethod
     def is_package_installed(cls, package_name):
-        with apt.Cache() as apt_cache:
-            return apt_cache[package_name].installed
+        return _host_packages.get_cache()[package_name].installed
 
     @classmethod
     def get_installed_packages(cls):
-        installed_packages = []
-        with apt.Cache() as apt_cache:
-            for package in apt_cache:
-                if package.installed:
-                    installed_packages.append(
-                        "{}={}".format(package.name, package.installed.version)
-                    )
-        return installed_packages
+        return _host_packages.get_installed_packages()
 
     def __init__(self, rootdir, sources=None, project_options=None) -> None:
         super().__init__(rootdir)
@@ -375,6 +474,7 @@ class Ubuntu(BaseRepo):
 
         if not project_options:
             project_options = snapcraft.ProjectOptions()
+        self._parallel_build_count = project_options.parallel_build_count
 
         self._apt = _AptCache(
             project_options.deb_arch,
@@ -403,7 +503,7 @@ class Ubuntu(BaseRepo):
                 package.mark_keep()
 
     def _filter_base_packages(self, apt_cache, package_names):
-        manifest_dep_names = self._manifest_dep_names(apt_cache)
+        manifest_dep_names = _get_manifest_dep_names()
 
         skipped_essential = []
         skipped_blacklisted = []
@@ -412,8 +512,9 @@ class Ubuntu(BaseRepo):
         # note that this will break the consistency check inside apt_cache
         # (apt_cache.broken_count will be > 0)
         # but that is ok as it was consistent before we excluded
-        # these base package
-        for pkg in apt_cache:
+        # these base package. Only the packages marked to be fetched need
+        # to be looked at, not the whole archive.
+        for pkg in apt_cache.get_changes():
             # those should be already on each system, it also prevents
             # diving into downloading libc6
             if pkg.candidate.priority in "essential" and pkg.name not in package_names:
@@ -446,44 +547,108 @@ class Ubuntu(BaseRepo):
         # 2. Download packages in a different manner.
         #
         # In the end, (2) was chosen for minimal overhead and a simpler cache
-        # implementation. So we're using fetch_binary() here instead.
-        # Downloading each package individually has the drawback of witholding
-        # any clue of how long the whole pulling process will take, but that's
-        # something we'll have to live with.
-        pkg_list = []
-        for package in apt_cache.get_changes():
-            pkg_list.append(str(package.candidate))
-            source = self._apt.fetch_binary(
-                package_candidate=package.candidate,
-                destination=self._cache.packages_dir,
-            )
+        # implementation. So we're using fetch_binaries() here instead, which
+        # queues every package into a single apt acquire run.
+        changes = apt_cache.get_changes()
+        pkg_list = [str(package.candidate) for package in changes]
+        package_candidates = [package.candidate for package in changes]
+        sources = self._apt.fetch_binaries(
+            package_candidates=package_candidates, destination=self._cache.packages_dir
+        )
+        for package_candidate, source in zip(package_candidates, sources):
             destination = os.path.join(self._downloaddir, os.path.basename(source))
             with contextlib.suppress(FileNotFoundError):
                 os.remove(destination)
             file_utils.link_or_copy(source, destination)
+            # apt has checked the download against the digest recorded in
+            # the archive, keep it so unpacking need not hash the file again.
+            _write_package_digest(destination, package_candidate.sha256)
 
         return pkg_list
 
     def unpack(self, unpackdir) -> None:
         pkgs_abs_path = glob.glob(os.path.join(self._downloaddir, "*.deb"))
-        for pkg in pkgs_abs_path:
-            # TODO needs elegance and error control
-            try:
-                subprocess.check_call(["dpkg-deb", "--extract", pkg, unpackdir])
-            except subprocess.CalledProcessError:
-                raise errors.UnpackError(pkg)
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._parallel_build_count
+        ) as executor:
+            unpacked_trees = list(executor.map(self._unpack_to_cache, pkgs_abs_path))
+
+        # The unpacked files are copied rather than hard-linked, they are
+        # modified in place from here on (normalized, patched, stripped...)
+        # and must not change in the cache through a shared inode. Copies
+        # share their contents with the cache where the filesystem allows.
+        for unpacked_tree in unpacked_trees:
+            file_utils.link_or_copy_tree(
+                unpacked_tree,
+                unpackdir,
+                copy_function=file_utils.copy,
+                max_workers=self._parallel_build_count,
+            )
         self.normalize(unpackdir)
 
-    def _manifest_dep_names(self, apt_cache):
-        manifest_dep_names = set()
+    def _unpack_to_cache(self, pkg: str) -> str:
+        pkg_digest = _read_package_digest(pkg)
+        unpacked_tree = os.path.join(self._cache.unpacked_dir, pkg_digest)
+        if os.path.isdir(unpacked_tree):
+            logger.debug("Using cached unpack of {!r}".format(pkg))
+            return unpacked_tree
 
+        # Unpack into a temporary directory first so a partial unpack never
+        # ends up looking like a valid cache entry.
+        temp_tree = tempfile.mkdtemp(dir=self._cache.unpacked_dir)
+        try:
+            subprocess.check_call(["dpkg-deb", "--extract", pkg, temp_tree])
+        except subprocess.CalledProcessError:
+            shutil.rmtree(temp_tree)
+            raise errors.UnpackError(pkg)
+
+        # Files in the cache are copied into each unpack directory, so the
+        # suid/guid bits are removed here once and for all.
+        for root, dirs, files in os.walk(temp_tree):
+            for entry in files:
+                path = os.path.join(root, entry)
+                if not os.path.islink(path):
+                    _fix_filemode(path)
+        # mkdtemp creates the directory as private, but its mode is what the
+        # unpack directory will end up with.
+        os.chmod(temp_tree, 0o755)
+
+        try:
+            os.rename(temp_tree, unpacked_tree)
+        except OSError:
+            # Another unpack of the same package won the race.
+            shutil.rmtree(temp_tree)
+        return unpacked_tree
+
+
+def _write_package_digest(pkg: str, digest: Optional[str]) -> None:
+    digest_path = "{}.sha256".format(pkg)
+    with contextlib.suppress(FileNotFoundError):
+        os.remove(digest_path)
+    # Not every archive records a SHA256 digest.
+    if isinstance(digest, str) and _SHA256_PATTERN.match(digest):
+        with open(digest_path, "w") as digest_file:
+            digest_file.write(digest)
+
+
+def _read_package_digest(pkg: str) -> str:
+    # Packages downloaded by older versions of snapcraft have no recorded
+    # digest, they are hashed here instead.
+    with contextlib.suppress(FileNotFoundError):
+        with open("{}.sha256".format(pkg)) as digest_file:
+            digest = digest_file.read().strip()
+        if _SHA256_PATTERN.match(digest):
+            return digest
+    return file_utils.calculate_hash(pkg, algorithm="sha256")
+
+
+def _get_manifest_dep_names() -> Set[str]:
+    global _manifest_dep_names
+    if _manifest_dep_names is None:
         with open(os.path.abspath(os.path.join(__file__, "..", "manifest.txt"))) as f:
-            for line in f:
-                pkg = line.strip()
-                if pkg in apt_cache:
-                    manifest_dep_names.add(pkg)
+            _manifest_dep_names = {line.strip() for line in f} - {""}
 
-        return manifest_dep_names
+    return _manifest_dep_names
 
 
 def _get_local_sources_list():
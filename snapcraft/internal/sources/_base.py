@@ -13,17 +13,20 @@
 #
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
+import hashlib
 import os
 import requests
 import shutil
 
 import snapcraft.internal.common
+from snapcraft import file_utils
 from snapcraft.internal.cache import FileCache
 from snapcraft.internal.indicators import (
     download_requests_stream,
     download_urllib_source,
 )
 from ._checksum import split_checksum, verify_checksum
+from . import errors
 from .errors import SourceUpdateUnsupportedError
 
 
@@ -109,13 +112,15 @@ class FileBase(Base):
         # First check if we already have the source file cached.
         file_cache = FileCache()
         if self.source_checksum:
-            algorithm, hash = split_checksum(self.source_checksum)
-            cache_file = file_cache.get(algorithm=algorithm, hash=hash)
+            algorithm, digest = split_checksum(self.source_checksum)
+            cache_file = file_cache.get(algorithm=algorithm, hash=digest)
             if cache_file:
                 self.file = os.path.join(self.source_dir, os.path.basename(cache_file))
                 # We make this copy as the provisioning logic can delete
-                # this file and we don't want that.
-                shutil.copy2(cache_file, self.file)
+                # this file and we don't want that. It is not a hard link
+                # so that changes to it cannot make their way into the cache,
+                # but it shares its contents with it where possible.
+                file_utils.copy2(cache_file, self.file)
                 return self.file
 
         # If not we download and store
@@ -123,15 +128,27 @@ class FileBase(Base):
 
         if snapcraft.internal.common.get_url_scheme(self.source) == "ftp":
             download_urllib_source(self.source, self.file)
+            # We verify the file if source_checksum is defined.
+            if self.source_checksum:
+                verify_checksum(self.source_checksum, self.file)
         else:
             request = requests.get(self.source, stream=True, allow_redirects=True)
             request.raise_for_status()
 
-            download_requests_stream(request, self.file)
-
-        # We verify the file if source_checksum is defined
-        # and we cache the file for future reuse.
+            if self.source_checksum:
+                # The file is verified as it is written, instead of reading it
+                # back once downloaded.
+                hasher = getattr(hashlib, algorithm)()
+                download_requests_stream(request, self.file, hasher=hasher)
+                calculated_digest = hasher.hexdigest()
+                if digest != calculated_digest:
+                    raise errors.DigestDoesNotMatchError(digest, calculated_digest)
+            else:
+                download_requests_stream(request, self.file)
+
+        # We cache the verified file for future reuse.
         if self.source_checksum:
-            algorithm, digest = verify_checksum(self.source_checksum, self.file)
-            file_cache.cache(filename=self.file, algorithm=algorithm, hash=hash)
+            file_cache.cache(
+                filename=self.file, algorithm=algorithm, hash=digest, verify=False
+            )
         return self.file
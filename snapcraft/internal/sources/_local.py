@@ -14,33 +14,153 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import collections
+import contextlib
 import copy
 import functools
 import glob
+import json
+import logging
 import os
+import shutil
+from typing import Dict, Iterator, List, Optional, Tuple  # noqa: F401
 
 from snapcraft import file_utils
 from snapcraft.internal import common
 from ._base import Base
 
 
+logger = logging.getLogger(__name__)
+
+# For every path in a snapshot, relative to the source: its size, its
+# modification time and its inode, or None for directories.
+_Snapshot = Dict[str, Optional[List[int]]]
+
+_SNAPSHOT_VERSION = 1
+
+
 class Local(Base):
-    def __init__(self, *args, copy_function=file_utils.link_or_copy, **kwargs):
+    def __init__(
+        self,
+        *args,
+        copy_function=file_utils.link_or_copy,
+        snapshot_file: str = None,
+        **kwargs
+    ):
+        """Initialize a local source.
+
+        :param callable copy_function: Callable that actually copies.
+        :param str snapshot_file: If given, where a snapshot of the source is
+                                  saved when pulling. Changes are then found
+                                  by comparing the source to it, instead of
+                                  to the modification time of a target.
+        """
         super().__init__(*args, **kwargs)
         self.source_abspath = os.path.abspath(self.source)
         self.copy_function = copy_function
+        self.snapshot_file = snapshot_file
+        self._snapshot = None  # type: Optional[_Snapshot]
 
         self._ignore = functools.partial(_ignore, self.source_abspath, os.getcwd())
 
     def pull(self):
+        # The snapshot is taken first so that whatever changes while copying
+        # is found the next time around.
+        snapshot = self._take_snapshot()
         file_utils.link_or_copy_tree(
             self.source_abspath,
             self.source_dir,
             ignore=self._ignore,
             copy_function=self.copy_function,
         )
+        self._save_snapshot(snapshot)
+
+    def _walk(self) -> Iterator[Tuple[str, Optional[List[int]]]]:
+        # Yields the paths of the source, parents first, along with their
+        # snapshot entry.
+        pending = [""]
+        while pending:
+            relative_root = pending.pop()
+            root = (
+                os.path.join(self.source_abspath, relative_root)
+                if relative_root
+                else self.source_abspath
+            )
+            try:
+                entries = list(os.scandir(root))
+            except OSError as e:
+                # Just like os.walk, skip what cannot be listed.
+                logger.debug("Unable to list {}: {}".format(root, e))
+                continue
+            ignored = set(self._ignore(root, [entry.name for entry in entries]))
+            for entry in entries:
+                if entry.name in ignored:
+                    continue
+                relative_path = os.path.join(relative_root, entry.name)
+                # Symlinks to directories are handled like files.
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(relative_path)
+                    yield relative_path, None
+                else:
+                    entry_stat = entry.stat(follow_symlinks=False)
+                    yield relative_path, [
+                        entry_stat.st_size,
+                        entry_stat.st_mtime_ns,
+                        entry_stat.st_ino,
+                    ]
+
+    def _take_snapshot(self) -> Optional[_Snapshot]:
+        if self.snapshot_file is None:
+            return None
+        return collections.OrderedDict(self._walk())
+
+    def _save_snapshot(self, snapshot: Optional[_Snapshot]) -> None:
+        if snapshot is None:
+            return
+        os.makedirs(os.path.dirname(self.snapshot_file), exist_ok=True)
+        with open(self.snapshot_file, "w") as snapshot_file:
+            json.dump(
+                {"version": _SNAPSHOT_VERSION, "entries": snapshot}, snapshot_file
+            )
+
+    def _load_snapshot(self) -> Optional[_Snapshot]:
+        if self.snapshot_file is None:
+            return None
+        try:
+            with open(self.snapshot_file) as snapshot_file:
+                snapshot_data = json.load(snapshot_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as error:
+            logger.debug(
+                "Ignoring unreadable snapshot {!r}: {}".format(
+                    self.snapshot_file, error
+                )
+            )
+            return None
+
+        if snapshot_data.get("version") != _SNAPSHOT_VERSION:
+            return None
+        return snapshot_data.get("entries")
 
     def _check(self, target):
+        self._snapshot = self._load_snapshot()
+        if self._snapshot is None:
+            return self._check_modification_times(target)
+
+        # Stop at the first difference, what changed is only worked out
+        # when updating.
+        found = 0
+        for relative_path, entry in self._walk():
+            if relative_path not in self._snapshot:
+                return True
+            if self._snapshot[relative_path] != entry:
+                return True
+            found += 1
+        # Anything not found was removed from the source.
+        return found != len(self._snapshot)
+
+    def _check_modification_times(self, target):
         try:
             target_mtime = os.lstat(target).st_mtime
         except FileNotFoundError:
@@ -61,13 +181,12 @@ class Local(Base):
                 if os.lstat(path).st_mtime >= target_mtime:
                     self._updated_files.add(os.path.relpath(path, self.source))
 
+            unchanged_directories = []
             for directory in directories:
                 path = os.path.join(root, directory)
                 if os.lstat(path).st_mtime >= target_mtime:
                     # Don't decend into this directory-- we'll just copy it
                     # entirely.
-                    directories.remove(directory)
-
                     # os.walk will include symlinks to directories here, but we
                     # want to treat those as files
                     relpath = os.path.relpath(path, self.source)
@@ -75,10 +194,19 @@ class Local(Base):
                         self._updated_files.add(relpath)
                     else:
                         self._updated_directories.add(relpath)
+                else:
+                    unchanged_directories.append(directory)
+            directories[:] = unchanged_directories
 
         return len(self._updated_files) > 0 or len(self._updated_directories) > 0
 
     def _update(self):
+        if self._snapshot is None:
+            self._update_modified()
+        else:
+            self._update_from_snapshot()
+
+    def _update_modified(self):
         # First, copy the directories
         for directory in self._updated_directories:
             file_utils.link_or_copy_tree(
@@ -95,6 +223,41 @@ class Local(Base):
                 os.path.join(self.source_dir, file_path),
             )
 
+        self._save_snapshot(self._take_snapshot())
+
+    def _update_from_snapshot(self):
+        snapshot = self._take_snapshot()
+
+        # Children are removed before their parents.
+        for relative_path in sorted(set(self._snapshot) - set(snapshot), reverse=True):
+            _remove(os.path.join(self.source_dir, relative_path))
+
+        # Parents come first in a snapshot, so directories are created before
+        # anything is copied into them.
+        for relative_path, entry in snapshot.items():
+            previous_entry = self._snapshot.get(relative_path, [])
+            if previous_entry == entry:
+                continue
+            source = os.path.join(self.source_abspath, relative_path)
+            destination = os.path.join(self.source_dir, relative_path)
+            # A file replaced by a directory, or the other way around.
+            if (previous_entry is None) != (entry is None):
+                _remove(destination)
+            if entry is None:
+                file_utils.create_similar_directory(source, destination)
+            else:
+                self.copy_function(source, destination)
+
+        self._save_snapshot(snapshot)
+
+
+def _remove(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(path)
+
 
 def _ignore(source, current_directory, directory, files):
     if directory == source or directory == current_directory:
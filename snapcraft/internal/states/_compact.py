@@ -0,0 +1,128 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+"""A compact encoding for states, as an alternative to YAML.
+
+States for the stage and prime steps list every file and directory of a
+part, which can be tens of thousands of entries that are slow to go
+through PyYAML. The compact encoding is zlib compressed JSON, with sets of
+strings (such as those lists) stored as plain sorted lists.
+
+Values are encoded as follows:
+    - str, int, float, bool, None and lists as themselves.
+    - tuples as {"tuple": [item, ...]}.
+    - bytes as {"bytes": base64_string}.
+    - mappings as {"map": [[key, value], ...]}, keeping their order.
+    - sets as {"set": [item, ...]}.
+    - YAML objects as {"object": yaml_tag, "state": attributes}.
+
+Any other value cannot be encoded, and dump raises TypeError for it so that
+the state can be saved as YAML instead.
+"""
+
+import base64
+import collections
+import json
+import os
+import zlib
+from typing import Any, Dict, Type  # noqa: F401
+
+from snapcraft import yaml_utils
+
+MAGIC = b"\0snapcraft-state 1\n"
+
+
+def is_enabled() -> bool:
+    """Return True if states are to be saved in the compact encoding."""
+    return bool(os.environ.get("SNAPCRAFT_COMPACT_STATE"))
+
+
+def dump(state: Any) -> bytes:
+    """Return state in the compact encoding.
+
+    :param state: the state to encode.
+    :raises TypeError: if state holds a value that cannot be encoded.
+    """
+    return MAGIC + zlib.compress(
+        json.dumps(_encode(state), separators=(",", ":")).encode()
+    )
+
+
+def load(data: bytes) -> Any:
+    """Return the state encoded in data.
+
+    :param bytes data: the encoded state, starting with MAGIC.
+    """
+    return _decode(json.loads(zlib.decompress(data[len(MAGIC) :]).decode()))
+
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, yaml_utils.SnapcraftYAMLObject):
+        return {"object": value.yaml_tag, "state": _encode(value.__dict__)}
+    elif isinstance(value, dict):
+        return {"map": [[_encode(k), _encode(v)] for k, v in value.items()]}
+    elif isinstance(value, (set, frozenset)):
+        # The common case of a set of paths is kept fast.
+        if all(isinstance(item, str) for item in value):
+            return {"set": sorted(value)}
+        return {"set": [_encode(item) for item in value]}
+    elif isinstance(value, list):
+        return [_encode(item) for item in value]
+    elif isinstance(value, tuple):
+        return {"tuple": [_encode(item) for item in value]}
+    elif isinstance(value, bytes):
+        return {"bytes": base64.b64encode(value).decode()}
+    elif value is None or isinstance(value, (str, int, float, bool)):
+        return value
+
+    raise TypeError("cannot encode {!r} in a state".format(value))
+
+
+def _decode(value: Any) -> Any:
+    if isinstance(value, list):
+        return [_decode(item) for item in value]
+    elif not isinstance(value, dict):
+        return value
+    elif "set" in value:
+        items = value["set"]
+        if all(isinstance(item, str) for item in items):
+            return set(items)
+        return {_decode(item) for item in items}
+    elif "tuple" in value:
+        return tuple(_decode(item) for item in value["tuple"])
+    elif "bytes" in value:
+        return base64.b64decode(value["bytes"])
+    elif "map" in value:
+        return collections.OrderedDict(
+            (_decode(k), _decode(v)) for k, v in value["map"]
+        )
+
+    # Just like when loading YAML, objects are created without calling
+    # their __init__.
+    state_class = _get_state_classes()[value["object"]]
+    state = state_class.__new__(state_class)
+    state.__dict__.update(_decode(value["state"]))
+    return state
+
+
+def _get_state_classes() -> Dict[str, Type[yaml_utils.SnapcraftYAMLObject]]:
+    state_classes = dict()  # type: Dict[str, Type[yaml_utils.SnapcraftYAMLObject]]
+    pending = [yaml_utils.SnapcraftYAMLObject]
+    while pending:
+        for subclass in pending.pop().__subclasses__():
+            state_classes[getattr(subclass, "yaml_tag", None)] = subclass
+            pending.append(subclass)
+    return state_classes
@@ -14,10 +14,15 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import logging
 import os
+from typing import Optional
 
 from snapcraft import yaml_utils
 from snapcraft.internal import steps
+from snapcraft.internal.states import _compact
+
+logger = logging.getLogger(__name__)
 
 
 class State(yaml_utils.SnapcraftYAMLObject):
@@ -92,11 +97,53 @@ def get_state(state_dir: str, step: steps.Step):
     state = None
     state_file = get_step_state_file(state_dir, step)
     if os.path.isfile(state_file):
-        with open(state_file, "r") as f:
-            state = yaml_utils.load(f)
+        with open(state_file, "rb") as f:
+            data = f.read()
+        if data.startswith(_compact.MAGIC):
+            state = _compact.load(data)
+        else:
+            with open(state_file, "r") as f:
+                state = yaml_utils.load(f)
+            if _compact.is_enabled():
+                _migrate_state_file(state_file, state)
 
     return state
 
 
+def save_state(state_dir: str, step: steps.Step, state) -> None:
+    state_file = get_step_state_file(state_dir, step)
+    data = _dump_compact(state) if _compact.is_enabled() else None
+    if data is not None:
+        with open(state_file, "wb") as f:
+            f.write(data)
+    else:
+        with open(state_file, "w") as f:
+            f.write(yaml_utils.dump(state))
+
+
+def _dump_compact(state) -> Optional[bytes]:
+    try:
+        return _compact.dump(state)
+    except TypeError as e:
+        # Such a state is still saved, and kept, as YAML.
+        logger.debug("Unable to save state in the compact encoding: {}".format(e))
+        return None
+
+
+def _migrate_state_file(state_file: str, state) -> None:
+    data = _dump_compact(state)
+    if data is None:
+        return
+
+    # The modification time of a state file tells when its step ran, so it
+    # is kept as is.
+    state_stat = os.stat(state_file)
+    temp_file = state_file + ".compact"
+    with open(temp_file, "wb") as f:
+        f.write(data)
+    os.utime(temp_file, ns=(state_stat.st_atime_ns, state_stat.st_mtime_ns))
+    os.replace(temp_file, state_file)
+
+
 def get_step_state_file(state_dir: str, step: steps.Step) -> str:
     return os.path.join(state_dir, step.name)
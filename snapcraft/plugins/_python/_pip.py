@@ -15,7 +15,9 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import collections
+import concurrent.futures
 import contextlib
+import glob
 import json
 import logging
 import os
@@ -25,16 +27,28 @@ import stat
 import subprocess
 import sys
 import tempfile
-from typing import List, Set
+from typing import Dict, List, Optional, Set, Tuple  # noqa: F401
 
 import snapcraft
 from snapcraft import file_utils
 from snapcraft.internal import mangling
+from snapcraft.internal.cache import WheelCache
 from ._python_finder import get_python_command, get_python_headers, get_python_home
 from . import errors
 
 logger = logging.getLogger(__name__)
 
+# The extensions of the source distributions pip downloads.
+_SDIST_EXTENSIONS = (".tar.gz", ".tgz", ".tar.bz2", ".tar.xz", ".zip")
+
+# Prints the ABI and architecture wheels are built for, e.g.
+# cpython-35m-x86_64-linux-gnu. Python 2 has no SOABI, so it is made up.
+_ABI_SCRIPT = (
+    "import platform, sys, sysconfig; "
+    "print(sysconfig.get_config_var('SOABI') or 'cpython-{}{}-{}'.format("
+    "sys.version_info[0], sys.version_info[1], platform.machine()))"
+)
+
 
 def _process_common_args(
     *,
@@ -84,14 +98,66 @@ def _replicate_owner_mode(path):
     os.chmod(path, new_mode)
 
 
-def _fix_permissions(path):
+def _fix_installed_files(path):
+    # Permissions and shebangs are fixed while walking path just once.
     for root, dirs, files in os.walk(path):
         for filename in files:
-            _replicate_owner_mode(os.path.join(root, filename))
+            file_path = os.path.join(root, filename)
+            _replicate_owner_mode(file_path)
+            # Don't bother trying to rewrite a symlink. It's either invalid
+            # or the linked file will be rewritten on its own.
+            if not os.path.islink(file_path):
+                mangling.rewrite_python_shebang(file_path)
         for dirname in dirs:
             _replicate_owner_mode(os.path.join(root, dirname))
 
 
+def _canonicalize_name(name: str) -> str:
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+def _split_sdist_name(file_name: str) -> Optional[Tuple[str, str]]:
+    for extension in _SDIST_EXTENSIONS:
+        if file_name.endswith(extension):
+            name, _, version = file_name[: -len(extension)].rpartition("-")
+            return _canonicalize_name(name), version
+    return None
+
+
+def _split_wheel_name(file_name: str) -> Tuple[str, str]:
+    name, version = file_name.split("-")[:2]
+    return _canonicalize_name(name), version
+
+
+def _read_distribution(path: str) -> Optional[Tuple[str, str]]:
+    if path.endswith(".dist-info"):
+        metadata_path = os.path.join(path, "METADATA")
+    elif os.path.isdir(path):
+        metadata_path = os.path.join(path, "PKG-INFO")
+    else:
+        # An .egg-info file holds the metadata itself.
+        metadata_path = path
+
+    name = None
+    version = None
+    try:
+        with open(metadata_path, encoding="utf-8", errors="replace") as metadata:
+            # Only the headers, up to the first empty line, are of interest.
+            for line in metadata:
+                if not line.strip():
+                    break
+                elif line.startswith("Name:"):
+                    name = line[len("Name:") :].strip()
+                elif line.startswith("Version:"):
+                    version = line[len("Version:") :].strip()
+    except OSError:
+        return None
+
+    if not name or not version:
+        return None
+    return name, version
+
+
 class Pip:
     """Wrapper for pip abstracting the args necessary for use in a part.
 
@@ -103,7 +169,15 @@ class Pip:
     before they can be installed or have wheels built.
     """
 
-    def __init__(self, *, python_major_version, part_dir, install_dir, stage_dir):
+    def __init__(
+        self,
+        *,
+        python_major_version,
+        part_dir,
+        install_dir,
+        stage_dir,
+        parallel_build_count=1
+    ):
         """Initialize pip.
 
         You must call setup() before you can actually use pip.
@@ -113,6 +187,7 @@ class Pip:
         :param str part_dir: Path to the part's working area
         :param str install_dir: Path to the part's install area
         :param str stage_dir: Path to the staging area
+        :param int parallel_build_count: The number of wheels to build at once
 
         :raises MissingPythonCommandError: If no python could be found in the
                                            staging or part's install area.
@@ -120,12 +195,14 @@ class Pip:
         self._python_major_version = python_major_version
         self._install_dir = install_dir
         self._stage_dir = stage_dir
+        self._parallel_build_count = parallel_build_count
 
         self._python_package_dir = os.path.join(part_dir, "python-packages")
         os.makedirs(self._python_package_dir, exist_ok=True)
 
         self.__python_command = None  # type:str
         self.__python_home = None  # type: str
+        self.__python_abi = None  # type: str
 
     @property
     def _python_command(self):
@@ -149,6 +226,15 @@ class Pip:
             )
         return self.__python_home
 
+    @property
+    def _python_abi(self):
+        """Lazily determine the ABI and architecture of the python used."""
+        if not self.__python_abi:
+            self.__python_abi = snapcraft.internal.common.run_output(
+                [self._python_command, "-c", _ABI_SCRIPT], env=self.env()
+            )
+        return self.__python_abi
+
     def setup(self):
         """Install pip and dependencies.
 
@@ -354,11 +440,9 @@ class Pip:
         )
 
         # Installing with --user results in a directory with 700 permissions.
-        # We need it a bit more open than that, so open it up.
-        _fix_permissions(self._install_dir)
-
-        # Fix all shebangs to use the in-snap python.
-        mangling.rewrite_python_shebangs(self._install_dir)
+        # We need it a bit more open than that, so open it up. Also fix all
+        # shebangs to use the in-snap python.
+        _fix_installed_files(self._install_dir)
 
     def wheel(
         self,
@@ -372,6 +456,9 @@ class Pip:
         """Build wheels of packages in the cache.
 
         The packages should have already been downloaded via `download()`.
+        Wheels for the source distributions in the cache are built first, up
+        to parallel_build_count at a time, so that pip only needs to resolve
+        the packages and build the wheels for setup_py_dir.
 
         :param iterable packages: Packages in cache for which to build wheels.
         :param str setup_py_dir: Directory containing setup.py.
@@ -399,6 +486,8 @@ class Pip:
         if not args:
             return []  # No operation was requested
 
+        self._build_sdist_wheels()
+
         wheels = []
         with tempfile.TemporaryDirectory() as temp_dir:
 
@@ -433,6 +522,71 @@ class Pip:
 
         return [os.path.join(self._python_package_dir, wheel) for wheel in wheels]
 
+    def _build_sdist_wheels(self):
+        built = set()  # type: Set[Tuple[str, str]]
+        sdists = []  # type: List[str]
+        for file_name in os.listdir(self._python_package_dir):
+            if file_name.endswith(".whl"):
+                built.add(_split_wheel_name(file_name))
+            elif _split_sdist_name(file_name):
+                sdists.append(file_name)
+
+        sdists = [s for s in sdists if _split_sdist_name(s) not in built]
+        if not sdists:
+            return
+
+        # Determined once, rather than by each of the builds.
+        abi = self._python_abi
+        wheel_cache = WheelCache()
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=self._parallel_build_count
+        ) as executor:
+            futures = [
+                executor.submit(
+                    self._build_sdist_wheel,
+                    os.path.join(self._python_package_dir, sdist),
+                    abi=abi,
+                    wheel_cache=wheel_cache,
+                )
+                for sdist in sdists
+            ]
+            for future in futures:
+                future.result()
+
+    def _build_sdist_wheel(self, sdist, *, abi, wheel_cache):
+        if wheel_cache.get(sdist=sdist, abi=abi, wheel_dir=self._python_package_dir):
+            return
+
+        with tempfile.TemporaryDirectory() as temp_dir:
+            # The output is not shown as builds run concurrently. A failed
+            # build is not an error here, it is retried (and reported) by the
+            # pip wheel call resolving every package.
+            try:
+                self._run_output(
+                    [
+                        "wheel",
+                        "--no-deps",
+                        "--no-index",
+                        "--find-links",
+                        self._python_package_dir,
+                        "--wheel-dir",
+                        temp_dir,
+                        sdist,
+                    ],
+                    stderr=subprocess.STDOUT,
+                )
+            except subprocess.CalledProcessError as e:
+                logger.debug("Unable to build a wheel for {!r}: {}".format(sdist, e))
+                return
+
+            wheels = [os.path.join(temp_dir, w) for w in os.listdir(temp_dir)]
+            wheel_cache.cache(sdist=sdist, abi=abi, wheels=wheels)
+            for wheel in wheels:
+                file_utils.link_or_copy(
+                    wheel,
+                    os.path.join(self._python_package_dir, os.path.basename(wheel)),
+                )
+
     def list(self, *, user=False):
         """Determine which packages have been installed.
 
@@ -471,6 +625,46 @@ class Pip:
             packages[package["name"]] = package["version"]
         return packages
 
+    def list_installed(self):
+        """Determine which packages have been installed, without running pip.
+
+        This is list() reading the metadata of the installed packages from
+        the locations the python used looks into.
+
+        :return: Dict of installed python packages and their versions
+        :rtype: dict
+        """
+        python_lib = "python{}*".format(self._python_major_version)
+        # Packages in the user site take precedence, so they come last.
+        site_patterns = [
+            os.path.join(self._python_home, "lib", python_lib),
+            os.path.join(self._python_home, "lib", python_lib, "dist-packages"),
+            os.path.join(self._python_home, "lib", python_lib, "site-packages"),
+            os.path.join(
+                self._python_home, "local", "lib", python_lib, "dist-packages"
+            ),
+            os.path.join(self._install_dir, "lib", python_lib, "site-packages"),
+        ]
+
+        site_dirs = []  # type: List[str]
+        for site_pattern in site_patterns:
+            site_dirs.extend(
+                p for p in sorted(glob.glob(site_pattern)) if os.path.isdir(p)
+            )
+
+        packages = dict()  # type: Dict[str, str]
+        for site_dir in site_dirs:
+            for file_name in sorted(os.listdir(site_dir)):
+                if file_name.endswith((".dist-info", ".egg-info")):
+                    distribution = _read_distribution(os.path.join(site_dir, file_name))
+                    if distribution:
+                        name, version = distribution
+                        packages[name] = version
+
+        return collections.OrderedDict(
+            (name, packages[name]) for name in sorted(packages, key=str.lower)
+        )
+
     def clean_packages(self):
         """Remove the package cache."""
         with contextlib.suppress(FileNotFoundError):
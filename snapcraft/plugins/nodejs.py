@@ -57,6 +57,7 @@ import snapcraft
 from snapcraft import sources
 from snapcraft.file_utils import link_or_copy_tree
 from snapcraft.internal import errors
+from snapcraft.internal.cache import ToolchainCache
 
 logger = logging.getLogger(__name__)
 
@@ -150,7 +151,7 @@ class NodePlugin(snapcraft.BasePlugin):
     def pull(self):
         super().pull()
         os.makedirs(self._npm_dir, exist_ok=True)
-        self._nodejs_tar.download()
+        self._fetch_nodejs()
         if self.options.node_package_manager == "yarn":
             self._yarn_tar.download()
         # do the install in the pull phase to download all dependencies.
@@ -159,6 +160,24 @@ class NodePlugin(snapcraft.BasePlugin):
         else:
             self._yarn_install(rootdir=self.sourcedir)
 
+    def _fetch_nodejs(self):
+        # The release is only given by node-engine and the architecture, so
+        # it can be shared by every part using it. Unlike yarn, which is
+        # always the latest release.
+        toolchain_cache = ToolchainCache(tool="node")
+        tarball = os.path.join(
+            self._npm_dir, os.path.basename(self._nodejs_release_uri)
+        )
+        cache_key = dict(
+            path=tarball, version=self.options.node_engine, arch=self.project.deb_arch
+        )
+        if toolchain_cache.get(**cache_key):
+            return
+
+        self._nodejs_tar.download()
+        if os.path.isfile(tarball):
+            toolchain_cache.cache(**cache_key)
+
     def clean_pull(self):
         super().clean_pull()
 
@@ -181,6 +181,7 @@ class PythonPlugin(snapcraft.BasePlugin):
                 part_dir=self.partdir,
                 install_dir=self.installdir,
                 stage_dir=self.project.stage_dir,
+                parallel_build_count=self.parallel_build_count,
             )
         return self.__pip
 
@@ -297,7 +298,7 @@ class PythonPlugin(snapcraft.BasePlugin):
         return requirements
 
     def _install_wheels(self, wheels):
-        installed = self._pip.list()
+        installed = self._pip.list_installed()
         wheel_names = [os.path.basename(w).split("-")[0] for w in wheels]
 
         # we want to avoid installing what is already provided in
@@ -350,7 +351,7 @@ class PythonPlugin(snapcraft.BasePlugin):
                 with contextlib.suppress(SnapcraftPluginCommandError):
                     self._setup_tools_install(setup_py_path)
 
-        return self._pip.list()
+        return self._pip.list_installed()
 
     def _setup_tools_install(self, setup_file):
         command = [
@@ -367,11 +368,24 @@ class PythonPlugin(snapcraft.BasePlugin):
             "--record",
             "install.txt",
         ]
-        self.run(command, env=self._pip.env(), cwd=os.path.dirname(setup_file))
+        cwd = os.path.dirname(setup_file)
+        self.run(command, env=self._pip.env(), cwd=cwd)
 
         # Fix all shebangs to use the in-snap python. The stuff installed from
-        # pip has already been fixed, but anything done in this step has not.
-        mangling.rewrite_python_shebangs(self.installdir)
+        # pip has already been fixed, but anything done in this step has not,
+        # and it is all listed in the record.
+        try:
+            with open(os.path.join(cwd, "install.txt")) as record_file:
+                installed_files = record_file.read().splitlines()
+        except FileNotFoundError:
+            mangling.rewrite_python_shebangs(self.installdir)
+            return
+
+        for installed_file in installed_files:
+            # The paths are absolute unless installing into a different root.
+            installed_path = os.path.join(cwd, installed_file)
+            if os.path.isfile(installed_path) and not os.path.islink(installed_path):
+                mangling.rewrite_python_shebang(installed_path)
 
     def _get_file_contents(self, path):
         if isurl(path):
@@ -39,6 +39,7 @@ Additionally, this plugin uses the following plugin-specific keywords:
 import collections
 import logging
 import os
+import platform
 import shutil
 from contextlib import suppress
 
@@ -46,6 +47,7 @@ import snapcraft
 from snapcraft import sources
 from snapcraft import shell_utils
 from snapcraft.internal import errors
+from snapcraft.internal.cache import ToolchainCache
 
 _RUSTUP = "https://static.rust-lang.org/rustup.sh"
 logger = logging.getLogger(__name__)
@@ -222,6 +224,20 @@ class RustPlugin(snapcraft.BasePlugin):
                 raise errors.SnapcraftEnvironmentError(
                     "{} is not a valid rust channel".format(self.options.rust_channel)
                 )
+        # Only a given revision can be shared by every part using it, what
+        # channels point to changes over time.
+        toolchain_cache = ToolchainCache(tool="rust")
+        cache_key = None
+        if self.options.rust_revision:
+            version = self.options.rust_revision
+            if self.project.is_cross_compiling:
+                version = "{}-{}".format(version, self._target)
+            cache_key = dict(
+                path=self._rustpath, version=version, arch=platform.machine()
+            )
+            if toolchain_cache.get(**cache_key):
+                return
+
         os.makedirs(self._rustpath, exist_ok=True)
         self._rustup_get.download()
         cmd = [
@@ -234,6 +250,9 @@ class RustPlugin(snapcraft.BasePlugin):
             cmd.append("--with-target={}".format(self._target))
         self.run(cmd)
 
+        if cache_key and os.path.exists(self._rustc):
+            toolchain_cache.cache(**cache_key)
+
     def _fetch_deps(self):
         if self.options.source_subdir:
             sourcedir = os.path.join(self.sourcedir, self.options.source_subdir)
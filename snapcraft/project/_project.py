@@ -33,7 +33,8 @@ class Project(ProjectOptions):
         debug=False,
         snapcraft_yaml_file_path=None,
         work_dir: str = None,
-        is_managed_host: bool = False
+        is_managed_host: bool = False,
+        jobs: int = 1
     ) -> None:
 
         project_dir = os.getcwd()
@@ -52,10 +53,16 @@ class Project(ProjectOptions):
             self.info = ProjectInfo(snapcraft_yaml_file_path=snapcraft_yaml_file_path)
 
         self._global_state_file = os.path.join(internal_dir, "state")
+        self._status_index_file = os.path.join(internal_dir, "status-index.json")
         self._project_dir = project_dir
         self._work_dir = work_dir
         self._internal_dir = internal_dir
 
         super().__init__(
-            use_geoip, parallel_builds, target_deb_arch, debug, work_dir=work_dir
+            use_geoip,
+            parallel_builds,
+            target_deb_arch,
+            debug,
+            work_dir=work_dir,
+            jobs=jobs,
         )
@@ -228,6 +228,11 @@ class ProjectOptions:
     def debug(self):
         return self._debug
 
+    @property
+    def jobs(self) -> int:
+        """The number of parts that can be pulled or built at the same time."""
+        return self._jobs
+
     def __init__(
         self,
         use_geoip=False,
@@ -235,7 +240,8 @@ class ProjectOptions:
         target_deb_arch=None,
         debug=False,
         *,
-        work_dir: str = None
+        work_dir: str = None,
+        jobs: int = 1
     ) -> None:
 
         # Here for backwards compatibility.
@@ -246,6 +252,7 @@ class ProjectOptions:
         self._use_geoip = use_geoip
         self._parallel_builds = parallel_builds
         self._debug = debug
+        self._jobs = jobs
 
         self._parts_dir = os.path.join(work_dir, "parts")
         self._stage_dir = os.path.join(work_dir, "stage")
@@ -18,6 +18,7 @@ import collections
 import contextlib
 import copy
 import io
+import itertools
 import os
 import platform
 import pkgutil
@@ -786,6 +787,10 @@ class FakeAptCache(fixtures.Fixture):
         def close(self):
             pass
 
+        def clear(self):
+            for package in self.packages.values():
+                package.mark_keep()
+
         def update(self, *args, **kwargs):
             pass
 
@@ -824,19 +829,29 @@ class FakeAptCache(fixtures.Fixture):
         self.mock_apt_cache = patcher.start()
         self.addCleanup(patcher.stop)
 
+        # Start from a clean host packages snapshot.
+        patcher = mock.patch(
+            "snapcraft.repo._deb._host_packages", snapcraft.repo._deb._HostPackages()
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
         self.cache = self.Cache()
         self.mock_apt_cache.return_value = self.cache
         for package, version in self.packages:
             self.add_package(FakeAptCachePackage(package, version))
 
-        def fetch_binary(package_candidate, destination):
-            path = os.path.join(self.path, "{}.deb".format(package_candidate.name))
-            open(path, "w").close()
-            return path
-
-        patcher = mock.patch("snapcraft.repo._deb._AptCache.fetch_binary")
-        mock_fetch_binary = patcher.start()
-        mock_fetch_binary.side_effect = fetch_binary
+        def fetch_binaries(package_candidates, destination):
+            paths = []
+            for package_candidate in package_candidates:
+                path = os.path.join(self.path, "{}.deb".format(package_candidate.name))
+                open(path, "w").close()
+                paths.append(path)
+            return paths
+
+        patcher = mock.patch("snapcraft.repo._deb._AptCache.fetch_binaries")
+        mock_fetch_binaries = patcher.start()
+        mock_fetch_binaries.side_effect = fetch_binaries
         self.addCleanup(patcher.stop)
 
         # Add all the packages in the manifest.
@@ -884,6 +899,7 @@ class FakeAptCachePackage:
         else:
             self.installed = None
         self.priority = priority
+        self.sha256 = None
         self.marked_install = False
         self.is_auto_installed = False
 
@@ -1044,44 +1060,83 @@ def _fake_elffile_extract(self, path):
     name = os.path.basename(path)
     if name in [
         "fake_elf-2.26",
-        "fake_elf-bad-ldd",
         "fake_elf-with-core-libs",
         "fake_elf-bad-patchelf",
     ]:
         glibc = elf.NeededLibrary(name="libc.so.6")
         glibc.add_version("GLIBC_2.2.5")
         glibc.add_version("GLIBC_2.26")
-        return (arch, "/lib64/ld-linux-x86-64.so.2", "", {glibc.name: glibc}, False)
+        return (
+            arch,
+            "/lib64/ld-linux-x86-64.so.2",
+            "",
+            {glibc.name: glibc},
+            False,
+            [],
+            [],
+        )
     elif name == "fake_elf-2.23":
         glibc = elf.NeededLibrary(name="libc.so.6")
         glibc.add_version("GLIBC_2.2.5")
         glibc.add_version("GLIBC_2.23")
-        return (arch, "/lib64/ld-linux-x86-64.so.2", "", {glibc.name: glibc}, False)
+        return (
+            arch,
+            "/lib64/ld-linux-x86-64.so.2",
+            "",
+            {glibc.name: glibc},
+            False,
+            [],
+            [],
+        )
     elif name == "fake_elf-1.1":
         glibc = elf.NeededLibrary(name="libc.so.6")
         glibc.add_version("GLIBC_1.1")
         glibc.add_version("GLIBC_0.1")
-        return (arch, "/lib64/ld-linux-x86-64.so.2", "", {glibc.name: glibc}, False)
+        return (
+            arch,
+            "/lib64/ld-linux-x86-64.so.2",
+            "",
+            {glibc.name: glibc},
+            False,
+            [],
+            [],
+        )
     elif name == "fake_elf-static":
-        return arch, "", "", {}, False
+        return arch, "", "", {}, False, [], []
     elif name == "fake_elf-shared-object":
         openssl = elf.NeededLibrary(name="libssl.so.1.0.0")
         openssl.add_version("OPENSSL_1.0.0")
-        return arch, "", "libfake_elf.so.0", {openssl.name: openssl}, False
+        return arch, "", "libfake_elf.so.0", {openssl.name: openssl}, False, [], []
     elif name == "fake_elf-with-execstack":
         glibc = elf.NeededLibrary(name="libc.so.6")
         glibc.add_version("GLIBC_2.23")
-        return (arch, "/lib64/ld-linux-x86-64.so.2", "", {glibc.name: glibc}, True)
+        return (
+            arch,
+            "/lib64/ld-linux-x86-64.so.2",
+            "",
+            {glibc.name: glibc},
+            True,
+            [],
+            [],
+        )
     elif name == "fake_elf-with-bad-execstack":
         glibc = elf.NeededLibrary(name="libc.so.6")
         glibc.add_version("GLIBC_2.23")
-        return (arch, "/lib64/ld-linux-x86-64.so.2", "", {glibc.name: glibc}, True)
+        return (
+            arch,
+            "/lib64/ld-linux-x86-64.so.2",
+            "",
+            {glibc.name: glibc},
+            True,
+            [],
+            [],
+        )
     elif name == "libc.so.6":
-        return arch, "", "libc.so.6", {}, False
+        return arch, "", "libc.so.6", {}, False, [], []
     elif name == "libssl.so.1.0.0":
-        return arch, "", "libssl.so.1.0.0", {}, False
+        return arch, "", "libssl.so.1.0.0", {}, False, [], []
     else:
-        return arch, "", "", {}, False
+        return arch, "", "", {}, False, [], []
 
 
 class FakeElf(fixtures.Fixture):
@@ -1093,6 +1148,7 @@ class FakeElf(fixtures.Fixture):
 
         self.root_path = root_path
         self.core_base_path = None
+        self.host_path = None
         self._patchelf_version = patchelf_version
 
     def _setUp(self):
@@ -1100,6 +1156,19 @@ class FakeElf(fixtures.Fixture):
 
         self.core_base_path = self.useFixture(fixtures.TempDir()).path
 
+        # The libraries found on the "host"
+        self.host_path = self.useFixture(fixtures.TempDir()).path
+        host_library_paths = [
+            os.path.join(self.host_path, "lib"),
+            os.path.join(self.host_path, "usr", "lib"),
+        ]
+        patcher = mock.patch(
+            "snapcraft.internal.elf._get_host_library_paths",
+            return_value=host_library_paths,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
         binaries_path = os.path.join(get_snapcraft_path(), "tests", "bin", "elf")
 
         new_binaries_path = self.useFixture(fixtures.TempDir()).path
@@ -1114,13 +1183,6 @@ class FakeElf(fixtures.Fixture):
             )
             os.chmod(os.path.join(new_binaries_path, f), 0o755)
 
-        # Some values in ldd need to be set with core_path
-        with open(os.path.join(binaries_path, "ldd")) as rf:
-            with open(os.path.join(new_binaries_path, "ldd"), "w") as wf:
-                for line in rf.readlines():
-                    wf.write(line.replace("{CORE_PATH}", self.core_base_path))
-        os.chmod(os.path.join(new_binaries_path, "ldd"), 0o755)
-
         # Some values in ldd need to be set with core_path
         self.patchelf_path = os.path.join(new_binaries_path, "patchelf")
         with open(os.path.join(binaries_path, "patchelf")) as rf:
@@ -1151,9 +1213,6 @@ class FakeElf(fixtures.Fixture):
             "fake_elf-shared-object": elf.ElfFile(
                 path=os.path.join(self.root_path, "fake_elf-shared-object")
             ),
-            "fake_elf-bad-ldd": elf.ElfFile(
-                path=os.path.join(self.root_path, "fake_elf-bad-ldd")
-            ),
             "fake_elf-bad-patchelf": elf.ElfFile(
                 path=os.path.join(self.root_path, "fake_elf-bad-patchelf")
             ),
@@ -1180,8 +1239,16 @@ class FakeElf(fixtures.Fixture):
 
         self.root_libraries = {"foo.so.1": os.path.join(self.root_path, "foo.so.1")}
 
-        for root_library in self.root_libraries.values():
-            with open(root_library, "wb") as f:
+        self.host_libraries = {
+            "foo.so.1": os.path.join(self.host_path, "lib", "foo.so.1"),
+            "bar.so.2": os.path.join(self.host_path, "usr", "lib", "bar.so.2"),
+        }
+
+        for library in itertools.chain(
+            self.root_libraries.values(), self.host_libraries.values()
+        ):
+            os.makedirs(os.path.dirname(library), exist_ok=True)
+            with open(library, "wb") as f:
                 f.write(b"\x7fELF")
 
 
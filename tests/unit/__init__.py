@@ -169,6 +169,9 @@ class TestCase(testscenarios.WithScenarios, testtools.TestCase):
         # Don't let the managed host variable leak into tests
         self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_MANAGED_HOST"))
 
+        # States are saved as YAML unless a test asks otherwise
+        self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_COMPACT_STATE"))
+
         machine = os.environ.get("SNAPCRAFT_TEST_MOCK_MACHINE", None)
         self.base_environment = fixture_setup.FakeBaseEnvironment(machine=machine)
         self.useFixture(self.base_environment)
@@ -254,6 +257,8 @@ class TestCase(testscenarios.WithScenarios, testtools.TestCase):
             confinement=confinement,
             snap_type=snap_type,
             soname_cache=elf.SonameCache(),
+            elf_file_cache=elf.ElfFileCache(),
+            soname_index=elf.SonameIndex(),
         )
 
 
@@ -392,6 +392,34 @@ class MultipassWithBasesTest(BaseProviderWithBasesBaseTest):
         )
         self.multipass_cmd_mock().delete.assert_not_called()
 
+    def test_mount_package_cache(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable("SNAPCRAFT_MOUNT_PACKAGE_CACHE", "1")
+        )
+
+        with Multipass(
+            project=self.project, echoer=self.echoer_mock, is_ephemeral=False
+        ) as instance:
+            instance.mount_project()
+
+        self.multipass_cmd_mock().mount.assert_has_calls(
+            [
+                mock.call(
+                    source=mock.ANY,
+                    target="{}:{}".format(
+                        self.instance_name, "/home/multipass/project"
+                    ),
+                ),
+                mock.call(
+                    source=mock.ANY,
+                    target="{}:{}".format(
+                        self.instance_name,
+                        "/home/multipass/.cache/snapcraft/package-managers",
+                    ),
+                ),
+            ]
+        )
+
 
 class MultipassUnsupportedPlatform(BaseProviderWithBasesBaseTest):
     def setUp(self):
@@ -0,0 +1,93 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from unittest.mock import patch
+
+import fixtures
+from testtools.matchers import Contains, DirExists, Equals, Not
+
+from snapcraft.internal import cache
+from tests import unit
+
+
+class PackageManagerCacheTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = patch.object(cache.PackageManagerCache, "_pruned", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.package_manager_cache = cache.PackageManagerCache()
+        self.cache_root = self.package_manager_cache.package_manager_cache_root
+
+    def _fill(self, package_manager, size, last_used):
+        cache_dir = os.path.join(self.cache_root, package_manager)
+        os.makedirs(os.path.join(cache_dir, "packages"))
+        with open(os.path.join(cache_dir, "packages", "package"), "wb") as f:
+            f.write(b"0" * size)
+        last_used_file = os.path.join(cache_dir, ".last-used")
+        open(last_used_file, "w").close()
+        os.utime(last_used_file, (last_used, last_used))
+
+    def test_get_env(self):
+        self.useFixture(fixtures.EnvironmentVariable("PIP_CACHE_DIR"))
+
+        env = self.package_manager_cache.get_env()
+
+        self.assertThat(
+            env,
+            Contains('PIP_CACHE_DIR="{}"'.format(os.path.join(self.cache_root, "pip"))),
+        )
+        self.assertThat(os.path.join(self.cache_root, "npm"), DirExists())
+
+    def test_get_env_keeps_user_settings(self):
+        self.useFixture(fixtures.EnvironmentVariable("PIP_CACHE_DIR", "user-cache"))
+
+        env = self.package_manager_cache.get_env()
+
+        self.assertFalse(any(e.startswith("PIP_CACHE_DIR=") for e in env))
+
+    def test_get_env_disabled(self):
+        self.useFixture(
+            fixtures.EnvironmentVariable("SNAPCRAFT_PACKAGE_CACHE_SIZE", "0")
+        )
+
+        self.assertThat(self.package_manager_cache.get_env(), Equals([]))
+
+    def test_prune_evicts_least_recently_used(self):
+        self._fill("pip", 100, last_used=1000)
+        self._fill("npm", 100, last_used=3000)
+        self._fill("go", 100, last_used=2000)
+
+        self.package_manager_cache.prune(max_size=250)
+
+        self.assertThat(os.path.join(self.cache_root, "pip"), Not(DirExists()))
+        self.assertThat(os.path.join(self.cache_root, "npm"), DirExists())
+        self.assertThat(os.path.join(self.cache_root, "go"), DirExists())
+
+    def test_prune_read_only_cache(self):
+        self._fill("go", 100, last_used=1000)
+        packages_dir = os.path.join(self.cache_root, "go", "packages")
+        os.chmod(packages_dir, 0o555)
+        self.addCleanup(
+            lambda: os.path.exists(packages_dir) and os.chmod(packages_dir, 0o755)
+        )
+
+        self.package_manager_cache.prune(max_size=0)
+
+        self.assertThat(os.path.join(self.cache_root, "go"), Not(DirExists()))
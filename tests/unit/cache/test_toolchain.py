@@ -0,0 +1,85 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from unittest.mock import patch
+
+from testtools.matchers import Equals, FileContains
+
+from snapcraft.internal import cache
+from tests import unit
+
+
+class ToolchainCacheTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.toolchain_cache = cache.ToolchainCache(tool="tool")
+
+        os.makedirs(os.path.join("toolchain", "bin"))
+        with open(os.path.join("toolchain", "bin", "tool"), "w") as f:
+            f.write("tool")
+
+    def test_get_nothing_cached(self):
+        self.assertFalse(
+            self.toolchain_cache.get(path="toolchain", version="1", arch="amd64")
+        )
+
+    def test_cache_and_get_directory(self):
+        self.toolchain_cache.cache(path="toolchain", version="1", arch="amd64")
+
+        os.mkdir("part")
+        destination = os.path.join("part", "toolchain")
+        self.assertTrue(
+            self.toolchain_cache.get(path=destination, version="1", arch="amd64")
+        )
+        self.assertThat(os.path.join(destination, "bin", "tool"), FileContains("tool"))
+        # Changing the provisioned toolchain leaves the cached one alone.
+        with open(os.path.join(destination, "bin", "tool"), "w") as f:
+            f.write("changed")
+        self.assertThat(os.path.join("toolchain", "bin", "tool"), FileContains("tool"))
+
+    def test_cache_and_get_file(self):
+        tool = os.path.join("toolchain", "bin", "tool")
+        self.toolchain_cache.cache(
+            path=tool, version="1", arch="amd64", checksum="sha256/1234"
+        )
+
+        self.assertTrue(
+            self.toolchain_cache.get(
+                path="tool", version="1", arch="amd64", checksum="sha256/1234"
+            )
+        )
+        self.assertThat("tool", FileContains("tool"))
+
+    def test_get_other_version_or_arch(self):
+        self.toolchain_cache.cache(path="toolchain", version="1", arch="amd64")
+
+        self.assertFalse(
+            self.toolchain_cache.get(path="other", version="2", arch="amd64")
+        )
+        self.assertFalse(
+            self.toolchain_cache.get(path="other", version="1", arch="arm64")
+        )
+
+    def test_cache_error(self):
+        with patch("snapcraft.file_utils.link_or_copy_tree") as mock_copy_tree:
+            mock_copy_tree.side_effect = OSError()
+            self.toolchain_cache.cache(path="toolchain", version="1", arch="amd64")
+
+        self.assertFalse(
+            self.toolchain_cache.get(path="toolchain", version="1", arch="amd64")
+        )
+        self.assertThat(os.listdir(self.toolchain_cache.toolchain_cache), Equals([]))
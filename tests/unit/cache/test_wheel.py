@@ -0,0 +1,113 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+from unittest.mock import patch
+
+from testtools.matchers import Equals, FileContains
+
+from snapcraft.internal import cache
+from tests import unit
+
+
+class WheelCacheTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.wheel_cache = cache.WheelCache()
+
+        with open("foo-1.0.tar.gz", "w") as f:
+            f.write("sdist")
+        os.mkdir("build")
+        self.wheel = os.path.join("build", "foo-1.0-py3-none-any.whl")
+        with open(self.wheel, "w") as f:
+            f.write("wheel")
+        os.mkdir("packages")
+
+    def test_get_nothing_cached(self):
+        self.assertThat(
+            self.wheel_cache.get(
+                sdist="foo-1.0.tar.gz", abi="cpython-35m", wheel_dir="packages"
+            ),
+            Equals([]),
+        )
+
+    def test_cache_and_get(self):
+        self.wheel_cache.cache(
+            sdist="foo-1.0.tar.gz", abi="cpython-35m", wheels=[self.wheel]
+        )
+
+        wheel_path = os.path.join("packages", os.path.basename(self.wheel))
+        self.assertThat(
+            self.wheel_cache.get(
+                sdist="foo-1.0.tar.gz", abi="cpython-35m", wheel_dir="packages"
+            ),
+            Equals([wheel_path]),
+        )
+        self.assertThat(wheel_path, FileContains("wheel"))
+
+    def test_get_other_abi_or_sdist(self):
+        self.wheel_cache.cache(
+            sdist="foo-1.0.tar.gz", abi="cpython-35m", wheels=[self.wheel]
+        )
+
+        self.assertThat(
+            self.wheel_cache.get(
+                sdist="foo-1.0.tar.gz", abi="cpython-36m", wheel_dir="packages"
+            ),
+            Equals([]),
+        )
+        with open("foo-1.0.tar.gz", "w") as f:
+            f.write("changed")
+        self.assertThat(
+            self.wheel_cache.get(
+                sdist="foo-1.0.tar.gz", abi="cpython-35m", wheel_dir="packages"
+            ),
+            Equals([]),
+        )
+
+    def test_cache_error(self):
+        with patch("snapcraft.file_utils.copy") as mock_copy:
+            mock_copy.side_effect = OSError()
+            self.wheel_cache.cache(
+                sdist="foo-1.0.tar.gz", abi="cpython-35m", wheels=[self.wheel]
+            )
+
+        self.assertThat(
+            self.wheel_cache.get(
+                sdist="foo-1.0.tar.gz", abi="cpython-35m", wheel_dir="packages"
+            ),
+            Equals([]),
+        )
+        self.assertThat(
+            os.listdir(os.path.join(self.wheel_cache.wheel_cache, "cpython-35m")),
+            Equals([]),
+        )
+
+    def test_extension_wheels_are_not_cached(self):
+        wheel = os.path.join("build", "foo-1.0-cp35-cp35m-linux_x86_64.whl")
+        with open(wheel, "w") as f:
+            f.write("wheel")
+
+        self.wheel_cache.cache(
+            sdist="foo-1.0.tar.gz", abi="cpython-35m", wheels=[wheel]
+        )
+
+        self.assertThat(
+            self.wheel_cache.get(
+                sdist="foo-1.0.tar.gz", abi="cpython-35m", wheel_dir="packages"
+            ),
+            Equals([]),
+        )
@@ -88,7 +88,9 @@ class BuildProviderShellCommandTestCase(LifecycleCommandsBaseTestCase):
         execute_step_mock = mock.Mock()
 
         class Provider(ProviderImpl):
-            def pack_project(self, *, output: Optional[str] = None) -> None:
+            def pack_project(
+                self, *, output: Optional[str] = None, compression: Optional[str] = None
+            ) -> None:
                 pack_project_mock(output)
 
             def execute_step(self, step: steps.Step) -> None:
@@ -14,11 +14,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 import os
+import logging
 import os.path
 import subprocess
 from textwrap import dedent
 from unittest import mock
 
+import fixtures
 from testtools.matchers import Contains, Equals, FileExists
 from . import CommandBaseTestCase
 
@@ -75,6 +77,10 @@ class PackCommandTestCase(PackCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -109,6 +115,10 @@ class PackCommandTestCase(PackCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -145,9 +155,57 @@ class PackCommandTestCase(PackCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
             ],
             stderr=subprocess.STDOUT,
             stdout=subprocess.PIPE,
         )
 
         self.assertThat("my_snap_99_multi.snap", FileExists())
+
+    def test_snap_from_dir_with_lzo_compression(self):
+        fake_logger = fixtures.FakeLogger(level=logging.WARNING)
+        self.useFixture(fake_logger)
+        with open(self.snap_yaml, "w") as f:
+            f.write(
+                dedent(
+                    """\
+                name: my_snap
+                version: 99
+                architectures: [amd64, armhf]
+            """
+                )
+            )
+
+        result = self.run_command([self.command, self.snap_dir, "--compression", "lzo"])
+
+        self.assertThat(result.exit_code, Equals(0))
+        self.assertThat(result.output, Contains("Snapped my_snap_99_multi.lzo.snap\n"))
+        self.assertThat(
+            fake_logger.output, Contains("with lzo compression, which is meant")
+        )
+
+        self.popen_spy.assert_called_once_with(
+            [
+                "mksquashfs",
+                "mysnap",
+                "my_snap_99_multi.lzo.snap",
+                "-noappend",
+                "-comp",
+                "lzo",
+                "-no-xattrs",
+                "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
+                "-all-root",
+            ],
+            stderr=subprocess.STDOUT,
+            stdout=subprocess.PIPE,
+        )
+
+        self.assertThat("my_snap_99_multi.lzo.snap", FileExists())
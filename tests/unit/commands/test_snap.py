@@ -24,7 +24,14 @@ import snapcraft.internal.errors
 import snapcraft.internal.project_loader.errors
 
 import fixtures
-from testtools.matchers import Contains, Equals, FileContains, FileExists, Not
+from testtools.matchers import (
+    Contains,
+    Equals,
+    FileContains,
+    FileExists,
+    Not,
+    StartsWith,
+)
 from tests import fixture_setup
 from . import CommandBaseTestCase
 
@@ -93,6 +100,10 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -159,6 +170,10 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -228,6 +243,10 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
             ],
             stderr=subprocess.STDOUT,
             stdout=subprocess.PIPE,
@@ -253,6 +272,10 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
             ],
             stderr=subprocess.STDOUT,
             stdout=subprocess.PIPE,
@@ -276,7 +299,7 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
 
         self.assertThat(
             fake_logger.output,
-            Equals(
+            StartsWith(
                 "Skipping pull part1 (already ran)\n"
                 "Skipping build part1 (already ran)\n"
                 "Skipping stage part1 (already ran)\n"
@@ -285,6 +308,7 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
                 "specifying parts, or clean the steps you want to run again.\n"
             ),
         )
+        self.assertThat(fake_logger.output.splitlines()[-1], StartsWith("Packed "))
 
         self.popen_spy.assert_called_once_with(
             [
@@ -296,6 +320,10 @@ class SnapCommandTestCase(SnapCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -333,6 +361,10 @@ architectures: [amd64, armhf]
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -369,6 +401,10 @@ version: 99
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -408,6 +444,10 @@ type: os
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
             ],
             stderr=subprocess.STDOUT,
             stdout=subprocess.PIPE,
@@ -427,13 +467,14 @@ type: os
 
         self.assertThat(
             fake_logger.output,
-            Equals(
+            StartsWith(
                 "Pulling part1 \n"
                 "Building part1 \n"
                 "Staging part1 \n"
                 "Priming part1 \n"
             ),
         )
+        self.assertThat(fake_logger.output.splitlines()[-1], StartsWith("Packed "))
 
         self.popen_spy.assert_called_once_with(
             [
@@ -445,6 +486,10 @@ type: os
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -496,7 +541,7 @@ type: os
 
         snap_build_renamed = snap_build + ".1234"
         self.assertThat(
-            fake_logger.output.splitlines(),
+            fake_logger.output.splitlines()[:-1],
             Equals(
                 [
                     "Pulling part1 ",
@@ -507,6 +552,7 @@ type: os
                 ]
             ),
         )
+        self.assertThat(fake_logger.output.splitlines()[-1], StartsWith("Packed "))
 
         self.assertThat("snap-test_1.0_amd64.snap", FileExists())
         self.assertThat(snap_build, Not(FileExists()))
@@ -547,6 +593,10 @@ class SnapCommandAsDefaultTestCase(SnapCommandBaseTestCase):
                 "xz",
                 "-no-xattrs",
                 "-no-fragments",
+                "-b",
+                "131072",
+                "-processors",
+                mock.ANY,
                 "-all-root",
             ],
             stderr=subprocess.STDOUT,
@@ -31,7 +31,7 @@ class LifecycleTestBase(unit.TestCase):
         self.useFixture(self.fake_logger)
         self.project_options = snapcraft.ProjectOptions()
 
-    def make_snapcraft_project(self, parts, snap_type=""):
+    def make_snapcraft_project(self, parts, snap_type="", jobs=1):
         yaml = textwrap.dedent(
             """\
             name: test
@@ -50,6 +50,6 @@ class LifecycleTestBase(unit.TestCase):
             yaml.format(parts=parts, type=snap_type)
         )
         project = snapcraft.project.Project(
-            snapcraft_yaml_file_path=self.snapcraft_yaml_file_path
+            snapcraft_yaml_file_path=self.snapcraft_yaml_file_path, jobs=jobs
         )
         return project_loader.load_config(project)
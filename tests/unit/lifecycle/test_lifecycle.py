@@ -26,6 +26,7 @@ from unittest import mock
 
 import fixtures
 from testtools.matchers import (
+    Contains,
     DirExists,
     Equals,
     FileContains,
@@ -35,7 +36,7 @@ from testtools.matchers import (
 )
 
 import snapcraft
-from snapcraft import storeapi
+from snapcraft import file_utils, storeapi
 from snapcraft.file_utils import calculate_sha3_384
 from snapcraft.internal import errors, pluginhandler, lifecycle, project_loader, steps
 from snapcraft.internal.lifecycle._runner import _replace_in_part
@@ -344,6 +345,58 @@ class ExecutionTestCase(LifecycleTestBase):
             os.path.join(steps.PRIME.name, "snap", ".snapcraft"), Not(DirExists())
         )
 
+    def test_reprime_does_not_migrate_unchanged_files(self):
+        os.mkdir("src")
+        for name in ("file1", "file2"):
+            open(os.path.join("src", name), "w").close()
+        project_config = self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  test-part:
+                    plugin: dump
+                    source: src
+                """
+            )
+        )
+        lifecycle.execute(steps.PRIME, project_config)
+
+        with mock.patch(
+            "snapcraft.file_utils.link_or_copy", wraps=file_utils.link_or_copy
+        ) as mock_link_or_copy:
+            lifecycle.execute(steps.PRIME, project_config, part_names=["test-part"])
+
+        self.assertThat(self.fake_logger.output, Contains("Re-priming test-part"))
+        mock_link_or_copy.assert_not_called()
+        for name in ("file1", "file2"):
+            self.assertThat(os.path.join(steps.PRIME.name, name), FileExists())
+
+    def test_reprime_removes_files_no_longer_primed(self):
+        os.mkdir("src")
+        for name in ("file1", "file2"):
+            open(os.path.join("src", name), "w").close()
+        parts = textwrap.dedent(
+            """\
+            parts:
+              test-part:
+                plugin: dump
+                source: src
+                prime: {}
+            """
+        )
+        project_config = self.make_snapcraft_project(parts.format('["*"]'))
+        lifecycle.execute(steps.PRIME, project_config)
+
+        project_config = self.make_snapcraft_project(parts.format('["-file2"]'))
+        with mock.patch(
+            "snapcraft.file_utils.link_or_copy", wraps=file_utils.link_or_copy
+        ) as mock_link_or_copy:
+            lifecycle.execute(steps.PRIME, project_config)
+
+        mock_link_or_copy.assert_not_called()
+        self.assertThat(os.path.join(steps.PRIME.name, "file1"), FileExists())
+        self.assertThat(os.path.join(steps.PRIME.name, "file2"), Not(FileExists()))
+
     def test_non_prime_and_no_version(self):
         snapcraft_yaml = fixture_setup.SnapcraftYaml(self.path, version=None)
         snapcraft_yaml.data["adopt-info"] = "test-part"
@@ -362,6 +415,65 @@ class ExecutionTestCase(LifecycleTestBase):
         lifecycle.execute(steps.PULL, project_config)
 
 
+class ParallelExecutionTestCase(LifecycleTestBase):
+    def make_parallel_project(self):
+        return self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  part1:
+                    plugin: nil
+                  part2:
+                    plugin: nil
+                  part3:
+                    plugin: nil
+                    after: [part1]
+                """
+            ),
+            jobs=2,
+        )
+
+    def test_independent_parts_are_built(self):
+        project_config = self.make_parallel_project()
+
+        lifecycle.execute(steps.BUILD, project_config)
+
+        for part in project_config.parts.all_parts:
+            self.assertThat(os.path.join(part.plugin.statedir, "build"), FileExists())
+
+    def test_dependency_is_staged_before_dependent_runs(self):
+        project_config = self.make_parallel_project()
+
+        lifecycle.execute(steps.PULL, project_config)
+
+        # Pulling and building happen in the workers, staging the dependency
+        # happens here.
+        self.assertThat(
+            self.fake_logger.output,
+            Equals(
+                "'part3' has dependencies that need to be staged: part1\n"
+                "Skipping pull part1 (already ran)\n"
+                "Staging part1 \n"
+            ),
+        )
+        part1 = project_config.parts.get_part("part1")
+        self.assertThat(os.path.join(part1.plugin.statedir, "stage"), FileExists())
+        part2 = project_config.parts.get_part("part2")
+        self.assertThat(os.path.join(part2.plugin.statedir, "build"), Not(FileExists()))
+
+    def test_nothing_to_do_is_handled_without_workers(self):
+        project_config = self.make_parallel_project()
+        lifecycle.execute(steps.PULL, project_config)
+
+        with mock.patch(
+            "snapcraft.internal.lifecycle._runner.run_parts", return_value=False
+        ) as run_parts_mock:
+            lifecycle.execute(steps.PULL, project_config)
+
+        for call in run_parts_mock.call_args_list:
+            self.assertThat(call[0][0], Equals([]))
+
+
 class DirtyBuildScriptletTestCase(LifecycleTestBase):
 
     scenarios = (
@@ -161,11 +161,15 @@ class OrderTestBase(LifecycleTestBase):
 
     def get_run_order(self):
         # Let's determine run order by using the timestamp of state files
+        step_names = [step.name for step in steps.STEPS]
         actual_order = []
         for part_name in ("main", "dependent", "nested-dependent"):
             state_dir = os.path.join(self.parts_dir, part_name, "state")
             with contextlib.suppress(FileNotFoundError):
                 for step_name in os.listdir(state_dir):
+                    # Skip the migration manifests and source snapshots.
+                    if step_name not in step_names:
+                        continue
                     path = os.path.join(state_dir, step_name)
                     actual_order.append(
                         {
@@ -1611,11 +1615,31 @@ class DirtyAndOutdatedTest(OrderTestBase):
         patcher.start()
         self.addCleanup(patcher.stop)
 
+        original_dirty_report_digest = (
+            pluginhandler.PluginHandler.get_dirty_report_digest
+        )
+
+        # Just like changing the part properties would, making a step dirty
+        # changes the digest, so that it is not skipped as known to be clean.
+        def _fake_dirty_report_digest(self):
+            dirty_steps = sorted(
+                p["step"].name for p in dirty_parts if p["part"] == self.name
+            )
+            return "{}{}".format(original_dirty_report_digest(self), dirty_steps)
+
+        patcher = mock.patch.object(
+            pluginhandler.PluginHandler,
+            "get_dirty_report_digest",
+            _fake_dirty_report_digest,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
         original_clean = pluginhandler.PluginHandler.clean
 
-        def _fake_clean(self, staged_state, primed_state, step):
+        def _fake_clean(self, staged_state, primed_state, step, **kwargs):
             nonlocal dirty_parts
-            original_clean(self, staged_state, primed_state, step)
+            original_clean(self, staged_state, primed_state, step, **kwargs)
             with contextlib.suppress(ValueError):
                 dirty_parts.remove(dict(part=self.name, step=step))
 
@@ -0,0 +1,158 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import io
+import os
+from unittest import mock
+
+from testtools.matchers import Contains, Equals, FileExists, Not
+
+from snapcraft.internal import errors, steps
+from snapcraft.internal.lifecycle._parallel import run_parts
+from tests import unit
+
+
+class RunPartsTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = mock.patch("sys.stdout", new_callable=io.StringIO)
+        self.fake_stdout = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_tasks_run_in_other_processes(self):
+        def _task(name):
+            with open(name, "w") as f:
+                print(os.getpid(), file=f)
+            return True
+
+        steps_were_run = run_parts(
+            [("part1", lambda: _task("part1")), ("part2", lambda: _task("part2"))],
+            step=steps.PULL,
+            jobs=2,
+        )
+
+        self.assertTrue(steps_were_run)
+        for name in ("part1", "part2"):
+            with open(name) as f:
+                self.assertThat(f.read().strip(), Not(Equals(str(os.getpid()))))
+
+    def test_steps_were_run_is_false_if_no_task_ran_steps(self):
+        steps_were_run = run_parts(
+            [("part1", lambda: False), ("part2", lambda: False)],
+            step=steps.PULL,
+            jobs=2,
+        )
+
+        self.assertFalse(steps_were_run)
+
+    def test_output_is_prefixed_with_part_name(self):
+        def _task():
+            os.write(1, b"first line\nsecond line\n")
+            os.write(2, b"an error\n")
+            return True
+
+        run_parts([("part1", _task)], step=steps.BUILD, jobs=1)
+
+        self.assertThat(
+            self.fake_stdout.getvalue(),
+            Equals("part1 | first line\npart1 | second line\npart1 | an error\n"),
+        )
+
+    def test_error_with_keyword_arguments_is_recreated(self):
+        def _task():
+            raise errors.StepOutdatedError(
+                step=steps.PULL, part="part1", dependents=["part2"]
+            )
+
+        raised = self.assertRaises(
+            errors.StepOutdatedError,
+            run_parts,
+            [("part1", _task)],
+            step=steps.PULL,
+            jobs=1,
+        )
+
+        self.assertThat(raised.step, Equals(steps.PULL))
+        self.assertThat(raised.part, Equals("part1"))
+        self.assertThat(
+            str(raised),
+            Equals(
+                str(
+                    errors.StepOutdatedError(
+                        step=steps.PULL, part="part1", dependents=["part2"]
+                    )
+                )
+            ),
+        )
+
+    def test_error_that_cannot_be_recreated_is_wrapped(self):
+        class _LocalError(Exception):
+            pass
+
+        def _task():
+            raise _LocalError("The 'part1' part failed")
+
+        raised = self.assertRaises(
+            errors.PartWorkerError,
+            run_parts,
+            [("part1", _task)],
+            step=steps.BUILD,
+            jobs=1,
+        )
+
+        self.assertThat(raised.part_name, Equals("part1"))
+        self.assertThat(raised.step, Equals(steps.BUILD))
+        self.assertThat(raised.message, Equals("The 'part1' part failed"))
+
+    def test_transferable_error_is_raised_as_is(self):
+        def _task():
+            raise RuntimeError("boom")
+
+        raised = self.assertRaises(
+            RuntimeError, run_parts, [("part1", _task)], step=steps.BUILD, jobs=1
+        )
+
+        self.assertThat(str(raised), Contains("boom"))
+
+    def test_no_new_tasks_are_started_after_an_error(self):
+        def _fail():
+            raise RuntimeError("boom")
+
+        def _task():
+            open("part2", "w").close()
+            return True
+
+        self.assertRaises(
+            RuntimeError,
+            run_parts,
+            [("part1", _fail), ("part2", _task)],
+            step=steps.PULL,
+            jobs=1,
+        )
+
+        self.assertThat("part2", Not(FileExists()))
+
+    def test_worker_exiting_unexpectedly(self):
+        raised = self.assertRaises(
+            errors.PartWorkerError,
+            run_parts,
+            [("part1", lambda: os._exit(9))],
+            step=steps.PULL,
+            jobs=1,
+        )
+
+        self.assertThat(raised.message, Equals("worker exited with code 9"))
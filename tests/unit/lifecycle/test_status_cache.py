@@ -17,7 +17,11 @@
 
 import os
 import textwrap
+from unittest import mock
 
+from testtools.matchers import Equals, FileExists
+
+from snapcraft import yaml_utils
 from snapcraft.internal import lifecycle, states, steps
 from snapcraft.internal.lifecycle._status_cache import StatusCache
 
@@ -115,3 +119,77 @@ class StatusCacheTestCase(LifecycleTestBase):
         # Now clear that step from the cache, and it should be up-to-date
         self.cache.clear_step(main_part, steps.PULL)
         self.assertTrue(self.cache.get_outdated_report(main_part, steps.PULL))
+
+    def test_should_step_run_visits_each_step_once(self):
+        lifecycle.execute(steps.PULL, self.project_config)
+        main_part = self.project_config.parts.get_part("main")
+        dependent_part = self.project_config.parts.get_part("dependent")
+
+        with mock.patch.object(
+            self.cache, "has_step_run", wraps=self.cache.has_step_run
+        ) as mock_has_step_run:
+            self.assertFalse(self.cache.should_step_run(dependent_part, steps.PULL))
+            self.assertFalse(self.cache.should_step_run(dependent_part, steps.PULL))
+            self.assertFalse(self.cache.should_step_run(main_part, steps.PULL))
+
+        self.assertThat(
+            mock_has_step_run.call_args_list,
+            Equals(
+                [
+                    mock.call(dependent_part, steps.PULL),
+                    mock.call(main_part, steps.STAGE),
+                    mock.call(main_part, steps.BUILD),
+                    mock.call(main_part, steps.PULL),
+                ]
+            ),
+        )
+
+
+class StatusIndexTestCase(LifecycleTestBase):
+    def setUp(self):
+        super().setUp()
+
+        self.project_config = self.make_snapcraft_project(
+            textwrap.dedent(
+                """\
+                parts:
+                  main:
+                    plugin: nil
+                """
+            )
+        )
+        # The first run only records the steps it ran, the next one finds
+        # them clean.
+        lifecycle.execute(steps.PULL, self.project_config)
+        lifecycle.execute(steps.PULL, self.project_config)
+        self.main_part = self.project_config.parts.get_part("main")
+
+    def test_clean_steps_are_not_checked_again(self):
+        self.assertThat(self.project_config.project._status_index_file, FileExists())
+
+        with mock.patch.object(
+            self.main_part, "get_dirty_report"
+        ) as mock_get_dirty_report:
+            cache = StatusCache(self.project_config)
+            self.assertFalse(cache.get_dirty_report(self.main_part, steps.PULL))
+
+        mock_get_dirty_report.assert_not_called()
+
+    def test_changed_properties_are_checked_again(self):
+        self.main_part._part_properties["source-subdir"] = "subdir"
+
+        cache = StatusCache(self.project_config)
+        self.assertTrue(cache.get_dirty_report(self.main_part, steps.PULL))
+
+    def test_changed_state_is_checked_again(self):
+        pull_state_file = states.get_step_state_file(
+            self.main_part.plugin.statedir, steps.PULL
+        )
+        pull_state = states.get_state(self.main_part.plugin.statedir, steps.PULL)
+        pull_state.properties["source-subdir"] = "subdir"
+        with open(pull_state_file, "w") as state_file:
+            state_file.write(yaml_utils.dump(pull_state))
+        os.utime(pull_state_file, ns=(0, 0))
+
+        cache = StatusCache(self.project_config)
+        self.assertTrue(cache.get_dirty_report(self.main_part, steps.PULL))
@@ -0,0 +1,66 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from snapcraft.internal.pluginhandler._fileset_matcher import FilesetMatcher
+
+from tests import unit
+
+
+def _get_state(matcher, path):
+    state = matcher.root_state()
+    for name in path.split("/"):
+        state = matcher.child_state(state, name)
+    return state
+
+
+class FilesetMatcherTestCase(unit.TestCase):
+    def _is_match(self, patterns, path, is_dir=False):
+        matcher = FilesetMatcher(patterns)
+        return matcher.is_match(_get_state(matcher, path), is_dir=is_dir)
+
+    def test_wildcard(self):
+        self.assertTrue(self._is_match(["usr/lib/*.so"], "usr/lib/libfoo.so"))
+        self.assertFalse(self._is_match(["usr/lib/*.so"], "usr/lib/foo/libfoo.so"))
+        self.assertFalse(self._is_match(["usr/lib/*.so"], "usr/lib/libfoo.so.1"))
+
+    def test_wildcard_does_not_match_hidden(self):
+        self.assertFalse(self._is_match(["*"], ".hidden"))
+        self.assertTrue(self._is_match([".*"], ".hidden"))
+        self.assertTrue(self._is_match([".hidden"], ".hidden"))
+
+    def test_recursive(self):
+        self.assertTrue(self._is_match(["**/*.so"], "libfoo.so"))
+        self.assertTrue(self._is_match(["**/*.so"], "usr/lib/libfoo.so"))
+        self.assertFalse(self._is_match(["**/*.so"], "usr/.lib/libfoo.so"))
+        self.assertTrue(self._is_match(["usr/**"], "usr", is_dir=True))
+        self.assertTrue(self._is_match(["usr/**"], "usr/lib/libfoo.so"))
+
+    def test_character_classes(self):
+        self.assertTrue(self._is_match(["lib?.so"], "libc.so"))
+        self.assertTrue(self._is_match(["lib[ab].so"], "liba.so"))
+        self.assertFalse(self._is_match(["lib[!ab].so"], "liba.so"))
+
+    def test_directories_only(self):
+        self.assertTrue(self._is_match(["usr/"], "usr", is_dir=True))
+        self.assertFalse(self._is_match(["usr/"], "usr"))
+
+    def test_can_match_below(self):
+        matcher = FilesetMatcher(["usr/lib/*.so", "-etc"])
+
+        self.assertTrue(matcher.can_match_below(_get_state(matcher, "usr")))
+        self.assertTrue(matcher.can_match_below(_get_state(matcher, "usr/lib")))
+        self.assertFalse(matcher.can_match_below(_get_state(matcher, "usr/share")))
+        self.assertFalse(matcher.can_match_below(_get_state(matcher, "usr/lib/a.so")))
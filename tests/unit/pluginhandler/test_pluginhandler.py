@@ -21,7 +21,7 @@ import stat
 import tempfile
 from collections import OrderedDict
 from textwrap import dedent
-from unittest.mock import call, Mock, MagicMock, patch
+from unittest.mock import ANY, call, Mock, MagicMock, patch
 
 from testtools.matchers import Contains, Equals, FileExists, Not
 
@@ -354,6 +354,57 @@ class PluginTestCase(unit.TestCase):
             Equals(stat.S_IMODE(os.stat(os.path.join("stage", "foo", "bar")).st_mode)),
         )
 
+    def test_migrate_files_with_manifest_skips_unchanged(self):
+        os.makedirs("install")
+        os.makedirs("stage")
+        for name in ("foo", "bar"):
+            with open(os.path.join("install", name), "w") as f:
+                f.write(name)
+
+        manifest_path = os.path.join("state", "stage-manifest.json")
+        files, dirs = pluginhandler._migratable_filesets(["*"], "install")
+        manifest = pluginhandler.MigrationManifest(manifest_path)
+        pluginhandler._migrate_files(files, dirs, "install", "stage", manifest=manifest)
+        manifest.save()
+        self.assertThat(manifest_path, FileExists())
+
+        # Replace one of the files, only that one should be migrated again.
+        os.remove(os.path.join("install", "foo"))
+        with open(os.path.join("install", "foo"), "w") as f:
+            f.write("new foo")
+
+        fixup_func = Mock()
+        manifest = pluginhandler.MigrationManifest(manifest_path)
+        pluginhandler._migrate_files(
+            files,
+            dirs,
+            "install",
+            "stage",
+            fixup_func=fixup_func,
+            manifest=manifest,
+        )
+
+        fixup_func.assert_called_once_with(os.path.join("stage", "foo"))
+        with open(os.path.join("stage", "foo")) as f:
+            self.assertThat(f.read(), Equals("new foo"))
+
+    def test_migrate_files_with_manifest_restores_removed(self):
+        os.makedirs("install")
+        with open(os.path.join("install", "foo"), "w") as f:
+            f.write("foo")
+
+        manifest_path = os.path.join("state", "stage-manifest.json")
+        files, dirs = pluginhandler._migratable_filesets(["*"], "install")
+        manifest = pluginhandler.MigrationManifest(manifest_path)
+        pluginhandler._migrate_files(files, dirs, "install", "stage", manifest=manifest)
+        manifest.save()
+
+        os.remove(os.path.join("stage", "foo"))
+        manifest = pluginhandler.MigrationManifest(manifest_path)
+        pluginhandler._migrate_files(files, dirs, "install", "stage", manifest=manifest)
+
+        self.assertThat(os.path.join("stage", "foo"), FileExists())
+
     def test_filesets_includes_without_relative_paths(self):
         raised = self.assertRaises(
             errors.PluginError, pluginhandler._get_file_list, ["rel", "/abs/include"]
@@ -507,6 +558,35 @@ class MigratableFilesetsTestCase(unit.TestCase):
         self.assertThat(files, Equals({"foo/bar/2"}))
         self.assertThat(dirs, Equals({"foo", "foo/bar"}))
 
+    def test_migratable_filesets_excluded_directory(self):
+        files, dirs = pluginhandler._migratable_filesets(["*", "-foo/bar"], "install")
+        self.assertThat(files, Equals({"1", "foo/2"}))
+        self.assertThat(dirs, Equals({"foo"}))
+
+    def test_migratable_filesets_excluded_wildcard(self):
+        files, dirs = pluginhandler._migratable_filesets(["foo", "-**/3"], "install")
+        self.assertThat(files, Equals({"foo/2", "foo/bar/baz/4"}))
+        self.assertThat(dirs, Equals({"foo", "foo/bar", "foo/bar/baz"}))
+
+    def test_migratable_filesets_wildcard_skips_hidden(self):
+        open("install/.hidden", "w").close()
+        open("install/foo/.hidden", "w").close()
+
+        files, dirs = pluginhandler._migratable_filesets(["*"], "install")
+        self.assertThat(
+            files, Equals({"1", "foo/2", "foo/.hidden", "foo/bar/3", "foo/bar/baz/4"})
+        )
+        self.assertThat(dirs, Equals({"foo", "foo/bar", "foo/bar/baz"}))
+
+    def test_migratable_filesets_symlinked_directory(self):
+        os.symlink("foo", "install/foo-link")
+
+        files, dirs = pluginhandler._migratable_filesets(["foo-link/*"], "install")
+        self.assertThat(
+            files, Equals({"foo-link/2", "foo-link/bar/3", "foo-link/bar/baz/4"})
+        )
+        self.assertThat(dirs, Equals({"foo-link", "foo-link/bar", "foo-link/bar/baz"}))
+
     def test_migratable_filesets_single_really_really_nested_file(self):
         files, dirs = pluginhandler._migratable_filesets(["foo/bar/baz/3"], "install")
         self.assertThat(files, Equals({"foo/bar/baz/3"}))
@@ -1413,7 +1493,9 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1", "bin/2"}
+            self.handler.primedir,
+            {"bin/1", "bin/2"},
+            elf_file_cache=self.handler._elf_file_cache,
         )
         self.assertFalse(mock_copy.called)
 
@@ -1493,7 +1575,9 @@ class StateTestCase(StateBaseTestCase):
         # bin/2 shouldn't be in this list as it was already primed by another
         # part.
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1"}
+            self.handler.primedir,
+            {"bin/1"},
+            elf_file_cache=self.handler._elf_file_cache,
         )
         self.assertFalse(mock_copy.called)
 
@@ -1516,7 +1600,7 @@ class StateTestCase(StateBaseTestCase):
 
     @patch(
         "snapcraft.internal.elf.ElfFile._extract",
-        return_value=(("", "", ""), "EXEC", "", dict(), False),
+        return_value=(("", "", ""), "EXEC", "", dict(), False, [], []),
     )
     @patch("snapcraft.internal.elf.ElfFile.load_dependencies")
     @patch("snapcraft.internal.pluginhandler._migrate_files")
@@ -1549,7 +1633,9 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1", "bin/2"}
+            self.handler.primedir,
+            {"bin/1", "bin/2"},
+            elf_file_cache=self.handler._elf_file_cache,
         )
         mock_migrate_files.assert_has_calls(
             [
@@ -1558,6 +1644,7 @@ class StateTestCase(StateBaseTestCase):
                     {"bin"},
                     self.handler.stagedir,
                     self.handler.primedir,
+                    manifest=ANY,
                 ),
                 call(
                     {"foo/bar/baz"},
@@ -1592,7 +1679,7 @@ class StateTestCase(StateBaseTestCase):
 
     @patch(
         "snapcraft.internal.elf.ElfFile._extract",
-        return_value=(("", "", ""), "EXEC", "", dict(), False),
+        return_value=(("", "", ""), "EXEC", "", dict(), False, [], []),
     )
     @patch("snapcraft.internal.elf.ElfFile.load_dependencies")
     @patch("snapcraft.internal.pluginhandler._migrate_files")
@@ -1632,12 +1719,18 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/file"}
+            self.handler.primedir,
+            {"bin/file"},
+            elf_file_cache=self.handler._elf_file_cache,
         )
         # Verify that only the part's files were migrated-- not the system
         # dependency.
         mock_migrate_files.assert_called_once_with(
-            {"bin/file"}, {"bin"}, self.handler.stagedir, self.handler.primedir
+            {"bin/file"},
+            {"bin"},
+            self.handler.stagedir,
+            self.handler.primedir,
+            manifest=ANY,
         )
 
         state = self.handler.get_prime_state()
@@ -1651,7 +1744,32 @@ class StateTestCase(StateBaseTestCase):
 
     @patch(
         "snapcraft.internal.elf.ElfFile._extract",
-        return_value=(("", "", ""), "EXEC", "", dict(), False),
+        return_value=(("", "", ""), "EXEC", "", dict(), False, [], []),
+    )
+    @patch("snapcraft.internal.elf.ElfFile.load_dependencies")
+    @patch("snapcraft.internal.pluginhandler._migrate_files")
+    def test_prime_indexes_migrated_system_dependencies(
+        self, mock_migrate_files, mock_load_dependencies, mock_extract
+    ):
+        mock_load_dependencies.return_value = {"/foo/bar/baz"}
+        self.get_elf_files_mock.return_value = frozenset(
+            [elf.ElfFile(path=os.path.join(self.handler.primedir, "bin", "1"))]
+        )
+
+        bindir = os.path.join(self.handler.plugin.installdir, "bin")
+        os.makedirs(bindir)
+        open(os.path.join(bindir, "1"), "w").close()
+
+        self.handler.mark_done(steps.BUILD)
+        self.handler.stage()
+        with patch.object(self.handler._soname_index, "add_files") as mock_add_files:
+            self.handler.prime()
+
+        mock_add_files.assert_called_with(self.handler.primedir, {"foo/bar/baz"})
+
+    @patch(
+        "snapcraft.internal.elf.ElfFile._extract",
+        return_value=(("", "", ""), "EXEC", "", dict(), False, [], []),
     )
     @patch(
         "snapcraft.internal.elf.ElfFile.load_dependencies",
@@ -1683,13 +1801,16 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1", "foo/bar/baz"}
+            self.handler.primedir,
+            {"bin/1", "foo/bar/baz"},
+            elf_file_cache=self.handler._elf_file_cache,
         )
         mock_migrate_files.assert_called_once_with(
             {"bin/1", "foo/bar/baz"},
             {"bin", "foo", "foo/bar"},
             self.handler.stagedir,
             self.handler.primedir,
+            manifest=ANY,
         )
 
         state = self.handler.get_prime_state()
@@ -1717,7 +1838,9 @@ class StateTestCase(StateBaseTestCase):
         self.assertThat(self.handler.latest_step(), Equals(steps.PRIME))
         self.assertRaises(errors.NoNextStepError, self.handler.next_step)
         self.get_elf_files_mock.assert_called_once_with(
-            self.handler.primedir, {"bin/1"}
+            self.handler.primedir,
+            {"bin/1"},
+            elf_file_cache=self.handler._elf_file_cache,
         )
         self.assertFalse(mock_copy.called)
 
@@ -2521,8 +2644,8 @@ class PerStepCleanTestCase(unit.TestCase):
         self.assertThat(len(self.manager_mock.mock_calls), Equals(4))
         self.manager_mock.assert_has_calls(
             [
-                call.clean_prime({}),
-                call.clean_stage({}),
+                call.clean_prime({}, keep_migrated=False),
+                call.clean_stage({}, keep_migrated=False),
                 call.clean_build(),
                 call.clean_pull(),
             ]
@@ -2534,7 +2657,11 @@ class PerStepCleanTestCase(unit.TestCase):
         # Verify the step cleaning order
         self.assertThat(len(self.manager_mock.mock_calls), Equals(3))
         self.manager_mock.assert_has_calls(
-            [call.clean_prime({}), call.clean_stage({}), call.clean_build()]
+            [
+                call.clean_prime({}, keep_migrated=False),
+                call.clean_stage({}, keep_migrated=False),
+                call.clean_build(),
+            ]
         )
 
     def test_clean_stage_order(self):
@@ -2542,14 +2669,31 @@ class PerStepCleanTestCase(unit.TestCase):
 
         # Verify the step cleaning order
         self.assertThat(len(self.manager_mock.mock_calls), Equals(2))
-        self.manager_mock.assert_has_calls([call.clean_prime({}), call.clean_stage({})])
+        self.manager_mock.assert_has_calls(
+            [
+                call.clean_prime({}, keep_migrated=False),
+                call.clean_stage({}, keep_migrated=False),
+            ]
+        )
 
     def test_clean_prime_order(self):
         self.handler.clean(step=steps.PRIME)
 
         # Verify the step cleaning order
         self.assertThat(len(self.manager_mock.mock_calls), Equals(1))
-        self.manager_mock.assert_has_calls([call.clean_prime({})])
+        self.manager_mock.assert_has_calls([call.clean_prime({}, keep_migrated=False)])
+
+    def test_clean_stage_keeping_migrated_files(self):
+        self.handler.clean(step=steps.STAGE, keep_migrated=True)
+
+        # Only the files of the step being cleaned are kept
+        self.assertThat(len(self.manager_mock.mock_calls), Equals(2))
+        self.manager_mock.assert_has_calls(
+            [
+                call.clean_prime({}, keep_migrated=False),
+                call.clean_stage({}, keep_migrated=True),
+            ]
+        )
 
 
 class CollisionTestCase(unit.TestCase):
@@ -2689,6 +2833,54 @@ class CollisionTestCase(unit.TestCase):
         # a part not built doesn't have the stage file in the installdir.
         pluginhandler.check_for_collisions([part_built, part_not_built])
 
+    def _load_part_with_file(self, part_name, contents):
+        part = self.load_part(part_name)
+        part.plugin.installdir = os.path.join(self.path, part_name)
+        os.makedirs(part.plugin.installdir)
+        with open(os.path.join(part.plugin.installdir, "file"), "w") as f:
+            f.write(contents)
+        return part
+
+    def test_collisions_same_size_different_contents(self):
+        raised = self.assertRaises(
+            errors.SnapcraftPartConflictError,
+            pluginhandler.check_for_collisions,
+            [
+                self._load_part_with_file("part7", "foo"),
+                self._load_part_with_file("part8", "bar"),
+            ],
+        )
+
+        self.assertThat(raised.file_paths, Equals("    file"))
+
+    def test_no_collisions_hard_links(self):
+        part7 = self._load_part_with_file("part7", "foo")
+        part8 = self.load_part("part8")
+        part8.plugin.installdir = os.path.join(self.path, "part8")
+        os.makedirs(part8.plugin.installdir)
+        os.link(
+            os.path.join(part7.plugin.installdir, "file"),
+            os.path.join(part8.plugin.installdir, "file"),
+        )
+
+        with patch("builtins.open") as mock_open:
+            pluginhandler.check_for_collisions([part7, part8])
+        mock_open.assert_not_called()
+
+    def test_collisions_reported_against_first_part(self):
+        raised = self.assertRaises(
+            errors.SnapcraftPartConflictError,
+            pluginhandler.check_for_collisions,
+            [
+                self._load_part_with_file("part7", "foo"),
+                self._load_part_with_file("part8", "foo"),
+                self._load_part_with_file("part9", "bar"),
+            ],
+        )
+
+        self.assertThat(raised.other_part_name, Equals("part7"))
+        self.assertThat(raised.part_name, Equals("part9"))
+
 
 class StagePackagesTestCase(unit.TestCase):
     def test_missing_stage_package_raises_exception(self):
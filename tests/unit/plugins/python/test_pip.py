@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import os
+import shutil
 import subprocess
 
 import fixtures
@@ -832,6 +833,79 @@ class PipWheelTestCase(PipCommandBaseTestCase):
         self._assert_mock_run_with(self.expected_args, **self.expected_kwargs)
 
 
+class PipWheelSdistTestCase(PipCommandBaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = mock.patch(
+            "snapcraft.internal.common.run_output", return_value="cpython-test"
+        )
+        self.mock_run_output = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.packages_dir = os.path.join("part_dir", "python-packages")
+        for file_name in ("foo-1.0.tar.gz", "bar_baz-2.0.zip", "qux-3.0.tar.gz"):
+            open(os.path.join(self.packages_dir, file_name), "w").close()
+        open(os.path.join(self.packages_dir, "qux-3.0-py3-none-any.whl"), "w").close()
+
+        wheels = {
+            "foo-1.0.tar.gz": "foo-1.0-py3-none-any.whl",
+            "bar_baz-2.0.zip": "bar_baz-2.0-py3-none-any.whl",
+        }
+
+        def fake_run(args, **kwargs):
+            if "--no-deps" in args:
+                wheel_dir = args[args.index("--wheel-dir") + 1]
+                wheel = wheels[os.path.basename(args[-1])]
+                open(os.path.join(wheel_dir, wheel), "w").close()
+
+        self.mock_run.side_effect = fake_run
+
+    def _get_built_sdists(self):
+        return sorted(
+            os.path.basename(c[0][0][-1])
+            for c in self.mock_run.call_args_list
+            if "--no-deps" in c[0][0]
+        )
+
+    def test_sdists_built_first(self):
+        self.pip.wheel(["foo"])
+
+        self.assertThat(
+            self._get_built_sdists(), Equals(["bar_baz-2.0.zip", "foo-1.0.tar.gz"])
+        )
+        self.assertTrue(
+            os.path.exists(os.path.join(self.packages_dir, "foo-1.0-py3-none-any.whl"))
+        )
+        # The last call resolves every package.
+        self.assertThat(self.mock_run.call_args[0][0][-1], Equals("foo"))
+
+    def test_cached_wheels_are_not_built_again(self):
+        self.pip.wheel(["foo"])
+        shutil.rmtree(self.packages_dir)
+        os.makedirs(self.packages_dir)
+        open(os.path.join(self.packages_dir, "foo-1.0.tar.gz"), "w").close()
+        self.mock_run.reset_mock()
+
+        self.pip.wheel(["foo"])
+
+        self.assertThat(self._get_built_sdists(), Equals([]))
+        self.assertTrue(
+            os.path.exists(os.path.join(self.packages_dir, "foo-1.0-py3-none-any.whl"))
+        )
+
+    def test_changed_sdist_is_built_again(self):
+        self.pip.wheel(["foo"])
+        os.remove(os.path.join(self.packages_dir, "foo-1.0-py3-none-any.whl"))
+        with open(os.path.join(self.packages_dir, "foo-1.0.tar.gz"), "w") as f:
+            f.write("changed")
+        self.mock_run.reset_mock()
+
+        self.pip.wheel(["foo"])
+
+        self.assertThat(self._get_built_sdists(), Equals(["foo-1.0.tar.gz"]))
+
+
 class PipListTestCase(PipCommandBaseTestCase):
     def test_none(self):
         self.mock_run.return_value = "{}"
@@ -895,6 +969,48 @@ class PipListTestCase(PipCommandBaseTestCase):
         self.assertThat(raised.output, Equals("foo 1.0"))
 
 
+class PipListInstalledTestCase(PipCommandBaseTestCase):
+    def _create_distribution(self, site_dir, file_name, name, version):
+        path = os.path.join(site_dir, file_name)
+        if file_name.endswith(".dist-info"):
+            os.makedirs(path)
+            path = os.path.join(path, "METADATA")
+        with open(path, "w") as f:
+            f.write(
+                "Metadata-Version: 2.1\nName: {}\nVersion: {}\n\n"
+                "Version: 0\n".format(name, version)
+            )
+
+    def test_list_installed(self):
+        home_site_dir = os.path.join(
+            "install_dir", "usr", "lib", "pythontest", "dist-packages"
+        )
+        user_site_dir = os.path.join(
+            "install_dir", "lib", "pythontest.1", "site-packages"
+        )
+        os.makedirs(home_site_dir)
+        os.makedirs(user_site_dir)
+        self._create_distribution(
+            home_site_dir, "yaml-1.0.egg-info", name="PyYAML", version="1.0"
+        )
+        self._create_distribution(
+            home_site_dir, "foo-1.0.dist-info", name="foo", version="1.0"
+        )
+        self._create_distribution(
+            user_site_dir, "foo-2.0.dist-info", name="foo", version="2.0"
+        )
+        os.makedirs(os.path.join(user_site_dir, "bar"))
+
+        self.assertThat(
+            self.pip.list_installed(), Equals({"foo": "2.0", "PyYAML": "1.0"})
+        )
+        self.assertThat(list(self.pip.list_installed()), Equals(["foo", "PyYAML"]))
+        self.mock_run.assert_not_called()
+
+    def test_list_installed_nothing(self):
+        self.assertThat(self.pip.list_installed(), Equals({}))
+
+
 class _CheckPythonhomeEnv:
     def __init__(self, test, expected_pythonhome):
         self.test = test
@@ -15,7 +15,6 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import ast
-import builtins
 import os
 import os.path
 import re
@@ -633,19 +632,19 @@ class CatkinPluginTestCase(CatkinPluginBaseTestCase):
         plugin = catkin.CatkinPlugin("test-part", self.properties, self.project_options)
         os.makedirs(plugin.rosdir)
 
-        # Place a file to be discovered by _use_in_snap_python().
-        open(os.path.join(plugin.rosdir, "foo"), "w").close()
+        # Place a binary file to be discovered by _use_in_snap_python(). Its
+        # first line looks like a python shebang, but the rest of it cannot
+        # be decoded.
+        contents = b"#!/usr/bin/python\n\xff\xfe\x00\x01"
+        with open(os.path.join(plugin.rosdir, "foo"), "wb") as f:
+            f.write(contents)
 
-        file_mock = mock.mock_open()
-        with mock.patch.object(builtins, "open", file_mock):
-            # Reading a binary file may throw a UnicodeDecodeError. Make sure
-            # that's handled.
-            file_mock.return_value.read.side_effect = UnicodeDecodeError(
-                "foo", b"bar", 1, 2, "baz"
-            )
-            # An exception will be raised if the function can't handle the
-            # binary file.
-            plugin._use_in_snap_python()
+        # An exception will be raised if the function can't handle the
+        # binary file.
+        plugin._use_in_snap_python()
+
+        with open(os.path.join(plugin.rosdir, "foo"), "rb") as f:
+            self.assertThat(f.read(), Equals(contents))
 
     def test_use_in_snap_python_rewrites_10_ros_sh(self):
         plugin = catkin.CatkinPlugin("test-part", self.properties, self.project_options)
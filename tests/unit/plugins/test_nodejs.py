@@ -20,7 +20,7 @@ from unittest import mock
 
 import fixtures
 from testscenarios.scenarios import multiply_scenarios
-from testtools.matchers import DirExists, Equals, HasLength
+from testtools.matchers import DirExists, Equals, FileContains, HasLength
 
 import snapcraft
 from snapcraft.internal import errors
@@ -539,6 +539,25 @@ class NodePluginNpmWorkaroundsTestCase(NodePluginBaseTestCase):
         self.assertFalse(os.path.islink(project_path))
 
 
+class NodePluginToolchainCacheTestCase(NodePluginBaseTestCase):
+    def test_pull_downloads_nodejs_once(self):
+        def download():
+            with open(tarball, "w") as tarball_file:
+                tarball_file.write("nodejs")
+
+        self.tar_mock().download.side_effect = download
+        plugin = nodejs.NodePlugin("test-part", self.options, self.project_options)
+        os.makedirs(plugin.sourcedir)
+        tarball = os.path.join(plugin._npm_dir, os.path.basename(self.nodejs_url))
+
+        plugin.pull()
+        plugin.clean_pull()
+        plugin.pull()
+
+        self.assertThat(self.tar_mock().download.call_count, Equals(1))
+        self.assertThat(tarball, FileContains("nodejs"))
+
+
 class NodeReleaseTestCase(unit.TestCase):
 
     scenarios = [
@@ -204,7 +204,7 @@ class PythonPluginTestCase(BasePythonPluginTestCase):
         packages = collections.OrderedDict()
         packages["yaml"] = "1.2"
         packages["extras"] = "1.0"
-        self.mock_pip.return_value.list.return_value = packages
+        self.mock_pip.return_value.list_installed.return_value = packages
 
         self.useFixture(fixture_setup.CleanEnvironment())
         plugin = python.PythonPlugin("test-part", self.options, self.project_options)
@@ -339,7 +339,7 @@ class PythonPluginTestCase(BasePythonPluginTestCase):
         packages = collections.OrderedDict()
         packages["testpackage1"] = "1.0"
         packages["testpackage2"] = "1.2"
-        self.mock_pip.return_value.list.return_value = packages
+        self.mock_pip.return_value.list_installed.return_value = packages
 
         plugin = python.PythonPlugin("test-part", self.options, self.project_options)
         setup_directories(plugin, self.options.python_version)
@@ -420,7 +420,7 @@ class PythonPluginTestCase(BasePythonPluginTestCase):
         # This should be an error but given that we default to
         # 'source: .' and now that pip 10 has been released
         # we run into the need of fixing this situation.
-        self.mock_pip.return_value.list.return_value = dict()
+        self.mock_pip.return_value.list_installed.return_value = dict()
 
         self.useFixture(fixture_setup.CleanEnvironment())
         plugin = python.PythonPlugin("test-part", self.options, self.project_options)
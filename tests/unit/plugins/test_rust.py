@@ -20,7 +20,7 @@ import os
 import subprocess
 from unittest import mock
 
-from testtools.matchers import Contains, DirExists, Equals, FileExists, Not
+from testtools.matchers import Contains, DirExists, Equals, FileExists, HasLength, Not
 
 import snapcraft
 from snapcraft.plugins import rust
@@ -338,6 +338,31 @@ class RustPluginTestCase(unit.TestCase):
             ]
         )
 
+    @mock.patch.object(rust.sources, "Script")
+    @mock.patch.object(rust.RustPlugin, "run")
+    def test_pull_with_revision_uses_cached_toolchain(self, run_mock, script_mock):
+        plugin = rust.RustPlugin("test-part", self.options, self.project_options)
+        os.makedirs(plugin.sourcedir)
+        plugin.options.rust_revision = "1.13.0"
+        plugin.options.rust_channel = ""
+
+        def run(cmd, **kwargs):
+            if cmd[0] == plugin._rustup:
+                os.makedirs(os.path.dirname(plugin._rustc))
+                open(plugin._rustc, "w").close()
+
+        run_mock.side_effect = run
+
+        plugin.pull()
+        plugin.clean_pull()
+        plugin.pull()
+
+        rustup_calls = [
+            c for c in run_mock.call_args_list if c[0][0][0] == plugin._rustup
+        ]
+        self.assertThat(rustup_calls, HasLength(1))
+        self.assertThat(plugin._rustc, FileExists())
+
     @mock.patch.object(rust.sources, "Script")
     @mock.patch.object(rust.RustPlugin, "run")
     def test_pull_with_source_and_source_subdir(self, run_mock, script_mock):
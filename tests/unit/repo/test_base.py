@@ -294,6 +294,25 @@ class FixPkgConfigTestCase(RepoBaseTestCase):
         self.assertThat(pc_file, FileContains(expected_pc_file_content))
 
 
+class FixShebangsTestCase(RepoBaseTestCase):
+    def test_fix_shebangs(self):
+        bin_dir = os.path.join(self.tempdir, "usr", "bin")
+        os.makedirs(bin_dir)
+        script = os.path.join(bin_dir, "script")
+        with open(script, "w") as f:
+            f.write("#!/usr/bin/python3\nprint('hello')\n")
+        os.symlink("script", os.path.join(bin_dir, "script-link"))
+
+        BaseRepo(self.tempdir).normalize(self.tempdir)
+
+        self.assertThat(
+            script, FileContains("#!/usr/bin/env python3\nprint('hello')\n")
+        )
+        self.assertThat(
+            os.readlink(os.path.join(bin_dir, "script-link")), Equals("script")
+        )
+
+
 class FixSymlinksTestCase(RepoBaseTestCase):
 
     scenarios = [
@@ -42,14 +42,15 @@ class UbuntuTestCase(RepoBaseTestCase):
 
         self.mock_package = MagicMock()
         self.mock_package.candidate.fetch_binary.side_effect = _fetch_binary
+        self.mock_package.candidate.priority = "optional"
         self.mock_cache.return_value.get_changes.return_value = [self.mock_package]
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_cache_update_failed(self, mock_apt_pkg, mock_fetch_binary):
+    def test_cache_update_failed(self, mock_apt_pkg, mock_fetch_binaries):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
         self.mock_cache().update.side_effect = apt.cache.FetchFailedException()
         project_options = snapcraft.ProjectOptions(use_geoip=False)
@@ -57,12 +58,14 @@ class UbuntuTestCase(RepoBaseTestCase):
         self.assertRaises(errors.CacheUpdateFailedError, ubuntu.get, ["fake-package"])
 
     @patch("shutil.rmtree")
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_cache_hashsum_mismatch(self, mock_apt_pkg, mock_fetch_binary, mock_rmtree):
+    def test_cache_hashsum_mismatch(
+        self, mock_apt_pkg, mock_fetch_binaries, mock_rmtree
+    ):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
         self.mock_cache().update.side_effect = [
             apt.cache.FetchFailedException(
@@ -74,6 +77,30 @@ class UbuntuTestCase(RepoBaseTestCase):
         ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
         ubuntu.get(["fake-package"])
 
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
+    @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
+    def test_apt_cache_shared_across_repos(self, mock_apt_pkg, mock_fetch_binaries):
+        fake_package_path = os.path.join(self.path, "fake-package.deb")
+        open(fake_package_path, "w").close()
+        mock_fetch_binaries.return_value = [fake_package_path]
+        self.mock_cache().is_virtual_package.return_value = False
+        self.mock_cache.reset_mock()
+
+        project_options = snapcraft.ProjectOptions(use_geoip=False)
+        for part in ("part1", "part2"):
+            ubuntu = repo.Ubuntu(
+                os.path.join(self.tempdir, part), project_options=project_options
+            )
+            ubuntu.is_valid("fake-package")
+            ubuntu.get(["fake-package"])
+
+        self.mock_cache.assert_called_once_with(memonly=True, rootdir=ANY)
+        self.mock_cache.return_value.update.assert_called_once_with(
+            fetch_progress=ANY, sources_list=ANY
+        )
+        # Changes marked by a user are cleared for the next one.
+        self.assertThat(self.mock_cache.return_value.clear.call_count, Equals(4))
+
     def test_get_pkg_name_parts_name_only(self):
         name, version = repo.get_pkg_name_parts("hello")
         self.assertThat(name, Equals("hello"))
@@ -89,12 +116,12 @@ class UbuntuTestCase(RepoBaseTestCase):
         self.assertThat(name, Equals("hello"))
         self.assertThat(version, Equals("2.10-1"))
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_get_package(self, mock_apt_pkg, mock_fetch_binary):
+    def test_get_package(self, mock_apt_pkg, mock_fetch_binaries):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
 
         project_options = snapcraft.ProjectOptions(use_geoip=False)
@@ -132,12 +159,12 @@ class UbuntuTestCase(RepoBaseTestCase):
             os.path.join(self.tempdir, "download", "fake-package.deb"), FileExists()
         )
 
-    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binary")
+    @patch("snapcraft.internal.repo._deb._AptCache.fetch_binaries")
     @patch("snapcraft.internal.repo._deb.apt.apt_pkg")
-    def test_get_multiarch_package(self, mock_apt_pkg, mock_fetch_binary):
+    def test_get_multiarch_package(self, mock_apt_pkg, mock_fetch_binaries):
         fake_package_path = os.path.join(self.path, "fake-package.deb")
         open(fake_package_path, "w").close()
-        mock_fetch_binary.return_value = fake_package_path
+        mock_fetch_binaries.return_value = [fake_package_path]
         self.mock_cache().is_virtual_package.return_value = False
 
         project_options = snapcraft.ProjectOptions(use_geoip=False)
@@ -257,6 +284,158 @@ deb http://ports.ubuntu.com/ubuntu-ports trusty-security multiverse
         self.assertFalse(mock_cc.called)
 
 
+class FetchBinariesTestCase(RepoBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        patcher = patch("snapcraft.internal.repo._deb.apt.apt_pkg")
+        self.mock_apt_pkg = patcher.start()
+        self.addCleanup(patcher.stop)
+
+        patcher = patch("snapcraft.internal.repo._deb.apt.package._file_is_same")
+        self.mock_file_is_same = patcher.start()
+        self.mock_file_is_same.return_value = False
+        self.addCleanup(patcher.stop)
+
+        self.mock_apt_pkg.AcquireFile.return_value.status = "done"
+        self.mock_apt_pkg.AcquireFile.return_value.STAT_DONE = "done"
+
+        self.apt_cache = repo._deb._AptCache("amd64")
+        self.apt_cache.progress = MagicMock()
+
+    def _make_candidate(self, name):
+        candidate = MagicMock()
+        candidate._records.filename = "pool/{}.deb".format(name)
+        candidate.size = 10
+        return candidate
+
+    def test_fetch_binaries_single_acquire(self):
+        candidates = [self._make_candidate(n) for n in ("foo", "bar")]
+
+        paths = self.apt_cache.fetch_binaries(
+            package_candidates=candidates, destination=self.path
+        )
+
+        self.assertThat(
+            paths,
+            Equals(
+                [os.path.join(self.path, "foo.deb"), os.path.join(self.path, "bar.deb")]
+            ),
+        )
+        self.mock_apt_pkg.Acquire.assert_called_once_with(self.apt_cache.progress)
+        self.assertThat(self.mock_apt_pkg.AcquireFile.call_count, Equals(2))
+        self.mock_apt_pkg.Acquire.return_value.run.assert_called_once_with()
+
+    def test_fetch_binaries_skips_cached(self):
+        self.mock_file_is_same.return_value = True
+
+        paths = self.apt_cache.fetch_binaries(
+            package_candidates=[self._make_candidate("foo")], destination=self.path
+        )
+
+        self.assertThat(paths, Equals([os.path.join(self.path, "foo.deb")]))
+        self.mock_apt_pkg.AcquireFile.assert_not_called()
+        self.mock_apt_pkg.Acquire.return_value.run.assert_not_called()
+
+    def test_fetch_binaries_failure(self):
+        self.mock_apt_pkg.AcquireFile.return_value.status = "error"
+
+        self.assertRaises(
+            apt.package.FetchError,
+            self.apt_cache.fetch_binaries,
+            package_candidates=[self._make_candidate("foo")],
+            destination=self.path,
+        )
+
+
+class UnpackTestCase(RepoBaseTestCase):
+    def setUp(self):
+        super().setUp()
+
+        def _extract(cmd):
+            _, _, pkg, destination = cmd
+            name = os.path.splitext(os.path.basename(pkg))[0]
+            os.makedirs(os.path.join(destination, "usr", "bin"))
+            path = os.path.join(destination, "usr", "bin", name)
+            with open(path, "w") as f:
+                f.write("#!/usr/bin/python3\n")
+            os.chmod(path, 0o4755)
+
+        patcher = patch("snapcraft.internal.repo._deb.subprocess.check_call")
+        self.mock_check_call = patcher.start()
+        self.mock_check_call.side_effect = _extract
+        self.addCleanup(patcher.stop)
+
+        project_options = snapcraft.ProjectOptions(use_geoip=False)
+        self.ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+        download_dir = os.path.join(self.tempdir, "download")
+        os.makedirs(download_dir)
+        for name in ("foo", "bar"):
+            with open(os.path.join(download_dir, "{}.deb".format(name)), "w") as f:
+                f.write(name)
+
+    def test_unpack(self):
+        unpackdir = os.path.join(self.path, "unpack")
+        self.ubuntu.unpack(unpackdir)
+
+        self.assertThat(self.mock_check_call.call_count, Equals(2))
+        for name in ("foo", "bar"):
+            path = os.path.join(unpackdir, "usr", "bin", name)
+            with open(path) as f:
+                self.assertThat(f.read(), Equals("#!/usr/bin/env python3\n"))
+            self.assertThat(os.stat(path).st_mode & 0o7777, Equals(0o755))
+
+    def test_unpack_again_uses_cache(self):
+        self.ubuntu.unpack(os.path.join(self.path, "unpack1"))
+        self.mock_check_call.reset_mock()
+
+        unpackdir = os.path.join(self.path, "unpack2")
+        self.ubuntu.unpack(unpackdir)
+
+        self.mock_check_call.assert_not_called()
+        self.assertThat(os.path.join(unpackdir, "usr", "bin", "foo"), FileExists())
+
+    def test_unpack_does_not_share_files_with_cache(self):
+        unpackdir = os.path.join(self.path, "unpack")
+        self.ubuntu.unpack(unpackdir)
+
+        path = os.path.join(unpackdir, "usr", "bin", "foo")
+        self.assertThat(os.stat(path).st_nlink, Equals(1))
+        with open(path, "w") as f:
+            f.write("modified")
+
+        unpackdir = os.path.join(self.path, "unpack2")
+        self.ubuntu.unpack(unpackdir)
+
+        with open(os.path.join(unpackdir, "usr", "bin", "foo")) as f:
+            self.assertThat(f.read(), Equals("#!/usr/bin/env python3\n"))
+
+    def test_unpack_uses_recorded_digest(self):
+        digest = "0123456789abcdef" * 4
+        with open(os.path.join(self.tempdir, "download", "foo.deb.sha256"), "w") as f:
+            f.write(digest)
+
+        with patch(
+            "snapcraft.file_utils.calculate_hash", return_value="f" * 64
+        ) as mock_calculate_hash:
+            self.ubuntu.unpack(os.path.join(self.path, "unpack"))
+
+        mock_calculate_hash.assert_called_once_with(
+            os.path.join(self.tempdir, "download", "bar.deb"), algorithm="sha256"
+        )
+        self.assertThat(
+            sorted(os.listdir(self.ubuntu._cache.unpacked_dir)),
+            Equals([digest, "f" * 64]),
+        )
+
+    def test_unpack_error(self):
+        self.mock_check_call.side_effect = CalledProcessError(1, "dpkg-deb")
+
+        self.assertRaises(
+            errors.UnpackError, self.ubuntu.unpack, os.path.join(self.path, "unpack")
+        )
+        self.assertThat(os.listdir(self.ubuntu._cache.unpacked_dir), Equals([]))
+
+
 class UbuntuTestCaseWithFakeAptCache(RepoBaseTestCase):
     def setUp(self):
         super().setUp()
@@ -277,6 +456,53 @@ class UbuntuTestCaseWithFakeAptCache(RepoBaseTestCase):
             Equals(["test-installed-package=test-installed-package-version"]),
         )
 
+    def test_host_packages_queried_from_one_snapshot(self):
+        self.fake_apt_cache.add_package(
+            fixture_setup.FakeAptCachePackage(
+                "test-installed-package", "test-version", installed=True
+            )
+        )
+
+        self.assertThat(
+            repo.Repo.build_package_is_valid("test-installed-package"), Equals(True)
+        )
+        self.assertTrue(repo.Repo.is_package_installed("test-installed-package"))
+        self.assertThat(
+            repo.Repo.get_installed_packages(),
+            Equals(["test-installed-package=test-version"]),
+        )
+        self.assertThat(
+            repo.Repo.get_installed_packages(),
+            Equals(["test-installed-package=test-version"]),
+        )
+        self.fake_apt_cache.mock_apt_cache.assert_called_once_with()
+
+    def test_host_packages_snapshot_invalidated_by_dpkg_status(self):
+        dpkg_status_path = os.path.join(self.path, "status")
+        open(dpkg_status_path, "w").close()
+        patcher = patch(
+            "snapcraft.internal.repo._deb._HostPackages._DPKG_STATUS_PATH",
+            dpkg_status_path,
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.assertThat(repo.Repo.get_installed_packages(), Equals([]))
+
+        self.fake_apt_cache.add_package(
+            fixture_setup.FakeAptCachePackage(
+                "test-installed-package", "test-version", installed=True
+            )
+        )
+        with open(dpkg_status_path, "w") as dpkg_status_file:
+            dpkg_status_file.write("Package: test-installed-package")
+
+        self.assertThat(
+            repo.Repo.get_installed_packages(),
+            Equals(["test-installed-package=test-version"]),
+        )
+        self.assertThat(self.fake_apt_cache.mock_apt_cache.call_count, Equals(2))
+
 
 class AutokeepTestCase(RepoBaseTestCase):
     def test_autokeep(self):
@@ -336,6 +562,42 @@ class AutokeepTestCase(RepoBaseTestCase):
         )
 
 
+class FilterBasePackagesTestCase(RepoBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fake_apt_cache = fixture_setup.FakeAptCache()
+        self.useFixture(self.fake_apt_cache)
+        self.fake_apt_cache.add_package(
+            fixture_setup.FakeAptCachePackage("main-package", "1.0")
+        )
+        self.fake_apt_cache.add_package(fixture_setup.FakeAptCachePackage("apt", "1.0"))
+        self.fake_apt_cache.add_package(
+            fixture_setup.FakeAptCachePackage(
+                "essential-package", "1.0", priority="essential"
+            )
+        )
+        self.fake_apt_cache.cache["main-package"].dependencies = [
+            [
+                fixture_setup.FakeAptBaseDependency(
+                    name, [self.fake_apt_cache.cache[name]]
+                )
+            ]
+            for name in ("essential-package", "apt")
+        ]
+
+        project_options = snapcraft.ProjectOptions()
+        self.ubuntu = repo.Ubuntu(self.tempdir, project_options=project_options)
+
+    def test_base_packages_pulled_in_are_not_fetched(self):
+        self.assertThat(self.ubuntu.get(["main-package"]), Equals(["main-package=1.0"]))
+
+    def test_base_packages_requested_are_fetched(self):
+        self.assertThat(
+            sorted(self.ubuntu.get(["main-package", "essential-package", "apt"])),
+            Equals(["apt=1.0", "essential-package=1.0", "main-package=1.0"]),
+        )
+
+
 class BuildPackagesTestCase(unit.TestCase):
     def setUp(self):
         super().setUp()
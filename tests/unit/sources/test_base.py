@@ -14,12 +14,13 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import hashlib
 import os
 from unittest import mock
 
 from testtools.matchers import Equals
 
-from snapcraft.internal.sources import _base
+from snapcraft.internal.sources import _base, errors
 from tests import unit
 
 
@@ -83,6 +84,44 @@ class TestFileBase(unit.TestCase):
         mock_request.raise_for_status.assert_called_once_with()
         mock_download.assert_called_once_with(mock_request, file_src.file)
 
+    @mock.patch("snapcraft.internal.sources._base.FileCache")
+    @mock.patch("snapcraft.internal.sources._base.download_requests_stream")
+    @mock.patch("snapcraft.internal.sources._base.requests")
+    def test_download_http_verifies_while_downloading(
+        self, mock_requests, mock_download, mock_file_cache
+    ):
+        def download(request, destination, *, hasher):
+            hasher.update(b"contents")
+
+        mock_download.side_effect = download
+        mock_file_cache().get.return_value = None
+        digest = hashlib.sha256(b"contents").hexdigest()
+        file_src = _base.FileBase(
+            "http://snapcraft.io/snapcraft.yaml",
+            "dir",
+            source_checksum="sha256/{}".format(digest),
+        )
+
+        file_src.download()
+
+        mock_file_cache().cache.assert_called_once_with(
+            filename=file_src.file, algorithm="sha256", hash=digest, verify=False
+        )
+
+    @mock.patch("snapcraft.internal.sources._base.FileCache")
+    @mock.patch("snapcraft.internal.sources._base.download_requests_stream")
+    @mock.patch("snapcraft.internal.sources._base.requests")
+    def test_download_http_digest_does_not_match(
+        self, mock_requests, mock_download, mock_file_cache
+    ):
+        mock_file_cache().get.return_value = None
+        file_src = _base.FileBase(
+            "http://snapcraft.io/snapcraft.yaml", "dir", source_checksum="sha256/1"
+        )
+
+        self.assertRaises(errors.DigestDoesNotMatchError, file_src.download)
+        mock_file_cache().cache.assert_not_called()
+
     @mock.patch("snapcraft.internal.sources._base.download_urllib_source")
     def test_download_ftp(self, mock_download):
         file_src = self.get_mock_file_base("ftp://snapcraft.io/snapcraft.yaml", "dir")
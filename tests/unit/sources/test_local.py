@@ -335,3 +335,66 @@ class TestLocalUpdate(unit.TestCase):
 
         local.update()
         self.assertThat(os.path.join(destination, "dir", "file2"), FileExists())
+
+
+class TestLocalSnapshot(unit.TestCase):
+    """Verify that the local source can find changes through a snapshot."""
+
+    def setUp(self):
+        super().setUp()
+
+        os.makedirs(os.path.join("source", "dir"))
+        with open(os.path.join("source", "file"), "w") as f:
+            f.write("1")
+        with open(os.path.join("source", "dir", "file"), "w") as f:
+            f.write("1")
+
+        self.local = sources.Local(
+            "source", "destination", snapshot_file=os.path.join("state", "snapshot")
+        )
+        self.local.pull()
+
+    def test_pull_saves_snapshot(self):
+        self.assertThat(os.path.join("state", "snapshot"), FileExists())
+        self.assertFalse(self.local.check("missing-target"))
+
+    def test_file_modified(self):
+        with open(os.path.join("source", "dir", "file"), "w") as f:
+            f.write("22")
+
+        self.assertTrue(self.local.check("missing-target"))
+        self.local.update()
+
+        self.assertThat(os.path.join("destination", "dir", "file"), FileContains("22"))
+        self.assertFalse(self.local.check("missing-target"))
+
+    def test_file_and_directory_added(self):
+        os.mkdir(os.path.join("source", "new-dir"))
+        with open(os.path.join("source", "new-dir", "file"), "w") as f:
+            f.write("2")
+
+        self.assertTrue(self.local.check("missing-target"))
+        self.local.update()
+
+        self.assertThat(
+            os.path.join("destination", "new-dir", "file"), FileContains("2")
+        )
+
+    def test_file_and_directory_removed(self):
+        os.remove(os.path.join("source", "file"))
+        shutil.rmtree(os.path.join("source", "dir"))
+
+        self.assertTrue(self.local.check("missing-target"))
+        self.local.update()
+
+        self.assertFalse(os.path.exists(os.path.join("destination", "file")))
+        self.assertFalse(os.path.exists(os.path.join("destination", "dir")))
+
+    def test_file_replaced_by_directory(self):
+        os.remove(os.path.join("source", "file"))
+        os.mkdir(os.path.join("source", "file"))
+
+        self.assertTrue(self.local.check("missing-target"))
+        self.local.update()
+
+        self.assertThat(os.path.join("destination", "file"), DirExists())
@@ -0,0 +1,121 @@
+# -*- Mode:Python; indent-tabs-mode:nil; tab-width:4 -*-
+#
+# Copyright (C) 2018 Canonical Ltd
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License version 3 as
+# published by the Free Software Foundation.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import collections
+import datetime
+import os
+
+import fixtures
+from testtools.matchers import Equals, IsInstance, StartsWith
+
+import snapcraft.extractors
+from snapcraft.internal import states, steps
+from snapcraft.internal.states import _compact
+from tests import unit
+
+
+class _Project:
+    deb_arch = "amd64"
+
+
+class CompactStateTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        self.state = states.PrimeState(
+            {"bin/foo", "lib/libfoo.so"},
+            {"bin", "lib"},
+            {"/lib"},
+            collections.OrderedDict([("prime", ["*"]), ("override-prime", None)]),
+            _Project(),
+            snapcraft.extractors.ExtractedMetadata(version="1.0"),
+        )
+        self.state_dir = os.path.join(self.path, "state")
+        os.mkdir(self.state_dir)
+        self.state_file = states.get_step_state_file(self.state_dir, steps.PRIME)
+
+    def test_round_trip(self):
+        state = _compact.load(_compact.dump(self.state))
+
+        self.assertThat(state, Equals(self.state))
+        self.assertThat(state.files, IsInstance(set))
+        self.assertThat(state.properties, IsInstance(collections.OrderedDict))
+        self.assertThat(state.scriptlet_metadata.get_version(), Equals("1.0"))
+
+    def test_save_state_yaml_by_default(self):
+        states.save_state(self.state_dir, steps.PRIME, self.state)
+
+        with open(self.state_file) as state_file:
+            self.assertThat(state_file.readline(), Equals("!PrimeState\n"))
+        self.assertThat(
+            states.get_state(self.state_dir, steps.PRIME), Equals(self.state)
+        )
+
+    def test_save_state_compact(self):
+        self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_COMPACT_STATE", "1"))
+
+        states.save_state(self.state_dir, steps.PRIME, self.state)
+
+        with open(self.state_file, "rb") as state_file:
+            self.assertThat(state_file.read(), StartsWith(_compact.MAGIC))
+        self.assertThat(
+            states.get_state(self.state_dir, steps.PRIME), Equals(self.state)
+        )
+
+    def test_compact_state_read_when_disabled(self):
+        with open(self.state_file, "wb") as state_file:
+            state_file.write(_compact.dump(self.state))
+
+        self.assertThat(
+            states.get_state(self.state_dir, steps.PRIME), Equals(self.state)
+        )
+
+    def test_yaml_state_migrated(self):
+        states.save_state(self.state_dir, steps.PRIME, self.state)
+        os.utime(self.state_file, ns=(0, 1))
+        self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_COMPACT_STATE", "1"))
+
+        self.assertThat(
+            states.get_state(self.state_dir, steps.PRIME), Equals(self.state)
+        )
+
+        with open(self.state_file, "rb") as state_file:
+            self.assertThat(state_file.read(), StartsWith(_compact.MAGIC))
+        # The time the step ran is kept.
+        self.assertThat(os.stat(self.state_file).st_mtime_ns, Equals(1))
+        self.assertThat(os.listdir(self.state_dir), Equals(["prime"]))
+
+    def test_round_trip_tuples_and_bytes(self):
+        self.state.assets = {
+            "checksums": ("sha256", b"\0\xff"),
+            "pairs": {("bin", "foo"), ("lib", "libfoo.so")},
+        }
+
+        state = _compact.load(_compact.dump(self.state))
+
+        self.assertThat(state, Equals(self.state))
+
+    def test_save_state_falls_back_to_yaml(self):
+        self.useFixture(fixtures.EnvironmentVariable("SNAPCRAFT_COMPACT_STATE", "1"))
+        self.state.assets = {"build-date": datetime.date(2018, 1, 1)}
+
+        states.save_state(self.state_dir, steps.PRIME, self.state)
+
+        with open(self.state_file) as state_file:
+            self.assertThat(state_file.readline(), Equals("!PrimeState\n"))
+        self.assertThat(
+            states.get_state(self.state_dir, steps.PRIME), Equals(self.state)
+        )
@@ -16,7 +16,7 @@
 
 import os
 
-from testtools.matchers import Equals
+from testtools.matchers import Equals, HasLength
 
 from snapcraft.internal import common, errors
 from tests import unit
@@ -36,6 +36,48 @@ class CommonTestCase(unit.TestCase):
         self.assertFalse(common.isurl("/fo:o"))
 
 
+class RunTestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+        self.addCleanup(common.reset_env)
+        common.env = ['FOO="foo"', 'BAR="$FOO-bar"']
+
+    def test_run_with_env(self):
+        self.assertThat(common.run_output(["sh", "-c", "echo $BAR"]), Equals("foo-bar"))
+
+    def test_env_evaluated_once(self):
+        common.run_output(["true"])
+        common.run_output(["sh", "-c", "echo $BAR"])
+        self.assertThat(common._evaluated_envs, HasLength(1))
+
+        common.reset_env()
+        self.assertThat(common._evaluated_envs, HasLength(0))
+
+    def test_env_evaluated_from_given_env(self):
+        self.assertThat(
+            common.run_output(
+                ["sh", "-c", "echo $BAR $BAZ"],
+                env={"PATH": os.environ["PATH"], "FOO": "baz", "BAZ": "qux"},
+            ),
+            Equals("foo-bar qux"),
+        )
+        common.env = ['BAR="$FOO-bar"']
+        env = {"PATH": os.environ["PATH"], "FOO": "baz"}
+        self.assertThat(
+            common.run_output(["sh", "-c", "echo $BAR"], env=env), Equals("baz-bar")
+        )
+
+    def test_run_script_without_shebang(self):
+        with open("script", "w") as script_file:
+            script_file.write("echo $BAR")
+        os.chmod("script", 0o755)
+
+        self.assertThat(common.run_output(["./script"]), Equals("foo-bar"))
+
+    def test_run_missing_command(self):
+        self.assertRaises(errors.SnapcraftCommandError, common.run, ["missing-command"])
+
+
 class CommonMigratedTestCase(unit.TestCase):
     def test_parallel_build_count_migration_message(self):
         raised = self.assertRaises(
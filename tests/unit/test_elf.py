@@ -20,7 +20,8 @@ import subprocess
 import tempfile
 import sys
 
-from testtools.matchers import Contains, EndsWith, Equals, NotEquals, StartsWith
+from elftools.common.exceptions import ELFError
+from testtools.matchers import EndsWith, Equals, NotEquals, StartsWith
 from unittest import mock
 
 from snapcraft.internal import errors, elf
@@ -106,7 +107,7 @@ class TestGetLibraries(TestElfBase):
         self.get_system_libs_mock = patcher.start()
         self.addCleanup(patcher.stop)
 
-        self.get_system_libs_mock.return_value = frozenset()
+        self.get_system_libs_mock.return_value = frozenset(["libc.so.6"])
 
         patcher = mock.patch("os.path.exists")
         self.path_exists_mock = patcher.start()
@@ -117,8 +118,14 @@ class TestGetLibraries(TestElfBase):
         self.fake_logger = fixtures.FakeLogger(level=logging.WARNING)
         self.useFixture(self.fake_logger)
 
+    def _get_elf_file(self, name, needed=("foo.so.1", "bar.so.2")):
+        elf_file = self.fake_elf[name]
+        for soname in needed:
+            elf_file.needed[soname] = elf.NeededLibrary(name=soname)
+        return elf_file
+
     def test_get_libraries(self):
-        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file = self._get_elf_file("fake_elf-2.23")
         libs = elf_file.load_dependencies(
             root_path=self.fake_elf.root_path,
             core_base_path=self.fake_elf.core_base_path,
@@ -127,12 +134,17 @@ class TestGetLibraries(TestElfBase):
         self.assertThat(
             libs,
             Equals(
-                set([self.fake_elf.root_libraries["foo.so.1"], "/usr/lib/bar.so.2"])
+                set(
+                    [
+                        self.fake_elf.root_libraries["foo.so.1"],
+                        self.fake_elf.host_libraries["bar.so.2"],
+                    ]
+                )
             ),
         )
 
     def test_get_libraries_with_soname_cache(self):
-        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file = self._get_elf_file("fake_elf-2.23")
 
         arch = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
         soname_cache = elf.SonameCache()
@@ -144,14 +156,14 @@ class TestGetLibraries(TestElfBase):
             soname_cache=soname_cache,
         )
 
-        # With no cache this would have returned '/usr/lib/bar.so.2'
+        # With no cache this would have returned the host bar.so.2
         self.assertThat(
             libs,
             Equals(set([self.fake_elf.root_libraries["foo.so.1"], "/lib/bar.so.2"])),
         )
 
     def test_primed_libraries_are_preferred(self):
-        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file = self._get_elf_file("fake_elf-2.23")
         libs = elf_file.load_dependencies(
             root_path=self.fake_elf.root_path,
             core_base_path=self.fake_elf.core_base_path,
@@ -161,27 +173,137 @@ class TestGetLibraries(TestElfBase):
             libs,
             Equals(
                 frozenset(
-                    [self.fake_elf.root_libraries["foo.so.1"], "/usr/lib/bar.so.2"]
+                    [
+                        self.fake_elf.root_libraries["foo.so.1"],
+                        self.fake_elf.host_libraries["bar.so.2"],
+                    ]
                 )
             ),
         )
 
+    def test_libraries_in_library_paths_are_found(self):
+        root_foo = os.path.join(self.fake_elf.root_path, "lib", "foo.so.1")
+        os.makedirs(os.path.dirname(root_foo))
+        with open(root_foo, "wb") as f:
+            f.write(b"\x7fELF")
+
+        elf_file = self._get_elf_file("fake_elf-2.23")
+        elf_file.load_dependencies(
+            root_path=self.fake_elf.root_path,
+            core_base_path=self.fake_elf.core_base_path,
+        )
+
+        self.assertThat(
+            {d.soname: d.path for d in elf_file.dependencies}["foo.so.1"],
+            Equals(root_foo),
+        )
+
+    def test_rpath_is_used(self):
+        rpath_foo = os.path.join(self.fake_elf.root_path, "private", "foo.so.1")
+        os.makedirs(os.path.dirname(rpath_foo))
+        with open(rpath_foo, "wb") as f:
+            f.write(b"\x7fELF")
+
+        elf_file = self._get_elf_file("fake_elf-2.23")
+        elf_file.rpaths = ["$ORIGIN/private"]
+        resolver = elf.DependencyResolver(
+            root_path=self.fake_elf.root_path,
+            core_base_path=self.fake_elf.core_base_path,
+        )
+
+        self.assertThat(
+            resolver.resolve(elf_file),
+            Equals(
+                {
+                    "libc.so.6": "",
+                    "foo.so.1": rpath_foo,
+                    "bar.so.2": self.fake_elf.host_libraries["bar.so.2"],
+                }
+            ),
+        )
+
+    def test_rpath_is_not_used_by_dependencies_with_runpath(self):
+        rpath_foo = os.path.join(self.fake_elf.root_path, "private", "foo.so.1")
+        rpath_baz = os.path.join(self.fake_elf.root_path, "private", "baz.so.3")
+        os.makedirs(os.path.dirname(rpath_foo))
+        for path in (rpath_foo, rpath_baz):
+            with open(path, "wb") as f:
+                f.write(b"\x7fELF")
+
+        elf_file = self._get_elf_file("fake_elf-2.23", needed=["foo.so.1"])
+        elf_file.rpaths = ["$ORIGIN/private"]
+        resolver = elf.DependencyResolver(
+            root_path=self.fake_elf.root_path,
+            core_base_path=self.fake_elf.core_base_path,
+        )
+        private_foo = resolver._load(rpath_foo)
+        private_foo.runpaths = ["/nonexistent"]
+        private_foo.needed["baz.so.3"] = elf.NeededLibrary(name="baz.so.3")
+
+        self.assertThat(
+            resolver.resolve(elf_file),
+            Equals({"libc.so.6": "", "foo.so.1": rpath_foo, "baz.so.3": ""}),
+        )
+
+    def test_unparsable_libraries_are_skipped(self):
+        elf_file = self._get_elf_file("fake_elf-2.23")
+        resolver = elf.DependencyResolver(
+            root_path=self.fake_elf.root_path,
+            core_base_path=self.fake_elf.core_base_path,
+        )
+
+        with mock.patch.object(
+            elf.ElfFile, "_extract", side_effect=ELFError("Magic number does not match")
+        ):
+            dependencies = resolver.resolve(elf_file)
+
+        self.assertThat(
+            dependencies, Equals({"libc.so.6": "", "foo.so.1": "", "bar.so.2": ""})
+        )
+
+    def test_dependencies_of_dependencies_are_resolved(self):
+        elf_file = self._get_elf_file("fake_elf-2.23", needed=["foo.so.1"])
+        resolver = elf.DependencyResolver(
+            root_path=self.fake_elf.root_path,
+            core_base_path=self.fake_elf.core_base_path,
+        )
+        host_foo = resolver._load(self.fake_elf.host_libraries["foo.so.1"])
+        host_foo.needed["bar.so.2"] = elf.NeededLibrary(name="bar.so.2")
+
+        self.assertThat(
+            resolver.resolve(elf_file),
+            Equals(
+                {
+                    "libc.so.6": "",
+                    "foo.so.1": self.fake_elf.host_libraries["foo.so.1"],
+                    "bar.so.2": self.fake_elf.host_libraries["bar.so.2"],
+                }
+            ),
+        )
+
     def test_non_elf_primed_sonames_matches_are_ignored(self):
         primed_foo = os.path.join(self.fake_elf.root_path, "foo.so.1")
         with open(primed_foo, "wb") as f:
             # A bz2 header
             f.write(b"\x42\x5a\x68")
 
-        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file = self._get_elf_file("fake_elf-2.23")
         libs = elf_file.load_dependencies(
             root_path=self.fake_elf.root_path,
             core_base_path=self.fake_elf.core_base_path,
         )
 
-        self.assertThat(libs, Equals(frozenset(["/lib/foo.so.1", "/usr/lib/bar.so.2"])))
+        self.assertThat(libs, Equals(frozenset(self.fake_elf.host_libraries.values())))
 
     def test_get_libraries_excludes_slash_snap(self):
-        elf_file = self.fake_elf["fake_elf-with-core-libs"]
+        core_barsnap = os.path.join(self.fake_elf.core_base_path, "lib", "barsnap.so.2")
+        os.makedirs(os.path.dirname(core_barsnap))
+        with open(core_barsnap, "wb") as f:
+            f.write(b"\x7fELF")
+
+        elf_file = self._get_elf_file(
+            "fake_elf-with-core-libs", needed=["foo.so.1", "bar.so.2", "barsnap.so.2"]
+        )
         libs = elf_file.load_dependencies(
             root_path=self.fake_elf.root_path,
             core_base_path=self.fake_elf.core_base_path,
@@ -190,31 +312,34 @@ class TestGetLibraries(TestElfBase):
         self.assertThat(
             libs,
             Equals(
-                set([self.fake_elf.root_libraries["foo.so.1"], "/usr/lib/bar.so.2"])
+                set(
+                    [
+                        self.fake_elf.root_libraries["foo.so.1"],
+                        self.fake_elf.host_libraries["bar.so.2"],
+                    ]
+                )
             ),
         )
 
     def test_get_libraries_filtered_by_system_libraries(self):
-        self.get_system_libs_mock.return_value = frozenset(["foo.so.1"])
+        self.get_system_libs_mock.return_value = frozenset(["libc.so.6", "foo.so.1"])
 
-        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file = self._get_elf_file("fake_elf-2.23")
         libs = elf_file.load_dependencies(
             root_path="/", core_base_path="/snap/core/current"
         )
-        self.assertThat(libs, Equals(frozenset(["/usr/lib/bar.so.2"])))
+        self.assertThat(
+            libs, Equals(frozenset([self.fake_elf.host_libraries["bar.so.2"]]))
+        )
 
-    def test_get_libraries_ldd_failure_logs_warning(self):
-        elf_file = self.fake_elf["fake_elf-bad-ldd"]
+    def test_get_libraries_not_found(self):
+        elf_file = self._get_elf_file("fake_elf-2.23", needed=["missing.so.1"])
         libs = elf_file.load_dependencies(
             root_path=self.fake_elf.root_path,
             core_base_path=self.fake_elf.core_base_path,
         )
 
         self.assertThat(libs, Equals(set()))
-        self.assertThat(
-            self.fake_logger.output,
-            Contains("Unable to determine library dependencies for"),
-        )
 
 
 class TestSystemLibsOnNewRelease(TestElfBase):
@@ -368,6 +493,85 @@ class TestPatcher(TestElfBase):
         elf_patcher = elf.Patcher(dynamic_linker="/lib/fake-ld", root_path="/fake")
         elf_patcher.patch(elf_file=elf_file)
 
+    def test_patch_does_nothing_if_already_patched(self):
+        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_patcher = elf.Patcher(dynamic_linker=elf_file.interp, root_path="/fake")
+
+        with mock.patch("subprocess.check_call") as mock_check_call:
+            elf_patcher.patch(elf_file=elf_file)
+
+        mock_check_call.assert_not_called()
+
+    def test_patch_sets_everything_at_once(self):
+        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file.dependencies = {
+            mock.Mock(path="/snap/core/current/lib/foo.so.1", in_base_snap=True)
+        }
+        elf_patcher = elf.Patcher(dynamic_linker="/lib/fake-ld", root_path="/fake")
+
+        with mock.patch(
+            "subprocess.check_call", wraps=subprocess.check_call
+        ) as mock_check_call:
+            elf_patcher.patch(elf_file=elf_file)
+
+        mock_check_call.assert_called_once_with(
+            [
+                "patchelf",
+                "--set-interpreter",
+                "/lib/fake-ld",
+                "--force-rpath",
+                "--set-rpath",
+                "/snap/core/current/lib",
+                mock.ANY,
+            ]
+        )
+
+    def test_patch_removes_runpath_first(self):
+        elf_file = self.fake_elf["fake_elf-2.23"]
+        elf_file.runpaths = ["/usr/lib/foo"]
+        elf_file.dependencies = {
+            mock.Mock(path="/snap/core/current/lib/foo.so.1", in_base_snap=True)
+        }
+        elf_patcher = elf.Patcher(dynamic_linker="/lib/fake-ld", root_path="/fake")
+
+        with mock.patch(
+            "subprocess.check_call", wraps=subprocess.check_call
+        ) as mock_check_call:
+            elf_patcher.patch(elf_file=elf_file)
+
+        mock_check_call.assert_has_calls(
+            [
+                mock.call(["patchelf", "--remove-rpath", mock.ANY]),
+                mock.call(
+                    [
+                        "patchelf",
+                        "--set-interpreter",
+                        "/lib/fake-ld",
+                        "--force-rpath",
+                        "--set-rpath",
+                        "/snap/core/current/lib",
+                        mock.ANY,
+                    ]
+                ),
+            ]
+        )
+
+    def test_patch_in_work_dir(self):
+        elf_file = self.fake_elf["fake_elf-2.23"]
+        work_dir = os.path.join(self.path, "work")
+        elf_patcher = elf.Patcher(
+            dynamic_linker="/lib/fake-ld", root_path="/fake", work_dir=work_dir
+        )
+
+        with mock.patch(
+            "subprocess.check_call", wraps=subprocess.check_call
+        ) as mock_check_call:
+            elf_patcher.patch(elf_file=elf_file)
+
+        patched_path = mock_check_call.call_args[0][0][-1]
+        self.assertThat(os.path.dirname(patched_path), Equals(work_dir))
+        self.assertThat(os.listdir(work_dir), Equals([]))
+
 
 class TestPatcherErrors(TestElfBase):
     def test_patch_fails_raises_patcherror_exception(self):
@@ -414,6 +618,152 @@ class TestPatcherErrors(TestElfBase):
             )
 
 
+class TestElfFileCache(TestElfBase):
+    def setUp(self):
+        super().setUp()
+        self.cache_path = os.path.join(self.path, "cache", "elf-files.json")
+
+    def test_cached_data_is_reused(self):
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        elf.get_elf_files(
+            self.fake_elf.root_path, {"fake_elf-2.23"}, elf_file_cache=elf_file_cache
+        )
+        elf_file_cache.save()
+        self.assertThat(elf_file_cache.misses, Equals(1))
+
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        with mock.patch.object(elf.ElfFile, "_extract") as mock_extract:
+            elf_files = elf.get_elf_files(
+                self.fake_elf.root_path,
+                {"fake_elf-2.23"},
+                elf_file_cache=elf_file_cache,
+            )
+
+        mock_extract.assert_not_called()
+        self.assertThat(elf_file_cache.hits, Equals(1))
+        elf_file = set(elf_files).pop()
+        self.assertThat(elf_file.interp, Equals("/lib64/ld-linux-x86-64.so.2"))
+        self.assertThat(elf_file.get_required_glibc(), Equals("2.23"))
+
+    def test_changed_file_is_extracted_again(self):
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        elf.get_elf_files(
+            self.fake_elf.root_path, {"fake_elf-2.23"}, elf_file_cache=elf_file_cache
+        )
+        elf_file_cache.save()
+
+        path = os.path.join(self.fake_elf.root_path, "fake_elf-2.23")
+        os.utime(path, ns=(0, 0))
+
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        elf.get_elf_files(
+            self.fake_elf.root_path, {"fake_elf-2.23"}, elf_file_cache=elf_file_cache
+        )
+        self.assertThat(elf_file_cache.misses, Equals(1))
+
+    def test_non_elf_files_are_cached(self):
+        with open(os.path.join(self.fake_elf.root_path, "non-elf"), "wb") as f:
+            f.write(b"\x42\x5a\x68")
+
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        elf.get_elf_files(
+            self.fake_elf.root_path, {"non-elf"}, elf_file_cache=elf_file_cache
+        )
+        elf_file_cache.save()
+
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        with mock.patch.object(elf.ElfFile, "is_elf") as mock_is_elf:
+            elf_files = elf.get_elf_files(
+                self.fake_elf.root_path, {"non-elf"}, elf_file_cache=elf_file_cache
+            )
+
+        mock_is_elf.assert_not_called()
+        self.assertThat(elf_files, Equals(set()))
+
+    def test_unreadable_cache_is_ignored(self):
+        os.makedirs(os.path.dirname(self.cache_path))
+        with open(self.cache_path, "w") as f:
+            f.write("not json")
+
+        elf_file_cache = elf.ElfFileCache(path=self.cache_path)
+        elf_files = elf.get_elf_files(
+            self.fake_elf.root_path, {"fake_elf-2.23"}, elf_file_cache=elf_file_cache
+        )
+
+        self.assertThat(len(elf_files), Equals(1))
+
+
+class TestSonameIndex(TestElfBase):
+    def setUp(self):
+        super().setUp()
+        self.arch = ("ELFCLASS64", "ELFDATA2LSB", "EM_X86_64")
+        self.soname_index = elf.SonameIndex()
+
+    def _make_library(self, *path_parts):
+        path = os.path.join(self.fake_elf.root_path, *path_parts)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(b"\x7fELF")
+        return path
+
+    def test_find(self):
+        path = self._make_library("usr", "lib", "libindexed.so.1")
+
+        self.assertThat(
+            self.soname_index.find(
+                soname="libindexed.so.1", arch=self.arch, root=self.fake_elf.root_path
+            ),
+            Equals(path),
+        )
+
+    def test_find_skips_other_architectures(self):
+        self._make_library("usr", "lib", "libindexed.so.1")
+
+        self.assertThat(
+            self.soname_index.find(
+                soname="libindexed.so.1",
+                arch=("ELFCLASS32", "ELFDATA2LSB", "EM_ARM"),
+                root=self.fake_elf.root_path,
+            ),
+            Equals(None),
+        )
+
+    def test_files_added_after_indexing_are_found(self):
+        self.assertThat(
+            self.soname_index.find(
+                soname="libindexed.so.1", arch=self.arch, root=self.fake_elf.root_path
+            ),
+            Equals(None),
+        )
+
+        path = self._make_library("lib", "libindexed.so.1")
+        self.soname_index.add_files(
+            self.fake_elf.root_path, [os.path.join("lib", "libindexed.so.1")]
+        )
+
+        self.assertThat(
+            self.soname_index.find(
+                soname="libindexed.so.1", arch=self.arch, root=self.fake_elf.root_path
+            ),
+            Equals(path),
+        )
+
+    def test_removed_files_are_not_found(self):
+        path = self._make_library("lib", "libindexed.so.1")
+        self.soname_index.find(
+            soname="libindexed.so.1", arch=self.arch, root=self.fake_elf.root_path
+        )
+
+        os.remove(path)
+
+        self.assertThat(
+            self.soname_index.find(
+                soname="libindexed.so.1", arch=self.arch, root=self.fake_elf.root_path
+            ),
+            Equals(None),
+        )
+
+
 class TestSonameCache(unit.TestCase):
     def setUp(self):
         super().setUp()
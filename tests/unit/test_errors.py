@@ -836,6 +836,24 @@ class ErrorFormattingTestCase(unit.TestCase):
                 ),
             },
         ),
+        (
+            "PartWorkerError",
+            {
+                "exception": errors.PartWorkerError,
+                "kwargs": {
+                    "part_name": "test-part-name",
+                    "step": steps.BUILD,
+                    "message": "worker exited with code 9",
+                },
+                "expected_message": (
+                    "Failed to run the 'build' step for 'test-part-name': "
+                    "worker exited with code 9\n"
+                    "Check the output prefixed with 'test-part-name' above for "
+                    "details, or run again with `--jobs 1` to process one part "
+                    "at a time."
+                ),
+            },
+        ),
         (
             "ScriptletDuplicateFieldError",
             {
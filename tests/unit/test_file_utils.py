@@ -14,8 +14,10 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import errno
 import os
 import re
+import shutil
 import subprocess
 from unittest import mock
 
@@ -101,6 +103,25 @@ class ReplaceInFileTestCase(unit.TestCase):
             self.assertThat(f.read(), Equals(file_info["expected"]))
 
 
+class SearchAndReplaceContentsTestCase(unit.TestCase):
+    def test_hard_linked_file_is_not_modified_in_place(self):
+        with open("original", "w") as f:
+            f.write("#!/foo/bar/baz/python")
+        os.chmod("original", 0o755)
+        os.link("original", "linked")
+
+        file_utils.search_and_replace_contents(
+            "linked", re.compile(r"#!.*python"), r"#!/usr/bin/env python"
+        )
+
+        with open("original") as f:
+            self.assertThat(f.read(), Equals("#!/foo/bar/baz/python"))
+        with open("linked") as f:
+            self.assertThat(f.read(), Equals("#!/usr/bin/env python"))
+        self.assertThat(os.stat("linked").st_nlink, Equals(1))
+        self.assertThat(os.stat("linked").st_mode & 0o777, Equals(0o755))
+
+
 class TestLinkOrCopyTree(unit.TestCase):
     def setUp(self):
         super().setUp()
@@ -163,6 +184,56 @@ class TestLinkOrCopyTree(unit.TestCase):
         # Verify that the symlink remains a symlink
         self.assertThat(os.path.join("qux", "bar-link"), unit.LinkExists("bar"))
 
+    def test_link_ignored(self):
+        def ignore(directory, files):
+            if directory == "foo":
+                return ["2"]
+            elif directory == os.path.join("foo", "bar"):
+                return ["baz"]
+            return []
+
+        file_utils.link_or_copy_tree("foo", "qux", ignore=ignore)
+
+        self.assertFalse(os.path.exists(os.path.join("qux", "2")))
+        self.assertTrue(os.path.isfile(os.path.join("qux", "bar", "3")))
+        self.assertFalse(os.path.exists(os.path.join("qux", "bar", "baz")))
+
+    def test_link_into_subdirectory_of_source(self):
+        file_utils.link_or_copy_tree("foo", os.path.join("foo", "qux"))
+
+        self.assertTrue(os.path.isfile(os.path.join("foo", "qux", "bar", "3")))
+        self.assertFalse(os.path.exists(os.path.join("foo", "qux", "qux")))
+
+    def test_directory_metadata_is_copied_after_files(self):
+        os.utime(os.path.join("foo", "bar"), ns=(0, 1))
+        os.chmod(os.path.join("foo", "bar"), 0o555)
+        self.addCleanup(os.chmod, os.path.join("foo", "bar"), 0o755)
+
+        file_utils.link_or_copy_tree("foo", "qux")
+
+        self.addCleanup(os.chmod, os.path.join("qux", "bar"), 0o755)
+        self.assertTrue(os.path.isfile(os.path.join("qux", "bar", "3")))
+        qux_bar_stat = os.stat(os.path.join("qux", "bar"))
+        self.assertThat(qux_bar_stat.st_mode & 0o777, Equals(0o555))
+        self.assertThat(qux_bar_stat.st_mtime_ns, Equals(1))
+
+    def test_link_error_is_raised(self):
+        def copy_function(source, destination):
+            if source.endswith("3"):
+                raise OSError("copy failed")
+            file_utils.link_or_copy(source, destination)
+
+        raised = self.assertRaises(
+            OSError,
+            file_utils.link_or_copy_tree,
+            "foo",
+            "qux",
+            copy_function=copy_function,
+            max_workers=2,
+        )
+
+        self.assertThat(str(raised), Equals("copy failed"))
+
 
 class TestLinkOrCopy(unit.TestCase):
     def setUp(self):
@@ -190,6 +261,75 @@ class TestLinkOrCopy(unit.TestCase):
         self.assertTrue(os.path.isfile("foo2/bar/baz/4"))
 
 
+class Copy2TestCase(unit.TestCase):
+    def setUp(self):
+        super().setUp()
+
+        patcher = mock.patch.dict(file_utils._copy_methods, clear=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with open("source", "w") as source_file:
+            source_file.write("contents")
+        os.chmod("source", 0o750)
+
+    def test_copy2_copies_contents_and_metadata(self):
+        file_utils.copy2("source", "destination")
+
+        with open("destination") as destination_file:
+            self.assertThat(destination_file.read(), Equals("contents"))
+        self.assertThat(os.stat("destination").st_mode & 0o777, Equals(0o750))
+        self.assertThat(
+            os.stat("destination").st_mtime_ns, Equals(os.stat("source").st_mtime_ns)
+        )
+
+    def test_copy2_into_directory(self):
+        os.mkdir("dir")
+
+        file_utils.copy2("source", "dir")
+
+        self.assertTrue(os.path.isfile(os.path.join("dir", "source")))
+
+    @mock.patch("fcntl.ioctl", side_effect=OSError(errno.EOPNOTSUPP, "unsupported"))
+    def test_copy2_falls_back_once_per_device(self, mock_ioctl):
+        file_utils.copy2("source", "destination1")
+        file_utils.copy2("source", "destination2")
+
+        self.assertThat(mock_ioctl.call_count, Equals(1))
+        for destination in ("destination1", "destination2"):
+            with open(destination) as destination_file:
+                self.assertThat(destination_file.read(), Equals("contents"))
+
+    @mock.patch("fcntl.ioctl", side_effect=OSError(errno.EIO, "io error"))
+    def test_copy2_raises_other_errors(self, mock_ioctl):
+        self.assertRaises(OSError, file_utils.copy2, "source", "destination")
+
+    @mock.patch("fcntl.ioctl", side_effect=OSError(errno.EOPNOTSUPP, "unsupported"))
+    @mock.patch("os.copy_file_range", create=True, return_value=0)
+    def test_copy2_reads_what_copy_file_range_does_not_copy(
+        self, mock_copy_file_range, mock_ioctl
+    ):
+        file_utils.copy2("source", "destination")
+
+        self.assertThat(mock_copy_file_range.call_count, Equals(1))
+        with open("destination") as destination_file:
+            self.assertThat(destination_file.read(), Equals("contents"))
+
+    def test_copy2_does_not_open_fifos(self):
+        os.mkfifo("fifo")
+
+        self.assertRaises(
+            shutil.SpecialFileError, file_utils.copy2, "fifo", "destination"
+        )
+
+    def test_copy2_keeps_symlinks(self):
+        os.symlink("source", "link")
+
+        file_utils.copy2("link", "destination", follow_symlinks=False)
+
+        self.assertThat(os.readlink("destination"), Equals("source"))
+
+
 class ExecutableExistsTestCase(unit.TestCase):
     def test_file_does_not_exist(self):
         workdir = self.useFixture(fixtures.TempDir()).path
@@ -15,6 +15,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import fixtures
+import hashlib
 import os
 import progressbar
 import requests
@@ -96,6 +97,15 @@ class IndicatorsDownloadTests(unit.FakeFileHTTPServerBasedTestCase):
 
         self.assertTrue(os.path.exists(self.dest_file))
 
+    def test_download_request_stream_with_hasher(self):
+        request = requests.get(self.source, stream=True, allow_redirects=True)
+        hasher = hashlib.sha256()
+        indicators.download_requests_stream(request, self.dest_file, hasher=hasher)
+
+        with open(self.dest_file, "rb") as dest_file:
+            expected_digest = hashlib.sha256(dest_file.read()).hexdigest()
+        self.assertThat(hasher.hexdigest(), Equals(expected_digest))
+
     def test_download_urllib_source(self):
         indicators.download_urllib_source(self.source, self.dest_file)
 
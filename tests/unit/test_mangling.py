@@ -16,6 +16,7 @@
 
 import os
 import textwrap
+from unittest import mock
 
 from testtools.matchers import FileContains, FileExists, Not
 
@@ -153,6 +154,28 @@ class ManglingPythonShebangTestCase(unit.TestCase):
             ),
         )
 
+    def test_non_python_shebang_is_not_rewritten(self):
+        file_path = _create_file("file", "#!/bin/sh\necho python")
+        with mock.patch(
+            "snapcraft.file_utils.search_and_replace_contents"
+        ) as mock_replace:
+            mangling.rewrite_python_shebang(file_path)
+
+        mock_replace.assert_not_called()
+        self.assertThat(file_path, FileContains("#!/bin/sh\necho python"))
+
+    def test_binary_file_is_not_rewritten(self):
+        os.makedirs("test-dir")
+        file_path = os.path.join("test-dir", "file")
+        with open(file_path, "wb") as f:
+            f.write(b"\x7fELF\xff python")
+        with mock.patch(
+            "snapcraft.file_utils.search_and_replace_contents"
+        ) as mock_replace:
+            mangling.rewrite_python_shebang(file_path)
+
+        mock_replace.assert_not_called()
+
 
 class TestClearExecstack(unit.TestCase):
     def setUp(self):